@@ -1,4 +1,31 @@
-from .client import LLMClient
-from .models import Message, LLMRequest, LLMResponse, Usage
+import importlib
 
-__all__ = ["LLMClient", "Message", "LLMRequest", "LLMResponse", "Usage"]
+# Public names are resolved on first access so `import llm` stays cheap; provider SDKs
+# are imported later still, when a provider is actually called.
+_EXPORTS = {
+    "LLMClient": ".client",
+    "Message": ".models",
+    "LLMRequest": ".models",
+    "LLMResponse": ".models",
+    "Usage": ".models",
+    "StreamChunk": ".models",
+    "LLMStream": ".streaming",
+    "AsyncLLMStream": ".streaming",
+    "BatchItem": ".batch",
+    "BatchResult": ".batch",
+    "close_pool": ".pool",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,219 @@
+import time
+import queue
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import Optional, List, Dict, Any, Union, Callable, Awaitable, Iterator, Tuple
+
+from .models import LLMRequest, LLMResponse, Usage
+from .deadline import CancelToken
+
+# Batch defaults; overridable via the "batch" block in config.json or per call
+DEFAULT_BATCH_CONFIG = {
+    "concurrency": 8,   # Requests in flight at once
+    "timeout": 300,     # Per-request deadline in seconds (0 disables)
+}
+
+BatchRequest = Union[LLMRequest, Dict[str, Any]]
+
+
+class BatchItem:
+    """Outcome of one request in a batch: either `response` or `error` is set."""
+
+    __slots__ = ("index", "response", "error", "latency")
+
+    def __init__(self, index: int, response: Optional[LLMResponse] = None,
+                 error: Optional[BaseException] = None, latency: Optional[float] = None):
+        self.index = index
+        self.response = response
+        self.error = error
+        self.latency = latency
+
+    @property
+    def ok(self) -> bool:
+        return self.response is not None
+
+    def __repr__(self) -> str:
+        outcome = f"provider={self.response.provider}" if self.ok else f"error={self.error!r}"
+        return f"BatchItem(index={self.index}, {outcome})"
+
+
+class BatchResult:
+    """
+    Ordered results of `LLMClient.chat_many` / `achat_many`.
+
+    `items[i]` always corresponds to `requests[i]`; failed or timed-out requests
+    carry their exception instead of failing the whole batch.
+    """
+
+    def __init__(self, items: List[BatchItem], elapsed: float):
+        self.items = items
+        self.elapsed = elapsed
+
+    def __iter__(self) -> Iterator[BatchItem]:
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index: int) -> BatchItem:
+        return self.items[index]
+
+    @property
+    def responses(self) -> List[Optional[LLMResponse]]:
+        return [item.response for item in self.items]
+
+    @property
+    def succeeded(self) -> int:
+        return sum(1 for item in self.items if item.ok)
+
+    @property
+    def failed(self) -> int:
+        return len(self.items) - self.succeeded
+
+    @property
+    def usage(self) -> Usage:
+        usages = [item.response.usage for item in self.items if item.ok and item.response.usage]
+        return Usage(
+            prompt_tokens=sum(u.prompt_tokens for u in usages),
+            completion_tokens=sum(u.completion_tokens for u in usages),
+            total_tokens=sum(u.total_tokens for u in usages),
+            cached_tokens=sum(u.cached_tokens for u in usages)
+        )
+
+    @property
+    def throughput(self) -> float:
+        """Completed requests per second of wall time."""
+        return self.succeeded / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.usage.total_tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.succeeded}/{len(self.items)} ok in {self.elapsed:.1f}s | "
+            f"{self.throughput:.2f} req/s | {self.usage.total_tokens} tokens "
+            f"({self.tokens_per_second:.0f} tok/s)"
+        )
+
+
+def request_kwargs(request: BatchRequest) -> Dict[str, Any]:
+    """Normalizes an LLMRequest or a `chat` kwargs dict into `chat` kwargs."""
+    if isinstance(request, LLMRequest):
+        kwargs = {
+            "messages": [m.model_dump(exclude_none=True) for m in request.messages],
+            "model": request.model,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "top_p": request.top_p,
+        }
+        if request.stop is not None:
+            kwargs["stop"] = request.stop
+        kwargs.update(request.extra_params)
+        return {k: v for k, v in kwargs.items() if v is not None}
+    return dict(request)
+
+
+def _deadline_error(timeout: float) -> TimeoutError:
+    return TimeoutError(f"request exceeded its {timeout:g}s deadline")
+
+
+def _linked_token(parent: Optional[CancelToken]) -> Tuple[CancelToken, Callable[[], None]]:
+    """
+    A token of the batch's own, cancelled along with the caller's `parent` token (if any).
+    A batch timeout cancels only this one, never the caller's. Returns (token, unlink).
+    """
+    token = CancelToken()
+    if parent is None:
+        return token, lambda: None
+    return token, parent.on_cancel(lambda: token.cancel(parent.reason or "cancelled"))
+
+
+def run_batch(call: Callable[..., LLMResponse], requests: List[BatchRequest],
+              concurrency: int, timeout: Optional[float], cancel: Optional[CancelToken] = None) -> BatchResult:
+    """
+    Runs `call(**kwargs)` for every request on a pool of `concurrency` worker threads.
+
+    A request that outlives its deadline is reported as a TimeoutError and its slot is
+    handed to the next request. The deadline is also passed to the call, which gives up
+    on its own, and the abandoned call is cancelled (through a token of the batch's own,
+    so a caller's `cancel` token is never cancelled by the batch); any late result is dropped.
+    Cancelling the caller's token (`cancel`, or a request's own) still cancels its requests.
+    """
+    started = time.time()
+    items: List[Optional[BatchItem]] = [None] * len(requests)
+    done: "queue.Queue" = queue.Queue()
+    pending = deque(range(len(requests)))
+    # index -> (absolute deadline, timeout, token, unlink from the caller's token)
+    running: Dict[int, Tuple[float, Optional[float], CancelToken, Callable[[], None]]] = {}
+
+    def worker(index: int, kwargs: Dict[str, Any]):
+        attempt_start = time.time()
+        try:
+            response, error = call(**kwargs), None
+        except BaseException as e:  # Every request must post a result, or the batch would wait forever
+            response, error = None, e
+        done.put((index, response, error, time.time() - attempt_start))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="llm-batch")
+    try:
+        while pending or running:
+            while pending and len(running) < concurrency:
+                index = pending.popleft()
+                kwargs = request_kwargs(requests[index])
+                limit = kwargs.pop("timeout", timeout)
+                token, unlink = _linked_token(kwargs.get("cancel") or cancel)
+                kwargs["cancel"] = token
+                if limit:
+                    kwargs.setdefault("deadline", limit)
+                running[index] = (time.time() + limit if limit else float("inf"), limit, token, unlink)
+                executor.submit(contextvars.copy_context().run, worker, index, kwargs)
+
+            next_deadline = min(entry[0] for entry in running.values())
+            wait = None if next_deadline == float("inf") else max(0.0, next_deadline - time.time())
+            try:
+                index, response, error, latency = done.get(timeout=wait)
+            except queue.Empty:
+                now = time.time()
+                for index, (deadline, limit, token, unlink) in list(running.items()):
+                    if deadline <= now:
+                        del running[index]
+                        unlink()
+                        token.cancel("batch deadline")
+                        items[index] = BatchItem(index, error=_deadline_error(limit), latency=limit)
+                continue
+            if index in running:
+                running.pop(index)[3]()
+                items[index] = BatchItem(index, response, error, latency)
+    finally:
+        # Abandoned calls are cancelled and finish on their own; never block the caller on them
+        executor.shutdown(wait=False)
+
+    return BatchResult(items, time.time() - started)
+
+
+async def arun_batch(call: Callable[..., Awaitable[LLMResponse]], requests: List[BatchRequest],
+                     concurrency: int, timeout: Optional[float]) -> BatchResult:
+    """Async counterpart of `run_batch`: overdue requests are cancelled, not abandoned."""
+    started = time.time()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int, request: BatchRequest) -> BatchItem:
+        kwargs = request_kwargs(request)
+        limit = kwargs.pop("timeout", timeout)
+        if limit:
+            kwargs.setdefault("deadline", limit)
+        async with semaphore:
+            attempt_start = time.time()
+            try:
+                response = await asyncio.wait_for(call(**kwargs), limit or None)
+            except asyncio.TimeoutError:
+                return BatchItem(index, error=_deadline_error(limit), latency=time.time() - attempt_start)
+            except Exception as e:
+                return BatchItem(index, error=e, latency=time.time() - attempt_start)
+            return BatchItem(index, response, latency=time.time() - attempt_start)
+
+    items = await asyncio.gather(*[run_one(i, r) for i, r in enumerate(requests)])
+    return BatchResult(list(items), time.time() - started)
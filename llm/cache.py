@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Optional, List, Dict, Any
+
+from .models import LLMResponse
+
+# Request parameters that change the completion and therefore belong in the cache key
+SAMPLING_KEYS = ("temperature", "max_tokens", "top_p", "stop", "seed", "presence_penalty",
+                 "frequency_penalty", "response_format")
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Strips cosmetic differences (line endings, trailing whitespace, extra fields) from messages."""
+    normalized = []
+    for msg in messages:
+        content = msg.get("content") or ""
+        if isinstance(content, str):
+            content = "\n".join(line.rstrip() for line in content.replace("\r\n", "\n").split("\n")).strip()
+        entry = {"role": msg.get("role"), "content": content}
+        if msg.get("name"):
+            entry["name"] = msg["name"]
+        normalized.append(entry)
+    return normalized
+
+
+def cache_key(messages: List[Dict[str, Any]], provider: str, model: Optional[str], params: Dict[str, Any]) -> str:
+    """Content address of a request: sha256 over normalized messages, provider, model and sampling params."""
+    payload = {
+        "messages": normalize_messages(messages),
+        "provider": provider,
+        "model": model,
+        "params": {k: params[k] for k in SAMPLING_KEYS if params.get(k) is not None},
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of LLM responses.
+
+    Entries are one JSON file per key under `cache_dir` (sharded by the first two
+    hex chars) written via atomic rename, so concurrent threads and processes never
+    observe partial files. File mtime doubles as the LRU clock: hits touch it and
+    eviction removes the least recently used entries once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any], base_dir: str) -> "ResponseCache":
+        cache_dir = cfg.get("dir", os.path.join(".agent", "llm_cache"))
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(base_dir, cache_dir)
+        return cls(
+            cache_dir,
+            ttl_seconds=cfg.get("ttl_seconds", 7 * 24 * 3600),
+            max_bytes=int(cfg.get("max_mb", 256) * 1024 * 1024),
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        """Yields (path, size, mtime) for every entry on disk."""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+
+            if self.ttl_seconds is not None and time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+                self.expired += 1
+                self.misses += 1
+                self._remove(path)
+                return None
+
+            try:
+                os.utime(path, None)  # LRU touch
+            except OSError:
+                pass
+            self.hits += 1
+        return LLMResponse(**entry["response"])
+
+    def put(self, key: str, response: LLMResponse):
+        entry = {
+            "created_at": time.time(),
+            "response": response.model_dump(exclude={"raw"}),
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                return
+            self.writes += 1
+            self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+            self._total_bytes -= size
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Rescan so entries written by other processes are accounted for
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9  # Leave headroom so we don't evict on every write
+        for path, size, _ in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                self._remove(path)
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "bytes": self._total_bytes,
+        }
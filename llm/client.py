@@ -1,65 +1,122 @@
 import os
 import json
 import time
+import sys
+import asyncio
+import threading
 import functools
-from typing import Optional, List, Dict, Any
-try:
-    from openai import OpenAI, AsyncOpenAI
-except ImportError:
-    # We will raise a clean error when used if openai is not installed
-    OpenAI = None
-    AsyncOpenAI = None
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
-
-from .models import Message, LLMRequest, LLMResponse, Usage
+import contextvars
+import concurrent.futures
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Iterator, AsyncIterator, Awaitable, Callable, Tuple
+
+from .models import Message, LLMRequest, LLMResponse, Usage, StreamChunk, RAW_MODES, retain_raw
+from .streaming import LLMStream, AsyncLLMStream
+from .cache import ResponseCache, cache_key
+from .pool import DEFAULT_POOL_CONFIG, get_pool, pool_key, build_openai_client
+from .hedging import HedgePolicy, HedgeCancelled, get_latency_tracker
+from .health import CircuitOpenError, HealthTracker, get_health_tracker
+from .ratelimit import RateLimiter, get_rate_limiter
+from .tokens import (ContextWindowError, MIN_COMPLETION_TOKENS, context_window,
+                     count_message_tokens, usable_window)
+from .prompt_cache import arrange_messages, get_prompt_cache
+from .batch import DEFAULT_BATCH_CONFIG, BatchRequest, BatchResult, run_batch, arun_batch
+from .ledger import estimate_cost, get_ledger
+from .tracing import get_tracer
+from .replay import Replay, ReplayMissError
+from .deadline import CallAborted, CallCancelled, CallInfo, DeadlineExceeded, Deadline
+from .retry import DEFAULT_RETRY_CONFIG, Backoff, ErrorInfo, RetryBudget, classify, get_retry_metrics
+
+# Priority list for fallback: order of reliability/capability
+FALLBACK_CHAIN = ["deepseek", "dashscope", "siliconflow", "gemini", "openai"]
+
+# Gemini FinishReason names mapped to the OpenAI-style values LLMResponse carries
+GEMINI_FINISH_REASONS = {
+    "STOP": "stop",
+    "MAX_TOKENS": "length",
+    "SAFETY": "content_filter",
+    "RECITATION": "content_filter",
+    "BLOCKLIST": "content_filter",
+    "PROHIBITED_CONTENT": "content_filter",
+    "SPII": "content_filter",
+}
+
+# Client-side control options that must never be forwarded to the provider SDK
+CONTROL_KWARGS = {"max_retries", "retry_delay", "retry_budget", "use_cache", "hedge", "role", "deadline", "cancel",
+                  "context"}
+
+# Floor for the SDK timeout derived from a nearly spent deadline
+MIN_SDK_TIMEOUT = 0.1
+
+# How often async backoff sleeps look at a cancellation token
+CANCEL_POLL_SECONDS = 0.1
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_ENV_LOADED = False
+
+
+def _load_env():
+    """Reads .env once, on first client construction rather than at import time."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    _ENV_LOADED = True
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
 
 class LLMClient:
-    def __init__(self, config_path: Optional[str] = None, context_id: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, context_id: Optional[str] = None,
+                 cache: Optional[Any] = None, replay: Optional[Replay] = None):
+        """
+        Args:
+            config_path: Provider config (defaults to llm/config.json)
+            context_id: Stable identifier (e.g. target path) attached to this client's calls
+            cache: True/False to force the response cache on/off, or a ResponseCache instance.
+                   Defaults to the `cache.enabled` setting in config.json.
+            replay: A Replay to record provider traffic to, or serve it from, instead of the
+                    `replay` block in config.json / SPARKFORGE_REPLAY.
+        """
+        _load_env()
         self.config = self._load_config(config_path)
-        if context_id:
-            import hashlib
-            self.context_id = hashlib.sha256(context_id.encode('utf-8')).hexdigest()
-        else:
-            self.context_id = None
-        self._clients = {}
-        self._state_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".agent", "llm_state.json")
-        self._overrides = self._load_state()
-
-    def _load_state(self) -> Dict[str, Any]:
-        if not self.context_id or not os.path.exists(self._state_file):
-            return {}
-        try:
-            with open(self._state_file, "r") as f:
-                state = json.load(f)
-                return state.get(self.context_id, {})
-        except:
-            return {}
-
-    def _save_state(self, original_provider: str, stable_provider: str):
-        if not self.context_id:
+        self.context_id = self._context_hash(context_id)
+        self._state_file = os.path.join(PROJECT_ROOT, ".agent", "llm_state.db")
+        self.replay = replay or Replay.from_config(self.config.get("replay"), PROJECT_ROOT)
+        self.health = get_health_tracker(self._state_file, self.config.get("health", {}))
+        self.cache = self._init_cache(cache)
+        self._latency = get_latency_tracker()
+        self.hedge_policy = HedgePolicy(self.config.get("hedging", {}), self._latency)
+        self.prompt_cache = get_prompt_cache(self.config.get("prompt_cache", {}))
+        self.rate_limiter = get_rate_limiter()
+        self.ledger = get_ledger(self.config.get("ledger", {}), PROJECT_ROOT)
+        self.tracer = get_tracer()
+        self.retry_config = {**DEFAULT_RETRY_CONFIG, **self.config.get("retry", {})}
+        self.retry_metrics = get_retry_metrics()
+        self.raw_mode = self.config.get("responses", {}).get("raw", "keep")
+        if self.raw_mode not in RAW_MODES:
+            raise ValueError(f"responses.raw must be one of {', '.join(RAW_MODES)}, not {self.raw_mode!r}")
+        if self.replay is not None and self.replay.replaying:
+            # Offline: routing must not depend on (or pollute) live provider state, nothing is billed
+            self.health = HealthTracker()
+            self.rate_limiter = RateLimiter()
+            self.ledger = None
             return
-        try:
-            os.makedirs(os.path.dirname(self._state_file), exist_ok=True)
-            state = {}
-            if os.path.exists(self._state_file):
-                with open(self._state_file, "r") as f:
-                    state = json.load(f)
-            
-            if self.context_id not in state:
-                state[self.context_id] = {}
-            
-            state[self.context_id][original_provider] = stable_provider
-            
-            with open(self._state_file, "w") as f:
-                json.dump(state, f, indent=2)
-            self._overrides = state[self.context_id]
-        except:
-            pass
+        for name, cfg in self.config.items():
+            if isinstance(cfg, dict) and (cfg.get("rpm") or cfg.get("tpm")):
+                self.rate_limiter.configure(name, cfg.get("rpm"), cfg.get("tpm"))
+
+    def _init_cache(self, cache: Optional[Any]) -> Optional[ResponseCache]:
+        if isinstance(cache, ResponseCache):
+            return cache
+        cache_cfg = self.config.get("cache", {})
+        enabled = cache if cache is not None else cache_cfg.get("enabled", False)
+        if not enabled:
+            return None
+        return ResponseCache.from_config(cache_cfg, PROJECT_ROOT)
 
     def _load_config(self, path: Optional[str]) -> Dict[str, Any]:
         if not path:
@@ -78,7 +135,7 @@ class LLMClient:
     def _get_provider_config(self, provider: str) -> Dict[str, Any]:
         return self.config.get(provider, {})
 
-    def _get_client(self, provider: str, async_mode: bool = False) -> Any:
+    def _resolve_api_key(self, provider: str) -> str:
         cfg = self._get_provider_config(provider)
         
         # Handle env var expansion in the api_key string
@@ -87,35 +144,779 @@ class LLMClient:
             env_var = api_key_str[2:-1]
             api_key = os.environ.get(env_var, "")
         else:
-            api_key = api_key_str
+            api_key = os.path.expandvars(api_key_str)
 
         # Fallback to direct env var if config doesn't provide a valid key
         if not api_key:
             api_key = os.environ.get(f"{provider.upper()}_API_KEY", "")
+        return api_key
+
+    def _pool_config(self, provider: str) -> Dict[str, Any]:
+        pool_cfg = dict(DEFAULT_POOL_CONFIG)
+        pool_cfg.update(self.config.get("pool", {}))
+        provider_limit = self._get_provider_config(provider).get("max_connections")
+        if provider_limit:
+            pool_cfg["max_connections"] = provider_limit
+            pool_cfg["max_keepalive_connections"] = min(pool_cfg["max_keepalive_connections"], provider_limit)
+        return pool_cfg
+
+    def _get_client(self, provider: str, async_mode: bool = False,
+                    api_key: Optional[str] = None, base_url: Optional[str] = None) -> Any:
+        """Returns a pooled SDK client; per-call key/base_url overrides get their own pooled entry."""
+        cfg = self._get_provider_config(provider)
+        api_key = api_key or self._resolve_api_key(provider)
 
         # Special handling for Gemini V2 SDK (google-genai)
-        if provider == "gemini":
-            # Only use native SDK if base_url is not an OpenAI-compatible one
-            if not cfg.get("base_url") or "/openai" not in cfg.get("base_url"):
+        # Only use native SDK if base_url is not an OpenAI-compatible one
+        if self._is_native_gemini(provider):
+            def make_genai_client():
                 try:
                     from google import genai
                 except ImportError:
                     raise ImportError("The 'google-genai' library is required for native Gemini. Please install it with 'pip install google-genai'.")
                 return genai.Client(api_key=api_key, http_options={'api_version': 'v1beta'})
 
-        # Default to OpenAI client
-        if OpenAI is None:
-            raise ImportError("The 'openai' library is required. Please install it with 'pip install openai'.")
+            key = pool_key("genai", provider, api_key, None, async_mode)
+            return get_pool().get(key, make_genai_client, async_mode=async_mode)
 
-        key = f"{provider}_{'async' if async_mode else 'sync'}"
-        if key in self._clients:
-            return self._clients[key]
+        # Default to OpenAI client; the SDK is only imported once an OpenAI-compatible provider is used
+        try:
+            from openai import OpenAI, AsyncOpenAI
+        except ImportError:
+            raise ImportError("The 'openai' library is required. Please install it with 'pip install openai'.")
 
-        base_url = cfg.get("base_url")
+        base_url = base_url or cfg.get("base_url")
         client_cls = AsyncOpenAI if async_mode else OpenAI
-        client = client_cls(api_key=api_key, base_url=base_url)
-        self._clients[key] = client
-        return client
+        key = pool_key("openai", provider, api_key, base_url, async_mode)
+        return get_pool().get(
+            key,
+            lambda: build_openai_client(client_cls, api_key, base_url, self._pool_config(provider), async_mode),
+            async_mode=async_mode
+        )
+
+    def close(self):
+        """
+        Releases this instance's own resources (its response cache and replay cassette).
+        SDK clients belong to the process-wide pool and stay open for other instances;
+        `close_pool()`, also run at interpreter exit, shuts the pool down.
+        """
+        self.cache = None
+        self.replay = None
+
+    async def aclose(self):
+        self.close()
+
+    def _default_provider(self) -> str:
+        return self.config.get("provider", {}).get("default", "openai")
+
+    def _is_native_gemini(self, provider: str) -> bool:
+        cfg = self._get_provider_config(provider)
+        return provider == "gemini" and (not cfg.get("base_url") or "/openai" not in cfg.get("base_url"))
+
+    def _resolve_model(self, provider: str, model: Optional[str], kwargs: Dict[str, Any]) -> str:
+        return model or kwargs.get("model") or self._get_provider_config(provider).get("model")
+
+    def _provider_plan(self, provider: str) -> List[str]:
+        """Providers to try for a call, ordered by the health tracker."""
+        # Determine starting index in the fallback chain
+        try:
+            start_idx = FALLBACK_CHAIN.index(provider)
+            chain = FALLBACK_CHAIN[start_idx:]
+        except ValueError:
+            chain = [provider] + FALLBACK_CHAIN
+        return self.health.rank(provider, chain)
+
+    def _attempt_args(self, p_to_try: str, original_provider: str,
+                      model: Optional[str], api_key: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        # CRITICAL: Only use passed-in model/key on the requested provider.
+        # Fallback providers use their own defaults.
+        if p_to_try == original_provider:
+            return model, api_key
+        return None, None
+
+    @staticmethod
+    def _bind_controls(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Turns a `deadline` in seconds into one Deadline shared by every attempt of the call."""
+        if kwargs.get("deadline") is not None:
+            kwargs["deadline"] = Deadline.of(kwargs["deadline"])
+        return kwargs
+
+    @staticmethod
+    def _aborted(call: Optional[CallInfo]) -> Optional[CallAborted]:
+        """The error to stop with if the caller cancelled the call or its deadline passed."""
+        if call is None:
+            return None
+        if call.cancel is not None and call.cancel.cancelled:
+            return CallCancelled(call.cancel.reason or "cancelled")
+        if call.deadline is not None and call.deadline.expired:
+            return DeadlineExceeded(call.deadline.seconds)
+        return None
+
+    def _check_call(self, call: Optional[CallInfo]):
+        aborted = self._aborted(call)
+        if aborted is not None:
+            raise aborted
+
+    def _sleep(self, delay: float, call: Optional[CallInfo]):
+        """Backoff sleep that a cancellation cuts short."""
+        if call is not None and call.cancel is not None:
+            call.cancel.wait(delay)
+        else:
+            time.sleep(delay)
+        self._check_call(call)
+
+    async def _asleep(self, delay: float, call: Optional[CallInfo]):
+        if call is None or call.cancel is None:
+            await asyncio.sleep(delay)
+        else:
+            end = time.monotonic() + delay
+            while not call.cancel.cancelled and time.monotonic() < end:
+                await asyncio.sleep(min(CANCEL_POLL_SECONDS, end - time.monotonic()))
+        self._check_call(call)
+
+    @staticmethod
+    def _sdk_timeout(kwargs: Dict[str, Any]) -> Optional[float]:
+        """Per-request SDK timeout: what is left of the call's deadline, or an explicit `timeout`."""
+        deadline = kwargs.get("deadline")
+        if deadline is None:
+            return kwargs.get("timeout")
+        remaining = max(MIN_SDK_TIMEOUT, deadline.remaining())
+        return min(remaining, kwargs["timeout"]) if kwargs.get("timeout") else remaining
+
+    @contextmanager
+    def _closed_on_cancel(self, stream: Any, kwargs: Dict[str, Any]):
+        """Closes a provider stream (and its connection) as soon as the call is cancelled."""
+        cancel = kwargs.get("cancel")
+        close = getattr(stream, "close", None)
+        if cancel is None or close is None:
+            yield stream
+            return
+        unregister = cancel.on_cancel(close)
+        try:
+            yield stream
+        except CallAborted:
+            raise
+        except Exception as e:
+            if cancel.cancelled:
+                raise CallCancelled(cancel.reason or "cancelled") from e
+            raise
+        finally:
+            unregister()
+
+    @staticmethod
+    async def _aclosed_on_cancel(stream: Any, kwargs: Dict[str, Any]) -> AsyncIterator[Any]:
+        """
+        Async counterpart of `_closed_on_cancel`: yields the provider stream's events, but a read
+        blocked on the network is abandoned, and the stream closed, as soon as the call is
+        cancelled or its deadline passes, rather than when the next chunk happens to arrive.
+        """
+        cancel, deadline = kwargs.get("cancel"), kwargs.get("deadline")
+        if cancel is None and deadline is None:
+            async for event in stream:
+                yield event
+            return
+        loop = asyncio.get_running_loop()
+        cancelled = asyncio.Event()
+        # Tokens may be cancelled from any thread; the event belongs to this loop
+        unregister = cancel.on_cancel(lambda: loop.call_soon_threadsafe(cancelled.set)) if cancel else (lambda: None)
+        waiter = asyncio.ensure_future(cancelled.wait())
+        events = stream.__aiter__()
+        try:
+            while True:
+                read = asyncio.ensure_future(events.__anext__())
+                done, _ = await asyncio.wait({read, waiter}, timeout=deadline.remaining() if deadline else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if read not in done:
+                    read.cancel()
+                    await asyncio.gather(read, return_exceptions=True)
+                    if cancel is not None:
+                        cancel.check()
+                    raise DeadlineExceeded(deadline.seconds)
+                try:
+                    event = read.result()
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            unregister()
+            waiter.cancel()
+            close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+            if close is not None:
+                try:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception:
+                    pass  # Closing an already broken connection must not mask the outcome
+
+    @staticmethod
+    def _guarded(chunks: Iterator[StreamChunk], kwargs: Dict[str, Any]) -> Iterator[StreamChunk]:
+        """Stops a stream once its call is cancelled or past its deadline, including after the first token."""
+        cancel, deadline = kwargs.get("cancel"), kwargs.get("deadline")
+        if cancel is None and deadline is None:
+            yield from chunks
+            return
+        try:
+            for chunk in chunks:
+                if cancel is not None:
+                    cancel.check()
+                if deadline is not None:
+                    deadline.check()
+                yield chunk
+            # A stream closed on cancellation may just end: never pass that off as a complete reply
+            if cancel is not None:
+                cancel.check()
+        finally:
+            chunks.close()
+
+    @staticmethod
+    async def _aguarded(chunks: AsyncIterator[StreamChunk], kwargs: Dict[str, Any]) -> AsyncIterator[StreamChunk]:
+        cancel, deadline = kwargs.get("cancel"), kwargs.get("deadline")
+        try:
+            async for chunk in chunks:
+                if cancel is not None:
+                    cancel.check()
+                if deadline is not None:
+                    deadline.check()
+                yield chunk
+            if cancel is not None:
+                cancel.check()
+        finally:
+            await chunks.aclose()
+
+    def _retry_delay(self, p_to_try: str, attempt: int, max_retries: int, error: Exception,
+                     info: ErrorInfo, backoff: Backoff, call: Optional[CallInfo]) -> Optional[float]:
+        """Logs a failed attempt; returns how long to wait before retrying the same provider, or None to fail over."""
+        # Log retry attempt to stderr for visibility
+        print(f"[LLMClient] Attempt {attempt+1}/{max_retries} failed for {p_to_try} ({info.kind}): {error}", file=sys.stderr)
+
+        if info.fatal:
+            return None # Go to next provider immediately for fatal config errors
+        if attempt == max_retries - 1:
+            return None # Go to next provider
+        delay = backoff.next_delay(info)
+        if delay is None:
+            print(f"[LLMClient] {p_to_try} asked to wait {info.retry_after:.0f}s; failing over instead", file=sys.stderr)
+            return None
+        if call is not None and call.deadline is not None and delay >= call.deadline.remaining():
+            return None # Waiting would eat the rest of the deadline; try the next provider now
+        if call is not None and not call.budget.take(delay):
+            self.retry_metrics.exhausted(p_to_try)
+            print(f"[LLMClient] Retry budget spent; not retrying {p_to_try}", file=sys.stderr)
+            return None
+        self.retry_metrics.backoff(p_to_try, delay)
+        return delay
+
+    def _on_failure(self, p_to_try: str, error: Exception, started: float) -> ErrorInfo:
+        """Classifies a failed attempt and feeds it to the rate limiter, health tracker and retry metrics."""
+        info = classify(error)
+        self.retry_metrics.failure(p_to_try, info, time.time() - started)
+        if info.rate_limited:
+            self.rate_limiter.throttled(p_to_try, info.retry_after)
+        self.health.record_failure(p_to_try, fatal=info.fatal)
+        return info
+
+    def _log_fallback(self, p_to_try: str, providers_to_try: List[str], error: Optional[Exception] = None):
+        # If we reached here without returning, it means p_to_try exhausted all retries
+        if p_to_try != providers_to_try[-1]:
+            next_p = providers_to_try[providers_to_try.index(p_to_try)+1]
+            if isinstance(error, CircuitOpenError):
+                print(f"[LLMClient] ⛔ Circuit open for {p_to_try}. Routing to {next_p}...", file=sys.stderr)
+            else:
+                print(f"[LLMClient] ⚠️  Provider {p_to_try} failed completely. Falling back to {next_p}...", file=sys.stderr)
+
+    def _cache_key_for(self, messages: List[Dict[str, str]], provider: str,
+                       model: Optional[str], kwargs: Dict[str, Any]) -> Optional[str]:
+        """Returns the cache key for a call, or None if caching is off for it (`use_cache=False`)."""
+        if self.cache is None or kwargs.get("use_cache") is False:
+            return None
+        temperature, max_tokens = self._sampling_params(provider, kwargs)
+        params = dict(kwargs, temperature=temperature, max_tokens=max_tokens)
+        return cache_key(messages, provider, self._resolve_model(provider, model, kwargs), params)
+
+    def _cache_store(self, key: Optional[str], response: LLMResponse):
+        if key and response.content:
+            self.cache.put(key, response)
+
+    def _cached_stream(self, cached: LLMResponse, started_at: float, async_mode: bool = False) -> Any:
+        chunk = StreamChunk(delta=cached.content, usage=cached.usage, finish_reason=cached.finish_reason)
+        if async_mode:
+            return AsyncLLMStream(_achain([chunk], _aempty()), provider=cached.provider, model=cached.model, started_at=started_at)
+        return LLMStream(iter([chunk]), provider=cached.provider, model=cached.model, started_at=started_at)
+
+    def _hedge_enabled(self, kwargs: Dict[str, Any]) -> bool:
+        return bool(kwargs.get("hedge", self.hedge_policy.enabled))
+
+    def _estimate_cost(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any], provider: str) -> int:
+        """Tokens reserved against the provider's TPM budget before sending (prompt + completion cap)."""
+        _, max_tokens = self._sampling_params(provider, kwargs)
+        return count_message_tokens(messages, provider) + max_tokens
+
+    def context_window(self, provider: str, model: Optional[str] = None) -> int:
+        model = model or self._get_provider_config(provider).get("model")
+        return context_window(model, self._get_provider_config(provider))
+
+    def prompt_budget(self, provider: Optional[str] = None, model: Optional[str] = None,
+                      messages: Optional[List[Dict[str, str]]] = None, **kwargs) -> int:
+        """
+        Tokens still available for prompt material on (provider, model) after reserving
+        `max_tokens` for the answer and the given fixed `messages`. Accepts a role config
+        (provider/model/max_tokens/...) as kwargs, so callers can budget before building a prompt.
+        """
+        provider = provider or self._default_provider()
+        _, max_tokens = self._sampling_params(provider, kwargs)
+        window = usable_window(self.context_window(provider, model))
+        return window - max_tokens - count_message_tokens(messages or [], provider)
+
+    def _preflight(self, provider: str, model: str, messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """
+        Checks the request against the model's window before any network round trip.
+        Returns the completion cap to send, lowered if the prompt leaves less room than asked.
+        """
+        window = usable_window(self.context_window(provider, model))
+        prompt_tokens = count_message_tokens(messages, provider)
+        room = window - prompt_tokens
+        if room < min(max_tokens, MIN_COMPLETION_TOKENS):
+            raise ContextWindowError(provider, model, prompt_tokens, window)
+        if room < max_tokens:
+            print(f"[LLMClient] ✂️  {provider}/{model}: max_tokens {max_tokens} → {room} to fit the context window", file=sys.stderr)
+            return room
+        return max_tokens
+
+    def _admit(self, p_to_try: str, tokens: int) -> float:
+        waited = self.rate_limiter.acquire(p_to_try, tokens)
+        if waited >= 1:
+            print(f"[LLMClient] ⏳ {p_to_try} rate budget: queued {waited:.1f}s", file=sys.stderr)
+        return waited
+
+    async def _aadmit(self, p_to_try: str, tokens: int) -> float:
+        waited = await self.rate_limiter.aacquire(p_to_try, tokens)
+        if waited >= 1:
+            print(f"[LLMClient] ⏳ {p_to_try} rate budget: queued {waited:.1f}s", file=sys.stderr)
+        return waited
+
+    def _settle(self, p_to_try: str, tokens: int, result: Any):
+        if isinstance(result, LLMResponse) and result.usage:
+            self.rate_limiter.settle(p_to_try, tokens, result.usage.total_tokens)
+
+    def _stream_complete(self, key: Optional[str], cost: Callable[[str], int], call: Optional[CallInfo],
+                         span: Any, response: LLMResponse):
+        self._settle(response.provider, cost(response.provider), response)
+        self._cache_store(key, response)
+        self._end_span(span, response)
+        entry = call.open.pop(response.provider, None) if call else None
+        if entry is not None:
+            entry["latency"] = round(time.time() - entry["ts"], 3)
+            self._ledger_write(entry, response)
+
+    def _stream_abort(self, cost: Callable[[str], int], call: Optional[CallInfo], span: Any,
+                      partial: LLMResponse, error: Optional[BaseException]):
+        """
+        Settles a stream that raised mid-generation or was abandoned by its reader: the
+        tokens were billed all the same, so its ledger entry is written as failed with
+        whatever usage arrived before it stopped, and its span ends with the error.
+        """
+        if partial.usage:
+            self._settle(partial.provider, cost(partial.provider), partial)
+        if error is None:
+            span.set(abandoned=True)
+        self._end_span(span, partial, error)
+        entry = call.open.pop(partial.provider, None) if call else None
+        if entry is None:
+            return
+        if error is None:
+            kind, status = "abandoned", None
+        elif isinstance(error, CallAborted) or not isinstance(error, Exception):
+            # The caller gave up (deadline, token, task cancellation), as for attempts aborted before the first token
+            kind, status = None, None
+        else:
+            info = classify(error)
+            kind, status = info.kind, info.status
+        entry.update(ok=False, error=type(error).__name__ if error is not None else None, kind=kind,
+                     status=status, latency=round(time.time() - entry["ts"], 3))
+        self._ledger_write(entry, partial if partial.usage else None)
+
+    @staticmethod
+    def _context_hash(context_id: Optional[str]) -> Optional[str]:
+        if not context_id:
+            return None
+        import hashlib
+        return hashlib.sha256(context_id.encode('utf-8')).hexdigest()
+
+    def _call_info(self, provider: str, model: Optional[str], chain: List[str], kwargs: Dict[str, Any],
+                   stream: bool = False) -> Optional[CallInfo]:
+        # A per-call `context` lets one shared client attribute calls to different targets
+        context_id = self._context_hash(kwargs["context"]) if kwargs.get("context") else self.context_id
+        context = context_id[:12] if context_id else None
+        budget = RetryBudget(kwargs.get("retry_budget", self.retry_config["budget_seconds"]))
+        return CallInfo(provider, model, chain, kwargs.get("role"), context, stream, budget,
+                        kwargs.get("deadline"), kwargs.get("cancel"))
+
+    def _log_attempt(self, call: Optional[CallInfo], p_to_try: str, attempt: int, started: float,
+                     queued: float, result: Any = None, error: Optional[BaseException] = None,
+                     info: Optional[ErrorInfo] = None, backoff: Optional[float] = None):
+        """
+        Appends one ledger entry per provider attempt. A successful stream attempt has only
+        reached its first token here; its entry is completed by `_stream_complete`
+        (or `_stream_abort` if it stops early).
+        """
+        if call is None or self.ledger is None:
+            return
+        elapsed = round(time.time() - started, 3)
+        entry = {
+            "ts": round(started, 3),
+            "provider": p_to_try,
+            "model": self._resolve_model(p_to_try, call.model if p_to_try == call.provider else None, {}),
+            "role": call.role,
+            "ctx": call.context,
+            "attempt": attempt + 1,
+            "hop": call.chain.index(p_to_try) if p_to_try in call.chain else None,
+            "queue": round(queued, 3) if queued else None,
+            "ok": error is None,
+            "error": type(error).__name__ if error is not None else None,
+            "kind": info.kind if info is not None else None,
+            "status": info.status if info is not None else None,
+            "backoff": round(backoff, 3) if backoff else None,
+        }
+        if error is None and call.stream:
+            entry["ttft"] = elapsed
+            call.open[p_to_try] = entry
+            return
+        entry["latency"] = elapsed
+        self._ledger_write(entry, result if isinstance(result, LLMResponse) else None)
+
+    def _ledger_write(self, entry: Dict[str, Any], response: Optional[LLMResponse]):
+        if response is not None:
+            entry["model"] = response.model
+            usage = response.usage
+            if usage:
+                cost = estimate_cost(response.model, usage, self._get_provider_config(response.provider))
+                entry.update({
+                    "in": usage.prompt_tokens,
+                    "out": usage.completion_tokens,
+                    "cached": usage.cached_tokens or None,
+                    "cost": round(cost, 8) if cost is not None else None,
+                })
+        try:
+            self.ledger.append(entry)
+        except OSError as e:
+            print(f"[LLMClient] Could not write call ledger: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _end_span(span: Any, result: Any = None, error: Optional[BaseException] = None):
+        if isinstance(result, LLMResponse):
+            span.set(model=result.model, finish_reason=result.finish_reason)
+            if result.usage:
+                span.set(prompt_tokens=result.usage.prompt_tokens,
+                         completion_tokens=result.usage.completion_tokens,
+                         cached_tokens=result.usage.cached_tokens)
+        span.end(error)
+
+    # ------------------------------------------------------------------
+    # Fallback chain execution (serial, or hedged across providers)
+    # ------------------------------------------------------------------
+
+    def _with_retries(self, p_to_try: str, attempt_fn: Callable[[str], Any], max_retries: int,
+                      retry_delay: float, cancelled: Optional[threading.Event] = None,
+                      last_resort: bool = False, cost: Optional[Callable[[str], int]] = None,
+                      call: Optional[CallInfo] = None) -> Any:
+        """
+        Runs attempt_fn against one provider with jittered backoff; raises once it gives up.
+        Each attempt first queues for the provider's RPM/TPM budget; queue time is not counted
+        as provider latency. Every attempt that reaches the provider is ledgered via `call`.
+        """
+        last_error = None
+        tokens = cost(p_to_try) if cost else 0
+        backoff = Backoff(retry_delay, self.retry_config["max_delay"])
+        for attempt in range(max_retries):
+            if cancelled is not None and cancelled.is_set():
+                raise HedgeCancelled(p_to_try)
+            self._check_call(call)
+            if not self.health.allow(p_to_try) and not last_resort:
+                # Circuit opened (possibly by our own failures): surface the real error if we have one
+                raise last_error or CircuitOpenError(p_to_try)
+            queued = self._admit(p_to_try, tokens)
+            aborted = self._aborted(call)
+            if aborted is not None or (cancelled is not None and cancelled.is_set()):
+                self.rate_limiter.release(p_to_try, tokens)
+                self.health.release(p_to_try)
+                raise aborted or HedgeCancelled(p_to_try)
+            span = self.tracer.start_span("llm.attempt", provider=p_to_try, attempt=attempt + 1,
+                                          queued=round(queued, 3), hedged=cancelled is not None)
+            attempt_start = time.time()
+            try:
+                with self.tracer.activate(span):
+                    result = attempt_fn(p_to_try)
+            except (ContextWindowError, ReplayMissError):
+                # Rejected locally: says nothing about the provider's health, retrying cannot help
+                self.rate_limiter.release(p_to_try, tokens)
+                self.health.release(p_to_try)
+                raise
+            except Exception as e:
+                aborted = e if isinstance(e, CallAborted) else self._aborted(call)
+                if aborted is not None:
+                    # The caller gave up (or the SDK timed out on its behalf): not the provider's fault
+                    self._log_attempt(call, p_to_try, attempt, attempt_start, queued, error=aborted)
+                    self.health.release(p_to_try)
+                    if aborted is e:
+                        raise
+                    raise aborted from e
+                last_error = e
+                info = self._on_failure(p_to_try, e, attempt_start)
+                delay = self._retry_delay(p_to_try, attempt, max_retries, e, info, backoff, call)
+                self._log_attempt(call, p_to_try, attempt, attempt_start, queued, error=e, info=info, backoff=delay)
+                if delay is None:
+                    raise
+                with self.tracer.span("llm.backoff", provider=p_to_try, seconds=round(delay, 3), reason=info.kind,
+                                      retry_after=info.retry_after):
+                    self._sleep(delay, call)
+                continue
+            elapsed = time.time() - attempt_start
+            self._latency.record(p_to_try, elapsed)
+            self.health.record_success(p_to_try, elapsed)
+            self._settle(p_to_try, tokens, result)
+            self._log_attempt(call, p_to_try, attempt, attempt_start, queued, result=result)
+            self._end_span(span, result)
+            return result
+
+    def _run_chain(self, providers_to_try: List[str], attempt_fn: Callable[[str], Any], max_retries: int,
+                   retry_delay: float, hedge: bool = False,
+                   discard: Optional[Callable[[Any], None]] = None,
+                   cost: Optional[Callable[[str], int]] = None,
+                   call: Optional[CallInfo] = None) -> Tuple[str, Any, List[str]]:
+        """Returns (provider, result, failed_providers) for the first provider that succeeds."""
+        if hedge and len(providers_to_try) > 1:
+            return self._run_hedged(providers_to_try, attempt_fn, max_retries, retry_delay, discard, cost, call)
+
+        failed = []
+        last_exception = None
+        for p_to_try in providers_to_try:
+            try:
+                last_resort = p_to_try == providers_to_try[-1]
+                return p_to_try, self._with_retries(p_to_try, attempt_fn, max_retries, retry_delay,
+                                                    last_resort=last_resort, cost=cost, call=call), failed
+            except CallAborted:
+                raise
+            except Exception as e:
+                last_exception = e
+                failed.append(p_to_try)
+                self._log_fallback(p_to_try, providers_to_try, e)
+
+        # If all providers exhausted
+        raise last_exception
+
+    def _run_hedged(self, providers_to_try: List[str], attempt_fn: Callable[[str], Any], max_retries: int,
+                    retry_delay: float, discard: Optional[Callable[[Any], None]] = None,
+                    cost: Optional[Callable[[str], int]] = None,
+                    call: Optional[CallInfo] = None) -> Tuple[str, Any, List[str]]:
+        """
+        Races the fallback chain: if the newest lane has not answered within its hedge delay,
+        the next provider is fired in parallel. First success wins; losing lanes stop before
+        their next retry and any late result is handed to `discard` (e.g. to close a stream).
+        """
+        queue = list(providers_to_try)
+        cancelled = threading.Event()
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1 + self.hedge_policy.max_hedges, thread_name_prefix="llm-hedge"
+        )
+        lanes: Dict[concurrent.futures.Future, str] = {}
+        failed: List[str] = []
+        last_exception = None
+
+        def launch():
+            p_to_try = queue.pop(0)
+            # Lanes run on worker threads; copy the context so their spans nest under this call
+            future = executor.submit(contextvars.copy_context().run, self._with_retries, p_to_try, attempt_fn,
+                                     max_retries, retry_delay, cancelled, not queue, cost, call)
+            lanes[future] = p_to_try
+            return p_to_try
+
+        def discard_late(future):
+            if discard and not future.cancelled() and future.exception() is None:
+                discard(future.result())
+
+        try:
+            leader = launch()
+            while lanes:
+                can_hedge = bool(queue) and len(lanes) <= self.hedge_policy.max_hedges
+                timeout = self.hedge_policy.delay_for(leader) if can_hedge else None
+                done, _ = concurrent.futures.wait(lanes, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                if not done:
+                    print(f"[LLMClient] ⏱️  {leader} silent for {timeout:.1f}s. Hedging with {queue[0]}...", file=sys.stderr)
+                    leader = launch()
+                    continue
+
+                winner = None
+                for future in done:
+                    p_to_try = lanes.pop(future)
+                    if isinstance(future.exception(), CallAborted):
+                        raise future.exception()
+                    if future.exception() is not None:
+                        last_exception = future.exception()
+                        failed.append(p_to_try)
+                    elif winner is None:
+                        winner = (p_to_try, future.result())
+                    else:
+                        discard_late(future)
+                if winner:
+                    cancelled.set()
+                    for loser in lanes:
+                        loser.add_done_callback(discard_late)
+                    return winner[0], winner[1], failed
+
+                if not lanes and queue:
+                    self._log_fallback(failed[-1], providers_to_try)
+                    leader = launch()
+
+            raise last_exception
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _awith_retries(self, p_to_try: str, attempt_fn: Callable[[str], Awaitable[Any]],
+                             max_retries: int, retry_delay: float, last_resort: bool = False,
+                             cost: Optional[Callable[[str], int]] = None,
+                             call: Optional[CallInfo] = None) -> Any:
+        last_error = None
+        tokens = cost(p_to_try) if cost else 0
+        backoff = Backoff(retry_delay, self.retry_config["max_delay"])
+        for attempt in range(max_retries):
+            self._check_call(call)
+            if not self.health.allow(p_to_try) and not last_resort:
+                raise last_error or CircuitOpenError(p_to_try)
+            try:
+                queued = await self._aadmit(p_to_try, tokens)
+            except asyncio.CancelledError:
+                self.health.release(p_to_try)
+                raise
+            aborted = self._aborted(call)
+            if aborted is not None:
+                self.rate_limiter.release(p_to_try, tokens)
+                self.health.release(p_to_try)
+                raise aborted
+            span = self.tracer.start_span("llm.attempt", provider=p_to_try, attempt=attempt + 1,
+                                          queued=round(queued, 3))
+            attempt_start = time.time()
+            try:
+                with self.tracer.activate(span):
+                    result = await attempt_fn(p_to_try)
+            except asyncio.CancelledError as e:
+                # Already sent, so it may still be billed (e.g. a losing hedge lane)
+                self._log_attempt(call, p_to_try, attempt, attempt_start, queued, error=e)
+                self.health.release(p_to_try)
+                raise
+            except (ContextWindowError, ReplayMissError):
+                self.rate_limiter.release(p_to_try, tokens)
+                self.health.release(p_to_try)
+                raise
+            except Exception as e:
+                aborted = e if isinstance(e, CallAborted) else self._aborted(call)
+                if aborted is not None:
+                    self._log_attempt(call, p_to_try, attempt, attempt_start, queued, error=aborted)
+                    self.health.release(p_to_try)
+                    if aborted is e:
+                        raise
+                    raise aborted from e
+                last_error = e
+                info = self._on_failure(p_to_try, e, attempt_start)
+                delay = self._retry_delay(p_to_try, attempt, max_retries, e, info, backoff, call)
+                self._log_attempt(call, p_to_try, attempt, attempt_start, queued, error=e, info=info, backoff=delay)
+                if delay is None:
+                    raise
+                with self.tracer.span("llm.backoff", provider=p_to_try, seconds=round(delay, 3), reason=info.kind,
+                                      retry_after=info.retry_after):
+                    await self._asleep(delay, call)
+                continue
+            elapsed = time.time() - attempt_start
+            self._latency.record(p_to_try, elapsed)
+            self.health.record_success(p_to_try, elapsed)
+            self._settle(p_to_try, tokens, result)
+            self._log_attempt(call, p_to_try, attempt, attempt_start, queued, result=result)
+            self._end_span(span, result)
+            return result
+
+    async def _arun_chain(self, providers_to_try: List[str], attempt_fn: Callable[[str], Awaitable[Any]],
+                          max_retries: int, retry_delay: float, hedge: bool = False,
+                          discard: Optional[Callable[[Any], None]] = None,
+                          cost: Optional[Callable[[str], int]] = None,
+                          call: Optional[CallInfo] = None) -> Tuple[str, Any, List[str]]:
+        if hedge and len(providers_to_try) > 1:
+            return await self._arun_hedged(providers_to_try, attempt_fn, max_retries, retry_delay, discard, cost, call)
+
+        failed = []
+        last_exception = None
+        for p_to_try in providers_to_try:
+            try:
+                last_resort = p_to_try == providers_to_try[-1]
+                return p_to_try, await self._awith_retries(p_to_try, attempt_fn, max_retries, retry_delay,
+                                                           last_resort=last_resort, cost=cost, call=call), failed
+            except CallAborted:
+                raise
+            except Exception as e:
+                last_exception = e
+                failed.append(p_to_try)
+                self._log_fallback(p_to_try, providers_to_try, e)
+
+        raise last_exception
+
+    async def _arun_hedged(self, providers_to_try: List[str], attempt_fn: Callable[[str], Awaitable[Any]],
+                           max_retries: int, retry_delay: float,
+                           discard: Optional[Callable[[Any], None]] = None,
+                           cost: Optional[Callable[[str], int]] = None,
+                           call: Optional[CallInfo] = None) -> Tuple[str, Any, List[str]]:
+        """Async hedging: losing lanes are cancelled outright rather than abandoned."""
+        queue = list(providers_to_try)
+        lanes: Dict[asyncio.Task, str] = {}
+        failed: List[str] = []
+        last_exception = None
+
+        def launch():
+            p_to_try = queue.pop(0)
+            lanes[asyncio.ensure_future(
+                self._awith_retries(p_to_try, attempt_fn, max_retries, retry_delay, last_resort=not queue,
+                                    cost=cost, call=call)
+            )] = p_to_try
+            return p_to_try
+
+        try:
+            leader = launch()
+            while lanes:
+                can_hedge = bool(queue) and len(lanes) <= self.hedge_policy.max_hedges
+                timeout = self.hedge_policy.delay_for(leader) if can_hedge else None
+                done, _ = await asyncio.wait(lanes, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"[LLMClient] ⏱️  {leader} silent for {timeout:.1f}s. Hedging with {queue[0]}...", file=sys.stderr)
+                    leader = launch()
+                    continue
+
+                winner = None
+                for task in done:
+                    p_to_try = lanes.pop(task)
+                    if isinstance(task.exception(), CallAborted):
+                        raise task.exception()
+                    if task.exception() is not None:
+                        last_exception = task.exception()
+                        failed.append(p_to_try)
+                    elif winner is None:
+                        winner = (p_to_try, task.result())
+                    elif discard:
+                        discard(task.result())
+                if winner:
+                    return winner[0], winner[1], failed
+
+                if not lanes and queue:
+                    self._log_fallback(failed[-1], providers_to_try)
+                    leader = launch()
+
+            raise last_exception
+        finally:
+            for task in lanes:
+                task.cancel()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
     def chat(self, 
              messages: List[Dict[str, str]], 
              provider: Optional[str] = None,
@@ -124,74 +925,286 @@ class LLMClient:
              base_url: Optional[str] = None,
              **kwargs) -> LLMResponse:
         
-        provider = provider or self.config.get("provider", {}).get("default", "openai")
+        provider = provider or self._default_provider()
+        messages = arrange_messages(messages)
+        kwargs = self._bind_controls(kwargs)
         max_retries = kwargs.get("max_retries", 3)
         retry_delay = kwargs.get("retry_delay", 2)
 
-        # Priority list for fallback: order of reliability/capability
-        fallback_chain = ["deepseek", "dashscope", "siliconflow", "gemini", "openai"]
+        span = self.tracer.start_span("llm.chat", provider=provider, role=kwargs.get("role"))
+        key = self._cache_key_for(messages, provider, model, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                span.set(cache_hit=True)
+                span.end()
+                return cached
 
-        # Apply sticky override if exists for this context
         original_provider = provider
-        if provider in self._overrides:
-            provider = self._overrides[provider]
-        
-        # Determine starting index in the fallback chain
-        try:
-            start_idx = fallback_chain.index(provider)
-            current_providers_to_try = fallback_chain[start_idx:]
-            if provider not in fallback_chain:
-                current_providers_to_try = [provider] + fallback_chain
-        except ValueError:
-            current_providers_to_try = [provider] + fallback_chain
+        providers_to_try = self._provider_plan(provider)
 
-        last_exception = None
-        successful_provider = None
+        def attempt(p_to_try):
+            actual_model, actual_key = self._attempt_args(p_to_try, original_provider, model, api_key)
+            return self._chat_internal(messages, p_to_try, actual_model, actual_key, base_url, **kwargs)
 
-        for p_to_try in current_providers_to_try:
-            for attempt in range(max_retries):
-                try:
-                    # CRITICAL: Only use passed-in model/key if we are exactly on the original provider
-                    # and no sticky override happened. Otherwise, use provider defaults.
-                    if p_to_try == original_provider and provider == original_provider:
-                        actual_model = model
-                        actual_key = api_key
-                    else:
-                        actual_model = None
-                        actual_key = None
-                    
-                    response = self._chat_internal(messages, p_to_try, actual_model, actual_key, base_url, **kwargs)
-                    successful_provider = p_to_try
-                    
-                    # If we used a different provider than requested, save it as sticky
-                    if successful_provider != original_provider:
-                        self._save_state(original_provider, successful_provider)
-                    
-                    return response
-                except Exception as e:
-                    last_exception = e
-                    is_last_attempt = (attempt == max_retries - 1)
-                    error_msg = str(e).lower()
-                    
-                    # Log retry attempt to stderr for visibility
-                    import sys
-                    print(f"[LLMClient] Attempt {attempt+1}/{max_retries} failed for {p_to_try}: {e}", file=sys.stderr)
-
-                    if any(x in error_msg for x in ["404", "invalid_api_key", "permission_denied", "authentication"]):
-                        break # Go to next provider immediately for fatal config errors
-                    
-                    if is_last_attempt:
-                        break # Go to next provider
-                    
-                    time.sleep(retry_delay * (2 ** attempt))
-            
-            # If we reached here without returning, it means p_to_try exhausted all retries
-            if p_to_try != current_providers_to_try[-1]:
-                next_p = current_providers_to_try[current_providers_to_try.index(p_to_try)+1]
-                print(f"[LLMClient] ⚠️  Provider {p_to_try} failed completely. Falling back to {next_p}...", file=sys.stderr)
-        
-        # If all providers exhausted
-        raise last_exception
+        with self.tracer.activate(span):
+            p_used, response, failed = self._run_chain(
+                providers_to_try, attempt, max_retries, retry_delay, hedge=self._hedge_enabled(kwargs),
+                cost=functools.partial(self._estimate_cost, messages, kwargs),
+                call=self._call_info(provider, model, providers_to_try, kwargs)
+            )
+        span.set(provider_used=p_used, fallbacks=len(failed))
+        self._end_span(span, response)
+        self._cache_store(key, response)
+        return response
+
+    def chat_stream(self,
+                    messages: List[Dict[str, str]],
+                    provider: Optional[str] = None,
+                    model: Optional[str] = None,
+                    api_key: Optional[str] = None,
+                    base_url: Optional[str] = None,
+                    **kwargs) -> LLMStream:
+        """
+        Streaming variant of `chat`.
+
+        Retries, hedging and the fallback chain apply until the first token arrives;
+        after that the stream is committed to the provider that produced it.
+        Iterate the returned `LLMStream` for text deltas, then read
+        `stream.response` for the aggregated content and `Usage`.
+        """
+        provider = provider or self._default_provider()
+        messages = arrange_messages(messages)
+        kwargs = self._bind_controls(kwargs)
+        max_retries = kwargs.get("max_retries", 3)
+        retry_delay = kwargs.get("retry_delay", 2)
+        started_at = time.time()
+
+        span = self.tracer.start_span("llm.chat_stream", provider=provider, role=kwargs.get("role"))
+        key = self._cache_key_for(messages, provider, model, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                span.set(cache_hit=True)
+                span.end()
+                return self._cached_stream(cached, started_at)
+
+        original_provider = provider
+        providers_to_try = self._provider_plan(provider)
+
+        def attempt(p_to_try):
+            actual_model, actual_key = self._attempt_args(p_to_try, original_provider, model, api_key)
+            chunks = self._stream_internal(messages, p_to_try, actual_model, actual_key, base_url, **kwargs)
+            return actual_model, _prefetch_first_token(chunks), chunks
+
+        cost = functools.partial(self._estimate_cost, messages, kwargs)
+        call = self._call_info(provider, model, providers_to_try, kwargs, stream=True)
+        with self.tracer.activate(span):
+            p_used, (actual_model, head, chunks), failed = self._run_chain(
+                providers_to_try, attempt, max_retries, retry_delay,
+                hedge=self._hedge_enabled(kwargs), discard=lambda result: result[2].close(), cost=cost, call=call
+            )
+        # The span stays open until the last chunk (or the stream stops early), so it covers the whole generation
+        span.set(provider_used=p_used, fallbacks=len(failed), ttft=round(time.time() - started_at, 3))
+        return LLMStream(
+            _chain(head, chunks),
+            provider=p_used,
+            model=self._resolve_model(p_used, actual_model, kwargs),
+            started_at=started_at,
+            on_complete=functools.partial(self._stream_complete, key, cost, call, span),
+            on_abort=functools.partial(self._stream_abort, cost, call, span)
+        )
+
+    def _batch_params(self, concurrency: Optional[int], timeout: Optional[float]) -> Tuple[int, Optional[float]]:
+        batch_cfg = dict(DEFAULT_BATCH_CONFIG)
+        batch_cfg.update(self.config.get("batch", {}))
+        concurrency = concurrency or batch_cfg["concurrency"]
+        timeout = batch_cfg["timeout"] if timeout is None else timeout
+        return max(1, int(concurrency)), timeout or None
+
+    def chat_many(self,
+                  requests: List[BatchRequest],
+                  concurrency: Optional[int] = None,
+                  timeout: Optional[float] = None,
+                  **defaults) -> BatchResult:
+        """
+        Runs many `chat` calls with bounded concurrency.
+
+        Each request is an `LLMRequest` or a dict of `chat` kwargs (`messages`, `provider`,
+        `model`, ..., optionally its own `timeout`); `defaults` apply to every request that
+        does not override them. Results come back in input order; a failed or overdue
+        request yields a `BatchItem` carrying its error instead of failing the batch.
+        """
+        concurrency, timeout = self._batch_params(concurrency, timeout)
+        # The batch links its own per-request tokens to the caller's, so it is not a per-call default
+        cancel = defaults.pop("cancel", None)
+        return run_batch(lambda **kwargs: self.chat(**{**defaults, **kwargs}), requests, concurrency, timeout, cancel)
+
+    async def achat_many(self,
+                         requests: List[BatchRequest],
+                         concurrency: Optional[int] = None,
+                         timeout: Optional[float] = None,
+                         **defaults) -> BatchResult:
+        """Async twin of `chat_many`; overdue requests are cancelled."""
+        concurrency, timeout = self._batch_params(concurrency, timeout)
+        return await arun_batch(lambda **kwargs: self.achat(**{**defaults, **kwargs}), requests, concurrency, timeout)
+
+    def _sampling_params(self, provider: str, kwargs: Dict[str, Any]) -> Tuple[float, int]:
+        cfg = self._get_provider_config(provider)
+        temperature = kwargs.get("temperature", cfg.get("temperature", 0.7))
+        max_tokens = kwargs.get("max_tokens", cfg.get("max_tokens", 2048))
+        return temperature, max_tokens
+
+    @staticmethod
+    def _gemini_system(messages: List[Dict[str, str]]) -> Optional[str]:
+        system = [msg.get("content") for msg in messages if msg.get("role") == "system"]
+        return "\n\n".join(system) if system else None
+
+    def _gemini_handle(self, client: Any, model: str, messages: List[Dict[str, str]],
+                       api_key: Optional[str]) -> Optional[str]:
+        owner = api_key or self._resolve_api_key("gemini")
+        return self.prompt_cache.gemini_handle(client, model, self._gemini_system(messages), owner)
+
+    async def _agemini_handle(self, client: Any, model: str, messages: List[Dict[str, str]],
+                              api_key: Optional[str]) -> Optional[str]:
+        owner = api_key or self._resolve_api_key("gemini")
+        return await self.prompt_cache.agemini_handle(client, model, self._gemini_system(messages), owner)
+
+    def _gemini_request(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+                        cached_content: Optional[str] = None,
+                        timeout: Optional[float] = None) -> Tuple[List[Any], Any]:
+        """
+        Builds (contents, GenerateContentConfig) for the native Gemini SDK: one Content per
+        turn, so the conversation keeps its structure and a stable prefix stays cacheable.
+        With a `cached_content` handle the system instruction is served from Gemini's context cache.
+        """
+        from google.genai import types
+
+        system_instruction = self._gemini_system(messages)
+        turns = self._gemini_turns(messages)
+        if not turns and system_instruction and not cached_content:
+            # A system-only request has nothing to answer; send the instruction as the user turn
+            turns, system_instruction = [("user", system_instruction)], None
+        contents = [types.Content(role=role, parts=[types.Part(text=text)]) for role, text in turns]
+
+        # Configure generation options
+        config_args = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens
+        }
+        if timeout is not None:
+            config_args["http_options"] = types.HttpOptions(timeout=int(timeout * 1000))
+        if cached_content:
+            config_args["cached_content"] = cached_content
+        elif system_instruction:
+            config_args["system_instruction"] = system_instruction
+
+        return contents, types.GenerateContentConfig(**config_args)
+
+    @staticmethod
+    def _gemini_turns(messages: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+        """
+        (role, text) turns for Gemini `contents`: assistant becomes "model", system messages
+        go to the system instruction, and consecutive turns of one role are merged because
+        Gemini expects user and model turns to alternate.
+        """
+        turns: List[Tuple[str, str]] = []
+        for msg in messages:
+            role = {"user": "user", "assistant": "model"}.get(msg.get("role"))
+            content = msg.get("content")
+            if role is None or not content:
+                continue
+            if turns and turns[-1][0] == role:
+                turns[-1] = (role, f"{turns[-1][1]}\n\n{content}")
+            else:
+                turns.append((role, content))
+        return turns
+
+    @staticmethod
+    def _gemini_usage(response: Any) -> Optional[Usage]:
+        meta = getattr(response, "usage_metadata", None)
+        if not meta or meta.total_token_count is None:
+            return None
+        return Usage(
+            prompt_tokens=meta.prompt_token_count or 0,
+            completion_tokens=meta.candidates_token_count or 0,
+            total_tokens=meta.total_token_count,
+            cached_tokens=getattr(meta, "cached_content_token_count", None) or 0
+        )
+
+    @staticmethod
+    def _gemini_finish_reason(response: Any) -> Optional[str]:
+        """Gemini's FinishReason in OpenAI terms ("stop", "length", "content_filter")."""
+        candidates = getattr(response, "candidates", None)
+        reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+        if reason is None:
+            return None
+        name = getattr(reason, "name", str(reason)).upper()
+        return GEMINI_FINISH_REASONS.get(name, name.lower())
+
+    @staticmethod
+    def _gemini_text(response: Any) -> str:
+        # Manually extract content to suppress "non-text parts" warning for Thinking models
+        if response.candidates and response.candidates[0].content and response.candidates[0].content.parts:
+            return "".join(
+                part.text for part in response.candidates[0].content.parts 
+                if part.text
+            )
+        return ""
+
+    @staticmethod
+    def _openai_usage(response: Any) -> Optional[Usage]:
+        if hasattr(response, 'usage') and response.usage:
+            return Usage(
+                prompt_tokens=response.usage.prompt_tokens,
+                completion_tokens=response.usage.completion_tokens,
+                total_tokens=response.usage.total_tokens,
+                cached_tokens=LLMClient._openai_cached_tokens(response.usage)
+            )
+        return None
+
+    @staticmethod
+    def _openai_cached_tokens(usage: Any) -> int:
+        # DeepSeek reports prefix-cache hits at the top level; OpenAI-compatible
+        # providers (OpenAI, DashScope, SiliconFlow) under prompt_tokens_details
+        hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        if hit is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit = getattr(details, "cached_tokens", None) if details else None
+        return hit or 0
+
+    @staticmethod
+    def _openai_chunk(event: Any) -> StreamChunk:
+        delta = ""
+        finish_reason = None
+        if event.choices:
+            choice = event.choices[0]
+            if choice.delta and choice.delta.content:
+                delta = choice.delta.content
+            finish_reason = choice.finish_reason
+        return StreamChunk(delta=delta, usage=LLMClient._openai_usage(event), finish_reason=finish_reason)
+
+    def _openai_kwargs(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Merge arguments, prioritizing kwargs
+        api_kwargs = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        # Add other optional params from kwargs
+        for k, v in kwargs.items():
+            if k not in api_kwargs and k not in CONTROL_KWARGS:
+                api_kwargs[k] = v
+        timeout = self._sdk_timeout(kwargs)
+        if timeout is not None:
+            api_kwargs["timeout"] = timeout
+        return api_kwargs
+
+    def _replay_fingerprint(self, messages: List[Dict[str, str]], provider: str, model: str,
+                            temperature: float, max_tokens: int, kwargs: Dict[str, Any]) -> str:
+        return cache_key(messages, provider, model, dict(kwargs, temperature=temperature, max_tokens=max_tokens))
 
     def _chat_internal(self, 
                       messages: List[Dict[str, str]], 
@@ -201,71 +1214,44 @@ class LLMClient:
                       base_url: Optional[str] = None,
                       **kwargs) -> LLMResponse:
         
-        provider = provider or self.config.get("provider", {}).get("default", "openai")
-        cfg = self._get_provider_config(provider)
-        
-        model = model or kwargs.get("model") or cfg.get("model")
-        temperature = kwargs.get("temperature", cfg.get("temperature", 0.7))
-        max_tokens = kwargs.get("max_tokens", cfg.get("max_tokens", 2048))
-        
-        # Gemini V2 SDK Path (Only if not using OpenAI compatibility)
-        if provider == "gemini" and (not cfg.get("base_url") or "/openai" not in cfg.get("base_url")):
-            from google.genai import types
-            client = self._get_client("gemini")
-            
-            # Construct prompt from messages
-            prompt = ""
-            system_instruction = None
-            for msg in messages:
-                role = msg.get("role")
-                content = msg.get("content")
-                if role == "system":
-                    system_instruction = content
-                elif role == "user":
-                    prompt += f"User: {content}\n"
-                elif role == "assistant":
-                    prompt += f"Model: {content}\n"
-            
-            # Configure generation options
-            config_args = {
-                "temperature": temperature,
-                "max_output_tokens": max_tokens
-            }
-            if system_instruction:
-                config_args["system_instruction"] = system_instruction
+        provider = provider or self._default_provider()
+        model = self._resolve_model(provider, model, kwargs)
+        temperature, max_tokens = self._sampling_params(provider, kwargs)
+        max_tokens = self._preflight(provider, model, messages, max_tokens)
+        with self.tracer.span("llm.request", provider=provider, model=model, max_tokens=max_tokens):
+            if self.replay is None:
+                return self._chat_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+            fingerprint = self._replay_fingerprint(messages, provider, model, temperature, max_tokens, kwargs)
+            if self.replay.replaying:
+                return self.replay.play(fingerprint, provider, model, kwargs.get("role"))
+            started = time.time()
+            response = self._chat_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+            self.replay.record(fingerprint, kwargs.get("role"), response, time.time() - started)
+            return response
 
-            generate_config = types.GenerateContentConfig(**config_args)
+    def _chat_send(self, messages: List[Dict[str, str]], provider: str, model: str, temperature: float,
+                   max_tokens: int, api_key: Optional[str], base_url: Optional[str],
+                   kwargs: Dict[str, Any]) -> LLMResponse:
+        # Gemini V2 SDK Path (Only if not using OpenAI compatibility)
+        if self._is_native_gemini(provider):
+            client = self._get_client("gemini", api_key=api_key)
+            handle = self._gemini_handle(client, model, messages, api_key)
+            contents, generate_config = self._gemini_request(messages, temperature, max_tokens, handle,
+                                                                  self._sdk_timeout(kwargs))
 
             try:
                 response = client.models.generate_content(
                     model=model,
-                    contents=prompt,
+                    contents=contents,
                     config=generate_config
                 )
-                
-                usage = None
-                if response.usage_metadata:
-                     usage = Usage(
-                        prompt_tokens=response.usage_metadata.prompt_token_count,
-                        completion_tokens=response.usage_metadata.candidates_token_count,
-                        total_tokens=response.usage_metadata.total_token_count
-                    )
-
-                # Manually extract content to suppress "non-text parts" warning for Thinking models
-                content_text = ""
-                if response.candidates and response.candidates[0].content.parts:
-                    content_text = "".join(
-                        part.text for part in response.candidates[0].content.parts 
-                        if part.text
-                    )
-
                 return LLMResponse(
-                    content=content_text,
+                    content=self._gemini_text(response),
                     model=model,
                     provider=provider,
-                    usage=usage,
-                    finish_reason="stop", 
-                    raw=response
+                    usage=self._gemini_usage(response),
+                    finish_reason=self._gemini_finish_reason(response) or "stop",
+                    raw=retain_raw(response, self.raw_mode)
                 )
             except Exception as e:
                 # Provide a more helpful error if 404 persists
@@ -274,128 +1260,343 @@ class LLMClient:
                 raise e
 
         # Standard OpenAI Client Path
-        # Determine client to use
-        if api_key or base_url:
-            # Create a temporary client for this request
-            current_cfg = self._get_provider_config(provider)
-            final_api_key = api_key or os.path.expandvars(current_cfg.get("api_key", ""))
-            # Handle placeholder
-            if final_api_key.startswith("${") and final_api_key.endswith("}"):
-                final_api_key = os.environ.get(final_api_key[2:-1], "")
-            
-            final_base_url = base_url or current_cfg.get("base_url")
-            client = OpenAI(api_key=final_api_key, base_url=final_base_url)
-        else:
-            client = self._get_client(provider)
-        
-        # Merge arguments, prioritizing kwargs
-        api_kwargs = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }
-        # Add other optional params from kwargs
-        for k, v in kwargs.items():
-            if k not in api_kwargs:
-                api_kwargs[k] = v
-
+        client = self._get_client(provider, api_key=api_key, base_url=base_url)
+        api_kwargs = self._openai_kwargs(messages, model, temperature, max_tokens, kwargs)
         response = client.chat.completions.create(**api_kwargs)
         
         choice = response.choices[0]
-        usage = None
-        if hasattr(response, 'usage') and response.usage:
-            usage = Usage(
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens
-            )
-
         return LLMResponse(
             content=choice.message.content,
             model=model,
             provider=provider,
-            usage=usage,
+            usage=self._openai_usage(response),
             finish_reason=choice.finish_reason,
-            raw=response
+            raw=retain_raw(response, self.raw_mode)
         )
 
+    def _stream_internal(self,
+                         messages: List[Dict[str, str]],
+                         provider: Optional[str] = None,
+                         model: Optional[str] = None,
+                         api_key: Optional[str] = None,
+                         base_url: Optional[str] = None,
+                         **kwargs) -> Iterator[StreamChunk]:
+        provider = provider or self._default_provider()
+        model = self._resolve_model(provider, model, kwargs)
+        temperature, max_tokens = self._sampling_params(provider, kwargs)
+        max_tokens = self._preflight(provider, model, messages, max_tokens)
+        if self.replay is None:
+            chunks = self._stream_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+        else:
+            fingerprint = self._replay_fingerprint(messages, provider, model, temperature, max_tokens, kwargs)
+            if self.replay.replaying:
+                chunks = self.replay.play_stream(fingerprint, provider, model, kwargs.get("role"))
+            else:
+                chunks = self.replay.record_stream(
+                    fingerprint, kwargs.get("role"), provider, model,
+                    self._stream_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+                )
+        yield from self._guarded(chunks, kwargs)
+
+    def _stream_send(self, messages: List[Dict[str, str]], provider: str, model: str, temperature: float,
+                     max_tokens: int, api_key: Optional[str], base_url: Optional[str],
+                     kwargs: Dict[str, Any]) -> Iterator[StreamChunk]:
+        if self._is_native_gemini(provider):
+            client = self._get_client("gemini", api_key=api_key)
+            handle = self._gemini_handle(client, model, messages, api_key)
+            contents, generate_config = self._gemini_request(messages, temperature, max_tokens, handle,
+                                                                  self._sdk_timeout(kwargs))
+            try:
+                stream = client.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=generate_config
+                )
+                with self._closed_on_cancel(stream, kwargs):
+                    for response in stream:
+                        yield StreamChunk(delta=self._gemini_text(response), usage=self._gemini_usage(response),
+                                          finish_reason=self._gemini_finish_reason(response))
+            except Exception as e:
+                if "404" in str(e):
+                    raise ValueError(f"Gemini Model '{model}' not found via google-genai SDK. Verify model ID validity.") from e
+                raise e
+            return
+
+        client = self._get_client(provider, api_key=api_key, base_url=base_url)
+        api_kwargs = self._openai_kwargs(messages, model, temperature, max_tokens, kwargs)
+        api_kwargs["stream"] = True
+        api_kwargs.setdefault("stream_options", {"include_usage": True})
+        stream = client.chat.completions.create(**api_kwargs)
+        with self._closed_on_cancel(stream, kwargs):
+            for event in stream:
+                yield self._openai_chunk(event)
+
     async def achat(self, 
                    messages: List[Dict[str, str]], 
                    provider: Optional[str] = None,
                    model: Optional[str] = None,
+                   api_key: Optional[str] = None,
+                   base_url: Optional[str] = None,
                    **kwargs) -> LLMResponse:
-        
-        provider = provider or self.config.get("provider", {}).get("default", "openai")
+        """Async twin of `chat`: same cache, health routing, rate limits, hedging and fallback chain, non-blocking backoff."""
+        provider = provider or self._default_provider()
+        messages = arrange_messages(messages)
+        kwargs = self._bind_controls(kwargs)
         max_retries = kwargs.get("max_retries", 3)
         retry_delay = kwargs.get("retry_delay", 2)
 
-        for attempt in range(max_retries):
-            try:
-                return await self._achat_internal(messages, provider, model, **kwargs)
-            except Exception as e:
-                is_last_attempt = (attempt == max_retries - 1)
-                error_msg = str(e).lower()
-                
-                if any(x in error_msg for x in ["404", "invalid_api_key", "permission_denied", "authentication"]):
-                    raise e
-                
-                if is_last_attempt:
-                    raise e
-                
-                import asyncio
-                await asyncio.sleep(retry_delay * (2 ** attempt))
+        span = self.tracer.start_span("llm.chat", provider=provider, role=kwargs.get("role"))
+        key = self._cache_key_for(messages, provider, model, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                span.set(cache_hit=True)
+                span.end()
+                return cached
+
+        original_provider = provider
+        providers_to_try = self._provider_plan(provider)
+
+        async def attempt(p_to_try):
+            actual_model, actual_key = self._attempt_args(p_to_try, original_provider, model, api_key)
+            return await self._achat_internal(messages, p_to_try, actual_model, actual_key, base_url, **kwargs)
+
+        with self.tracer.activate(span):
+            p_used, response, failed = await self._arun_chain(
+                providers_to_try, attempt, max_retries, retry_delay, hedge=self._hedge_enabled(kwargs),
+                cost=functools.partial(self._estimate_cost, messages, kwargs),
+                call=self._call_info(provider, model, providers_to_try, kwargs)
+            )
+        span.set(provider_used=p_used, fallbacks=len(failed))
+        self._end_span(span, response)
+        self._cache_store(key, response)
+        return response
+
+    async def achat_stream(self,
+                           messages: List[Dict[str, str]],
+                           provider: Optional[str] = None,
+                           model: Optional[str] = None,
+                           api_key: Optional[str] = None,
+                           base_url: Optional[str] = None,
+                           **kwargs) -> AsyncLLMStream:
+        """Async variant of `chat_stream`; await it, then `async for` over the deltas."""
+        provider = provider or self._default_provider()
+        messages = arrange_messages(messages)
+        kwargs = self._bind_controls(kwargs)
+        max_retries = kwargs.get("max_retries", 3)
+        retry_delay = kwargs.get("retry_delay", 2)
+        started_at = time.time()
+
+        span = self.tracer.start_span("llm.chat_stream", provider=provider, role=kwargs.get("role"))
+        key = self._cache_key_for(messages, provider, model, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                span.set(cache_hit=True)
+                span.end()
+                return self._cached_stream(cached, started_at, async_mode=True)
+
+        original_provider = provider
+        providers_to_try = self._provider_plan(provider)
+
+        async def attempt(p_to_try):
+            actual_model, actual_key = self._attempt_args(p_to_try, original_provider, model, api_key)
+            chunks = self._astream_internal(messages, p_to_try, actual_model, actual_key, base_url, **kwargs)
+            return actual_model, await _aprefetch_first_token(chunks), chunks
+
+        cost = functools.partial(self._estimate_cost, messages, kwargs)
+        call = self._call_info(provider, model, providers_to_try, kwargs, stream=True)
+        with self.tracer.activate(span):
+            p_used, (actual_model, head, chunks), failed = await self._arun_chain(
+                providers_to_try, attempt, max_retries, retry_delay,
+                hedge=self._hedge_enabled(kwargs), discard=lambda result: asyncio.ensure_future(result[2].aclose()),
+                cost=cost, call=call
+            )
+        span.set(provider_used=p_used, fallbacks=len(failed), ttft=round(time.time() - started_at, 3))
+        return AsyncLLMStream(
+            _achain(head, chunks),
+            provider=p_used,
+            model=self._resolve_model(p_used, actual_model, kwargs),
+            started_at=started_at,
+            on_complete=functools.partial(self._stream_complete, key, cost, call, span),
+            on_abort=functools.partial(self._stream_abort, cost, call, span)
+        )
 
     async def _achat_internal(self, 
                              messages: List[Dict[str, str]], 
                              provider: Optional[str] = None,
                              model: Optional[str] = None,
+                             api_key: Optional[str] = None,
+                             base_url: Optional[str] = None,
                              **kwargs) -> LLMResponse:
         
-        if provider == "gemini":
-             # Use sync implementation for now or implement proper async
-             # Since dialecta_debate.py uses ThreadPoolExecutor with sync 'chat', 
-             # 'achat' usage is minimal in current flow. 
-             # If needed, we can wrap sync in async or implement google.generativeai async.
-             # For safety in this refactor, we will raise/warn or implement strict async if pivotal.
-             # But 'dialecta_debate.py' calls 'client.chat' inside 'call_phase' which is sync.
-             # So 'achat' might not be critical right now. 
-             pass
+        provider = provider or self._default_provider()
+        model = self._resolve_model(provider, model, kwargs)
+        temperature, max_tokens = self._sampling_params(provider, kwargs)
+        max_tokens = self._preflight(provider, model, messages, max_tokens)
+        with self.tracer.span("llm.request", provider=provider, model=model, max_tokens=max_tokens):
+            if self.replay is None:
+                return await self._achat_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+            fingerprint = self._replay_fingerprint(messages, provider, model, temperature, max_tokens, kwargs)
+            if self.replay.replaying:
+                return await self.replay.aplay(fingerprint, provider, model, kwargs.get("role"))
+            started = time.time()
+            response = await self._achat_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+            self.replay.record(fingerprint, kwargs.get("role"), response, time.time() - started)
+            return response
 
-        cfg = self._get_provider_config(provider)
-        
-        model = model or kwargs.get("model") or cfg.get("model")
-        temperature = kwargs.get("temperature", cfg.get("temperature", 0.7))
-        max_tokens = kwargs.get("max_tokens", cfg.get("max_tokens", 2048))
-        
-        client = self._get_client(provider, async_mode=True)
-        
-        api_kwargs = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }
-        for k, v in kwargs.items():
-            if k not in api_kwargs:
-                api_kwargs[k] = v
+    async def _achat_send(self, messages: List[Dict[str, str]], provider: str, model: str, temperature: float,
+                          max_tokens: int, api_key: Optional[str], base_url: Optional[str],
+                          kwargs: Dict[str, Any]) -> LLMResponse:
+        # Gemini V2 SDK Path via the async `client.aio` surface
+        if self._is_native_gemini(provider):
+            client = self._get_client("gemini", async_mode=True, api_key=api_key)
+            handle = await self._agemini_handle(client, model, messages, api_key)
+            contents, generate_config = self._gemini_request(messages, temperature, max_tokens, handle,
+                                                                  self._sdk_timeout(kwargs))
 
+            try:
+                response = await client.aio.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=generate_config
+                )
+                return LLMResponse(
+                    content=self._gemini_text(response),
+                    model=model,
+                    provider=provider,
+                    usage=self._gemini_usage(response),
+                    finish_reason=self._gemini_finish_reason(response) or "stop",
+                    raw=retain_raw(response, self.raw_mode)
+                )
+            except Exception as e:
+                if "404" in str(e):
+                    raise ValueError(f"Gemini Model '{model}' not found via google-genai SDK. Verify model ID validity.") from e
+                raise e
+
+        client = self._get_client(provider, async_mode=True, api_key=api_key, base_url=base_url)
+        api_kwargs = self._openai_kwargs(messages, model, temperature, max_tokens, kwargs)
         response = await client.chat.completions.create(**api_kwargs)
         
         choice = response.choices[0]
-        usage = None
-        if hasattr(response, 'usage') and response.usage:
-            usage = Usage(
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens
-            )
-
         return LLMResponse(
             content=choice.message.content,
             model=model,
             provider=provider,
-            usage=usage,
+            usage=self._openai_usage(response),
             finish_reason=choice.finish_reason,
-            raw=response
+            raw=retain_raw(response, self.raw_mode)
         )
+
+    async def _astream_internal(self,
+                                messages: List[Dict[str, str]],
+                                provider: Optional[str] = None,
+                                model: Optional[str] = None,
+                                api_key: Optional[str] = None,
+                                base_url: Optional[str] = None,
+                                **kwargs) -> AsyncIterator[StreamChunk]:
+        provider = provider or self._default_provider()
+        model = self._resolve_model(provider, model, kwargs)
+        temperature, max_tokens = self._sampling_params(provider, kwargs)
+        max_tokens = self._preflight(provider, model, messages, max_tokens)
+        if self.replay is None:
+            chunks = self._astream_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+        else:
+            fingerprint = self._replay_fingerprint(messages, provider, model, temperature, max_tokens, kwargs)
+            if self.replay.replaying:
+                chunks = self.replay.aplay_stream(fingerprint, provider, model, kwargs.get("role"))
+            else:
+                chunks = self.replay.arecord_stream(
+                    fingerprint, kwargs.get("role"), provider, model,
+                    self._astream_send(messages, provider, model, temperature, max_tokens, api_key, base_url, kwargs)
+                )
+        if kwargs.get("cancel") is not None or kwargs.get("deadline") is not None:
+            chunks = self._aguarded(chunks, kwargs)
+        async for chunk in chunks:
+            yield chunk
+
+    async def _astream_send(self, messages: List[Dict[str, str]], provider: str, model: str, temperature: float,
+                            max_tokens: int, api_key: Optional[str], base_url: Optional[str],
+                            kwargs: Dict[str, Any]) -> AsyncIterator[StreamChunk]:
+        if self._is_native_gemini(provider):
+            client = self._get_client("gemini", async_mode=True, api_key=api_key)
+            handle = await self._agemini_handle(client, model, messages, api_key)
+            contents, generate_config = self._gemini_request(messages, temperature, max_tokens, handle,
+                                                                  self._sdk_timeout(kwargs))
+            try:
+                stream = await client.aio.models.generate_content_stream(
+                    model=model,
+                    contents=contents,
+                    config=generate_config
+                )
+                responses = self._aclosed_on_cancel(stream, kwargs)
+                try:
+                    async for response in responses:
+                        yield StreamChunk(delta=self._gemini_text(response), usage=self._gemini_usage(response),
+                                          finish_reason=self._gemini_finish_reason(response))
+                finally:
+                    await responses.aclose()
+            except Exception as e:
+                if "404" in str(e):
+                    raise ValueError(f"Gemini Model '{model}' not found via google-genai SDK. Verify model ID validity.") from e
+                raise e
+            return
+
+        client = self._get_client(provider, async_mode=True, api_key=api_key, base_url=base_url)
+        api_kwargs = self._openai_kwargs(messages, model, temperature, max_tokens, kwargs)
+        api_kwargs["stream"] = True
+        api_kwargs.setdefault("stream_options", {"include_usage": True})
+        stream = await client.chat.completions.create(**api_kwargs)
+        events = self._aclosed_on_cancel(stream, kwargs)
+        try:
+            async for event in events:
+                yield self._openai_chunk(event)
+        finally:
+            await events.aclose()
+
+
+def _prefetch_first_token(chunks: Iterator[StreamChunk]) -> List[StreamChunk]:
+    """Pulls chunks until the first non-empty delta so connection errors surface inside the retry loop."""
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if chunk.delta:
+            break
+    return head
+
+
+async def _aprefetch_first_token(chunks: AsyncIterator[StreamChunk]) -> List[StreamChunk]:
+    head = []
+    async for chunk in chunks:
+        head.append(chunk)
+        if chunk.delta:
+            break
+    return head
+
+
+def _chain(head: List[StreamChunk], chunks: Iterator[StreamChunk]) -> Iterator[StreamChunk]:
+    """The prefetched head, then the rest of the stream; closing it closes the provider stream."""
+    try:
+        yield from head
+        yield from chunks
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+async def _achain(head: List[StreamChunk], chunks: AsyncIterator[StreamChunk]) -> AsyncIterator[StreamChunk]:
+    try:
+        for chunk in head:
+            yield chunk
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        close = getattr(chunks, "aclose", None)
+        if close is not None:
+            await close()
+
+
+async def _aempty() -> AsyncIterator[StreamChunk]:
+    return
+    yield
@@ -0,0 +1,129 @@
+"""
+Deadlines and cancellation for LLM calls.
+
+Pass `deadline=<seconds or Deadline>` and/or `cancel=<CancelToken>` to any LLMClient call.
+The deadline covers the whole call (queueing, retries, backoff and fallback hops) and each
+request is sent with the remaining time as its SDK timeout. Cancelling the token stops the
+retry loop, interrupts backoff sleeps and closes open streams, so worker threads return
+promptly instead of generating tokens nobody will read.
+
+`CallInfo` carries both, with the rest of one call's shared context, through the retry loop.
+"""
+import time
+import threading
+from typing import Optional, List, Dict, Any, Callable, Union
+
+
+class CallAborted(Exception):
+    """The caller gave up on the call; never retried and never sent to a fallback provider."""
+
+
+class DeadlineExceeded(CallAborted, TimeoutError):
+    def __init__(self, seconds: float):
+        super().__init__(f"deadline of {seconds:.1f}s exceeded")
+        self.seconds = seconds
+
+
+class CallCancelled(CallAborted):
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Deadline:
+    """An absolute point in time, shared by every attempt of a call (or of several calls)."""
+
+    __slots__ = ("seconds", "expires_at")
+
+    def __init__(self, seconds: float):
+        self.seconds = float(seconds)
+        self.expires_at = time.monotonic() + self.seconds
+
+    @classmethod
+    def of(cls, value: Union[None, float, "Deadline"]) -> Optional["Deadline"]:
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded(self.seconds)
+
+
+class CancelToken:
+    """
+    Thread-safe, one-way cancellation flag. Resources that block (open streams, HTTP
+    responses) are registered with `on_cancel` so cancelling closes them right away.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # Closing an already broken connection must not mask the cancellation
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Runs `callback` on cancellation (immediately if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, seconds: float) -> bool:
+        """Sleeps up to `seconds`; returns True if cancelled meanwhile."""
+        return self._event.wait(seconds)
+
+    def check(self):
+        if self.cancelled:
+            raise CallCancelled(self.reason or "cancelled")
+
+
+class CallInfo:
+    """What every attempt of one public call shares, threaded through the retry loop."""
+
+    __slots__ = ("provider", "model", "chain", "role", "context", "stream", "open", "budget", "deadline", "cancel")
+
+    def __init__(self, provider: str, model: Optional[str], chain: List[str], role: Optional[str],
+                 context: Optional[str], stream: bool = False, budget: Any = None,
+                 deadline: Optional[Deadline] = None, cancel: Optional[CancelToken] = None):
+        self.provider = provider
+        self.model = model
+        self.chain = chain  # Provider plan; an attempt's position in it is its fallback hop
+        self.role = role
+        self.context = context
+        self.stream = stream
+        self.open: Dict[str, Dict[str, Any]] = {}  # provider -> stream entry awaiting its last chunk
+        self.budget = budget  # RetryBudget: backoff seconds left across providers and hedge lanes
+        self.deadline = deadline  # Deadline covering every attempt, backoff and fallback hop
+        self.cancel = cancel  # CancelToken the caller may trip to abort the call
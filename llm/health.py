@@ -0,0 +1,273 @@
+import time
+import atexit
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Any
+
+from .state import StateStore
+
+STATE_NAMESPACE = "health"
+
+# Circuit breaker defaults; overridable via the "health" block in config.json
+DEFAULT_HEALTH_CONFIG = {
+    "ewma_alpha": 0.3,          # Weight of the newest observation in latency / error EWMAs
+    "failure_threshold": 3,     # Consecutive failures that open the circuit
+    "open_seconds": 60,         # Initial cool-down before a half-open probe
+    "max_open_seconds": 900,    # Cap for the doubling cool-down after failed probes
+    "persist_interval": 30,     # Seconds between snapshots written to disk
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"circuit open for {provider}")
+        self.provider = provider
+
+
+class ProviderHealth:
+    """Rolling health of a single provider."""
+
+    __slots__ = ("latency", "error_rate", "successes", "failures", "consecutive_failures",
+                 "state", "opened_at", "cooldown", "probe_in_flight", "updated_at")
+
+    def __init__(self):
+        self.latency: Optional[float] = None  # EWMA seconds of successful attempts
+        self.error_rate = 0.0                 # EWMA of failure (1) vs success (0)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probe_in_flight = False
+        self.updated_at = 0.0
+
+    def score(self) -> Optional[float]:
+        """Lower is healthier. None until the provider has answered at least once."""
+        if self.latency is None:
+            return None
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "cooldown": self.cooldown,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProviderHealth":
+        health = cls()
+        for key, value in data.items():
+            if key in cls.__slots__ and key != "probe_in_flight":
+                setattr(health, key, value)
+        if health.state == HALF_OPEN:
+            health.state = OPEN  # A probe from a dead process never reported back
+        return health
+
+
+class HealthTracker:
+    """
+    In-memory provider health with open / half-open / closed circuit breakers.
+
+    Replaces per-context sticky overrides: a failing provider is routed around only
+    while its circuit is open, and is probed again automatically once the cool-down
+    elapses. Dirty providers are synced to a shared StateStore periodically (newest
+    entry wins per provider), so concurrent processes exchange circuit state and the
+    next CLI run starts with the same view instead of re-discovering a dead provider.
+    """
+
+    def __init__(self, store: Optional[StateStore] = None, cfg: Optional[Dict[str, Any]] = None):
+        merged = dict(DEFAULT_HEALTH_CONFIG)
+        merged.update(cfg or {})
+        self.alpha = float(merged["ewma_alpha"])
+        self.failure_threshold = int(merged["failure_threshold"])
+        self.open_seconds = float(merged["open_seconds"])
+        self.max_open_seconds = float(merged["max_open_seconds"])
+        self.persist_interval = float(merged["persist_interval"])
+        self.store = store
+        self._providers: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._last_persist = time.time()
+        self._synced_at = 0.0
+        self._load()
+
+    # --- Recording -------------------------------------------------------
+
+    def _get(self, provider: str) -> ProviderHealth:
+        health = self._providers.get(provider)
+        if health is None:
+            health = self._providers[provider] = ProviderHealth()
+        return health
+
+    def record_success(self, provider: str, latency: float):
+        with self._lock:
+            health = self._get(provider)
+            health.latency = latency if health.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * health.latency
+            )
+            health.error_rate = (1 - self.alpha) * health.error_rate
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.probe_in_flight = False
+            if health.state != CLOSED:
+                health.state = CLOSED
+                health.cooldown = 0.0
+            health.updated_at = time.time()
+            self._dirty.add(provider)
+        self.maybe_persist()
+
+    def record_failure(self, provider: str, fatal: bool = False):
+        with self._lock:
+            health = self._get(provider)
+            health.error_rate = self.alpha + (1 - self.alpha) * health.error_rate
+            health.failures += 1
+            health.consecutive_failures += 1
+            now = time.time()
+            if health.state == HALF_OPEN:
+                # Failed probe: re-open with a longer cool-down
+                self._open(health, now, min(self.max_open_seconds, max(self.open_seconds, health.cooldown * 2)))
+            elif fatal or health.consecutive_failures >= self.failure_threshold:
+                self._open(health, now, self.open_seconds)
+            health.updated_at = now
+            self._dirty.add(provider)
+        self.maybe_persist()
+
+    @staticmethod
+    def _open(health: ProviderHealth, now: float, cooldown: float):
+        health.state = OPEN
+        health.opened_at = now
+        health.cooldown = cooldown
+        health.probe_in_flight = False
+
+    def release(self, provider: str):
+        """Frees a half-open probe slot when an attempt was abandoned (e.g. a cancelled hedge)."""
+        with self._lock:
+            health = self._providers.get(provider)
+            if health:
+                health.probe_in_flight = False
+
+    # --- Routing ---------------------------------------------------------
+
+    def allow(self, provider: str) -> bool:
+        """True if a request may be sent now. Transitions open → half-open after the cool-down."""
+        with self._lock:
+            health = self._providers.get(provider)
+            if health is None or health.state == CLOSED:
+                return True
+            if health.state == OPEN:
+                if time.time() - health.opened_at < health.cooldown:
+                    return False
+                health.state = HALF_OPEN
+                health.probe_in_flight = False
+            if health.probe_in_flight:
+                return False
+            health.probe_in_flight = True
+            return True
+
+    def is_open(self, provider: str) -> bool:
+        with self._lock:
+            health = self._providers.get(provider)
+            if health is None or health.state != OPEN:
+                return False
+            return time.time() - health.opened_at < health.cooldown
+
+    def rank(self, primary: str, chain: List[str]) -> List[str]:
+        """
+        Orders providers for a call: the requested provider first unless its circuit is open,
+        then fallbacks by health score (unknown providers keep chain order), open circuits last.
+        """
+        candidates = [primary] + [p for p in chain if p != primary]
+        with self._lock:
+            scores = {p: self._providers[p].score() if p in self._providers else None for p in candidates}
+
+        def key(item):
+            idx, p = item
+            is_open = self.is_open(p)
+            if idx == 0:
+                return (is_open, -1, 0.0, idx)
+            score = scores[p]
+            return (is_open, 1 if score is None else 0, score or 0.0, idx)
+
+        return [p for _, p in sorted(enumerate(candidates), key=key)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {p: h.to_dict() for p, h in self._providers.items()}
+
+    # --- Persistence -----------------------------------------------------
+
+    def _load(self):
+        if not self.store:
+            return
+        try:
+            rows = self.store.get_all(STATE_NAMESPACE)
+        except sqlite3.Error:
+            return
+        self._merge(rows)
+
+    def _merge(self, rows: Dict[str, Any]):
+        """Adopts entries written by other processes when they are newer than ours."""
+        with self._lock:
+            for provider, (data, updated_at) in rows.items():
+                self._synced_at = max(self._synced_at, updated_at)
+                local = self._providers.get(provider)
+                if provider in self._dirty or (local and local.updated_at >= updated_at):
+                    continue
+                self._providers[provider] = ProviderHealth.from_dict(data)
+
+    def maybe_persist(self):
+        if self.store and self._dirty and time.time() - self._last_persist >= self.persist_interval:
+            self.flush()
+
+    def close(self):
+        """Persists pending changes; registered at interpreter exit."""
+        if self._dirty:
+            self.flush()
+
+    def flush(self):
+        """Pushes dirty providers to the store, then pulls newer entries from other processes."""
+        if not self.store:
+            return
+        with self._lock:
+            items = [(p, self._providers[p].to_dict(), self._providers[p].updated_at) for p in self._dirty]
+            self._dirty = set()
+            self._last_persist = time.time()
+        try:
+            self.store.put_many(STATE_NAMESPACE, items)
+            self._merge(self.store.get_all(STATE_NAMESPACE, since=self._synced_at))
+        except sqlite3.Error:
+            pass
+
+
+_TRACKER: Optional[HealthTracker] = None
+_TRACKER_LOCK = threading.Lock()
+
+
+def get_health_tracker(state_path: Optional[str] = None, cfg: Optional[Dict[str, Any]] = None) -> HealthTracker:
+    """Process-wide tracker; the first caller's state path and config win."""
+    global _TRACKER
+    with _TRACKER_LOCK:
+        if _TRACKER is None:
+            store = None
+            if state_path:
+                try:
+                    store = StateStore(state_path)
+                except (OSError, sqlite3.Error):
+                    store = None  # Read-only checkout etc.: keep routing in memory only
+            _TRACKER = HealthTracker(store, cfg)
+            atexit.register(_TRACKER.close)
+        return _TRACKER
@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+from typing import Optional, Dict, Any
+
+# Hedging defaults; overridable via the "hedging" block in config.json
+DEFAULT_HEDGE_CONFIG = {
+    "enabled": False,
+    "percentile": 0.9,       # Fire the hedge once the primary exceeds this latency percentile
+    "min_samples": 5,        # Below this many observations, fall back to default_delay
+    "default_delay": 30.0,   # Seconds to wait before hedging when history is thin
+    "min_delay": 2.0,        # Never hedge sooner than this
+    "max_hedges": 1,         # Extra providers allowed in flight alongside the primary
+}
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful attempt latencies per provider.
+
+    For streaming calls the recorded value is time-to-first-token, for blocking
+    calls the full response time, matching what the hedge timer is racing.
+    """
+
+    def __init__(self, window: int = 200):
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self._window)).append(seconds)
+
+    def count(self, provider: str) -> int:
+        with self._lock:
+            return len(self._samples.get(provider, ()))
+
+    def percentile(self, provider: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, max(0, int(round(pct * (len(samples) - 1)))))
+        return samples[idx]
+
+
+class HedgePolicy:
+    """Decides when a slow provider should be raced by the next one in the fallback chain."""
+
+    def __init__(self, cfg: Dict[str, Any], tracker: LatencyTracker):
+        merged = dict(DEFAULT_HEDGE_CONFIG)
+        merged.update(cfg or {})
+        self.enabled = bool(merged["enabled"])
+        self.percentile = float(merged["percentile"])
+        self.min_samples = int(merged["min_samples"])
+        self.default_delay = float(merged["default_delay"])
+        self.min_delay = float(merged["min_delay"])
+        self.max_hedges = int(merged["max_hedges"])
+        self.tracker = tracker
+
+    def delay_for(self, provider: str) -> float:
+        """Seconds to give `provider` before firing a hedge."""
+        if self.tracker.count(provider) < self.min_samples:
+            return max(self.min_delay, self.default_delay)
+        observed = self.tracker.percentile(provider, self.percentile)
+        return max(self.min_delay, observed)
+
+
+class HedgeCancelled(Exception):
+    """Raised inside a losing hedge lane once another lane has won."""
+
+
+_LATENCY = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    return _LATENCY
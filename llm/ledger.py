@@ -0,0 +1,234 @@
+"""
+Append-only ledger of every LLM attempt, and a report over it.
+
+    python -m llm.ledger                      # totals per day, role and provider
+    python -m llm.ledger --by provider --since 2026-10-01
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+# Ledger defaults; overridable via the "ledger" block in config.json
+DEFAULT_LEDGER_CONFIG = {
+    "enabled": True,
+    "path": ".agent/llm_ledger.jsonl",
+}
+
+# List prices in USD per million tokens: (input, cached input, output). A provider block in
+# config.json may override its default model with "price": {"input", "cached", "output"}.
+PRICES = {
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "deepseek-chat": (0.28, 0.028, 0.42),
+    "deepseek-reasoner": (0.28, 0.028, 0.42),
+    "gemini-3-pro-preview": (2.00, 0.20, 12.00),
+    "qwen-plus": (0.40, 0.08, 1.20),
+    "qwen-max": (1.60, 0.32, 6.40),
+    "x-ai/grok-4": (3.00, 0.75, 15.00),
+    "zai-org/GLM-4.6": (0.50, 0.11, 1.90),
+}
+
+REPORT_FIELDS = ("day", "role", "provider", "model", "context")
+
+
+def model_price(model: Optional[str], provider_cfg: Optional[Dict[str, Any]] = None) -> Optional[Tuple[float, float, float]]:
+    price = (provider_cfg or {}).get("price")
+    if price and (model is None or model == provider_cfg.get("model")):
+        return (price.get("input", 0.0), price.get("cached", price.get("input", 0.0)), price.get("output", 0.0))
+    return PRICES.get(model)
+
+
+def estimate_cost(model: Optional[str], usage: Any, provider_cfg: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """USD cost of one call from its `Usage`; None when the model has no known price."""
+    price = model_price(model, provider_cfg)
+    if price is None or usage is None:
+        return None
+    input_price, cached_price, output_price = price
+    cached = usage.cached_tokens or 0
+    return ((usage.prompt_tokens - cached) * input_price + cached * cached_price
+            + usage.completion_tokens * output_price) / 1_000_000
+
+
+class Ledger:
+    """
+    One JSON line per provider attempt: successes, failures and retries alike.
+
+    Lines are appended with a single write under a lock, so threads and concurrent
+    processes interleave whole records. Keys whose value is None are left out.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def append(self, entry: Dict[str, Any]):
+        line = json.dumps({k: v for k, v in entry.items() if v is not None}, ensure_ascii=False,
+                          separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def records(self, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn line from a crashed writer
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+def _group_value(record: Dict[str, Any], field: str) -> str:
+    if field == "day":
+        return datetime.fromtimestamp(record.get("ts", 0)).strftime("%Y-%m-%d")
+    if field == "context":
+        return record.get("ctx") or "-"
+    return record.get(field) or "-"
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def aggregate(records: Iterator[Dict[str, Any]], by: Tuple[str, ...] = ("day", "role", "provider")) -> List[Dict[str, Any]]:
+    """Totals per group, sorted by group key."""
+    groups: Dict[Tuple[str, ...], Dict[str, Any]] = defaultdict(lambda: {
+        "calls": 0, "failed": 0, "retries": 0, "fallbacks": 0, "prompt": 0, "completion": 0,
+        "cached": 0, "cost": 0.0, "unpriced": 0, "queue": 0.0, "retry_time": 0.0, "latencies": [], "ttfts": [],
+    })
+    for record in records:
+        group = groups[tuple(_group_value(record, field) for field in by)]
+        group["calls"] += 1
+        group["failed"] += 0 if record.get("ok") else 1
+        group["retries"] += 1 if record.get("attempt", 1) > 1 else 0
+        group["fallbacks"] += 1 if record.get("hop") else 0
+        group["prompt"] += record.get("in", 0)
+        group["completion"] += record.get("out", 0)
+        group["cached"] += record.get("cached", 0)
+        group["queue"] += record.get("queue", 0.0)
+        if not record.get("ok"):
+            # Wall time a failure cost: the failed attempt itself plus the backoff after it
+            group["retry_time"] += record.get("latency", 0.0) + record.get("backoff", 0.0)
+        if "cost" in record:
+            group["cost"] += record["cost"]
+        elif record.get("ok"):
+            group["unpriced"] += 1
+        if record.get("ok") and "latency" in record:
+            group["latencies"].append(record["latency"])
+        if "ttft" in record:
+            group["ttfts"].append(record["ttft"])
+
+    rows = []
+    for key, group in sorted(groups.items()):
+        latencies = group.pop("latencies")
+        ttfts = group.pop("ttfts")
+        group.update(zip(by, key))
+        group["p50_latency"] = _percentile(latencies, 0.5)
+        group["p95_latency"] = _percentile(latencies, 0.95)
+        group["p50_ttft"] = _percentile(ttfts, 0.5)
+        rows.append(group)
+    return rows
+
+
+def format_report(rows: List[Dict[str, Any]], by: Tuple[str, ...]) -> str:
+    def seconds(value: Optional[float]) -> str:
+        return f"{value:.1f}s" if value is not None else "-"
+
+    header = list(by) + ["calls", "failed", "retries", "fallbk", "in", "cached", "out",
+                         "p50", "p95", "ttft", "queued", "retry", "cost $"]
+    table = [header]
+    totals = defaultdict(float)
+    for row in rows:
+        table.append([row[field] for field in by] + [
+            str(row["calls"]), str(row["failed"]), str(row["retries"]), str(row["fallbacks"]),
+            str(row["prompt"]), str(row["cached"]), str(row["completion"]),
+            seconds(row["p50_latency"]), seconds(row["p95_latency"]), seconds(row["p50_ttft"]),
+            seconds(row["queue"]), seconds(row["retry_time"]), f"{row['cost']:.4f}" + ("*" if row["unpriced"] else ""),
+        ])
+        for field in ("calls", "failed", "prompt", "cached", "completion", "cost"):
+            totals[field] += row[field]
+    widths = [max(len(str(line[i])) for line in table) for i in range(len(header))]
+    lines = ["  ".join(str(cell).ljust(width) for cell, width in zip(line, widths)) for line in table]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    lines.append(
+        f"\nTotal: {int(totals['calls'])} attempts ({int(totals['failed'])} failed) | "
+        f"{int(totals['prompt'])} in ({int(totals['cached'])} cached) / {int(totals['completion'])} out | "
+        f"${totals['cost']:.4f}"
+    )
+    if any(row["unpriced"] for row in rows):
+        lines.append("* includes calls to models without a price; add them to PRICES or a provider's \"price\" block")
+    return "\n".join(lines)
+
+
+_LEDGER: Optional[Ledger] = None
+_LEDGER_LOCK = threading.Lock()
+
+
+def ledger_path(cfg: Optional[Dict[str, Any]], root: str) -> str:
+    merged = dict(DEFAULT_LEDGER_CONFIG)
+    merged.update(cfg or {})
+    path = merged["path"]
+    return path if os.path.isabs(path) else os.path.join(root, path)
+
+
+def get_ledger(cfg: Optional[Dict[str, Any]], root: str) -> Optional[Ledger]:
+    """Process-wide ledger, or None when disabled; the first caller's config wins."""
+    global _LEDGER
+    if not {**DEFAULT_LEDGER_CONFIG, **(cfg or {})}["enabled"]:
+        return None
+    with _LEDGER_LOCK:
+        if _LEDGER is None:
+            _LEDGER = Ledger(ledger_path(cfg, root))
+        return _LEDGER
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Usage, latency and cost report over the LLM call ledger")
+    parser.add_argument("--by", default="day,role,provider",
+                        help=f"Comma-separated grouping fields from: {', '.join(REPORT_FIELDS)}")
+    parser.add_argument("--since", help="Only include calls on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, help="Only include the last N days")
+    parser.add_argument("--path", help="Ledger file (defaults to the one configured in llm/config.json)")
+    args = parser.parse_args(argv)
+
+    by = tuple(field.strip() for field in args.by.split(",") if field.strip())
+    unknown = [field for field in by if field not in REPORT_FIELDS]
+    if unknown:
+        parser.error(f"unknown grouping field(s): {', '.join(unknown)}")
+    since = None
+    if args.since:
+        since = datetime.strptime(args.since, "%Y-%m-%d").timestamp()
+    elif args.days:
+        since = time.time() - args.days * 86400
+
+    path = args.path
+    if not path:
+        config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+        cfg = {}
+        if os.path.exists(config_file):
+            with open(config_file, "r", encoding="utf-8") as f:
+                cfg = json.load(f).get("ledger", {})
+        path = ledger_path(cfg, root)
+    if not os.path.exists(path):
+        print(f"No ledger at {path} yet.", file=sys.stderr)
+        return 1
+
+    print(format_report(aggregate(Ledger(path).records(since), by), by))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,21 @@
-from pydantic import BaseModel, Field
+import json
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any, Union
 
+# Validators are built on first use instead of at import, keeping `import llm` cheap for CLIs
+LAZY = ConfigDict(defer_build=True)
+
+# What an LLMResponse keeps of the provider SDK's response object ("responses.raw" in config.json)
+RAW_MODES = ("keep", "lazy", "drop")
+
 class Message(BaseModel):
+    model_config = LAZY
     role: str
     content: str
     name: Optional[str] = None
 
 class LLMRequest(BaseModel):
+    model_config = LAZY
     messages: List[Message]
     model: Optional[str] = None
     temperature: Optional[float] = 0.7
@@ -16,15 +25,110 @@ class LLMRequest(BaseModel):
     stop: Optional[Union[str, List[str]]] = None
     extra_params: Dict[str, Any] = Field(default_factory=dict)
 
-class Usage(BaseModel):
-    prompt_tokens: int
-    completion_tokens: int
-    total_tokens: int
 
-class LLMResponse(BaseModel):
-    content: str
-    model: str
-    provider: str
-    usage: Optional[Usage] = None
-    finish_reason: Optional[str] = None
-    raw: Optional[Any] = None
+class _Record:
+    """
+    Slots-based value object for the per-call results, which are built on every response
+    and stream chunk: no per-instance dict and no validation. Mirrors the bits of the
+    pydantic API callers use (`model_dump`, field equality).
+    """
+
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def model_dump(self, exclude: Optional[set] = None, exclude_none: bool = False) -> Dict[str, Any]:
+        data = {}
+        for name in self._fields:
+            if exclude and name in exclude:
+                continue
+            value = getattr(self, name)
+            if isinstance(value, _Record):
+                value = value.model_dump(exclude_none=exclude_none)
+            if value is None and exclude_none:
+                continue
+            data[name] = value
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self._fields)})"
+
+
+class Usage(_Record):
+    __slots__ = ("prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens")
+    _fields = __slots__
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int, total_tokens: int, cached_tokens: int = 0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = total_tokens
+        self.cached_tokens = cached_tokens  # Prompt tokens served from the provider's prefix/context cache
+
+
+class _SerializedRaw:
+    """
+    A provider payload flattened to JSON, so the SDK object graph can be freed right away;
+    decoded once, on the first read of `LLMResponse.raw`.
+    """
+
+    __slots__ = ("data", "_decoded")
+
+    def __init__(self, payload: Any):
+        dump = getattr(payload, "model_dump_json", None)
+        self.data = dump() if callable(dump) else json.dumps(
+            payload, ensure_ascii=False, default=lambda o: getattr(o, "__dict__", str(o))
+        )
+        self._decoded = None
+
+    def load(self) -> Any:
+        if self.data is not None:
+            self._decoded, self.data = json.loads(self.data), None
+        return self._decoded
+
+
+def retain_raw(payload: Any, mode: str = "keep") -> Any:
+    """What to store as `raw` for an SDK response under the given RAW_MODES entry."""
+    if payload is None or mode == "drop":
+        return None
+    if mode == "lazy":
+        return _SerializedRaw(payload)
+    return payload
+
+
+class LLMResponse(_Record):
+    __slots__ = ("content", "model", "provider", "usage", "finish_reason", "_raw")
+    _fields = ("content", "model", "provider", "usage", "finish_reason", "raw")
+
+    def __init__(self, content: str, model: str, provider: str, usage: Optional[Union[Usage, Dict[str, Any]]] = None,
+                 finish_reason: Optional[str] = None, raw: Optional[Any] = None):
+        self.content = content
+        self.model = model
+        self.provider = provider
+        self.usage = Usage(**usage) if isinstance(usage, dict) else usage
+        self.finish_reason = finish_reason
+        self._raw = raw
+
+    @property
+    def raw(self) -> Optional[Any]:
+        """The SDK response object, or its JSON-decoded dict when retained lazily."""
+        if isinstance(self._raw, _SerializedRaw):
+            return self._raw.load()
+        return self._raw
+
+    @raw.setter
+    def raw(self, value: Any):
+        self._raw = value
+
+
+class StreamChunk(_Record):
+    __slots__ = ("delta", "usage", "finish_reason")
+    _fields = __slots__
+
+    def __init__(self, delta: str = "", usage: Optional[Usage] = None, finish_reason: Optional[str] = None):
+        self.delta = delta
+        self.usage = usage
+        self.finish_reason = finish_reason
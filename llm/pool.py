@@ -0,0 +1,144 @@
+import atexit
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import Optional, Dict, Any, Callable, Tuple
+
+# Transport defaults; overridable via the "pool" block and per-provider "max_connections" in config.json
+DEFAULT_POOL_CONFIG = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 60.0,
+}
+
+
+def _fingerprint(secret: Optional[str]) -> str:
+    """Short hash so raw API keys never appear in pool keys or stats."""
+    return hashlib.sha256((secret or "").encode("utf-8")).hexdigest()[:16]
+
+
+class ClientPool:
+    """
+    Process-wide pool of provider SDK clients.
+
+    Clients are keyed by (kind, provider, api key fingerprint, base_url, mode) so every
+    LLMClient instance and every per-call key/base_url override reuses the same warm
+    keep-alive connections. Async clients are additionally bound to the event loop that
+    created them (httpx connections cannot migrate between loops); entries belonging to
+    closed loops are pruned on access.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple, Any] = {}
+        self._loops: Dict[Tuple, Any] = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, key: Tuple, factory: Callable[[], Any], async_mode: bool = False) -> Any:
+        loop = None
+        if async_mode:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            key = key + (id(loop),)
+
+        with self._lock:
+            self._prune_closed_loops()
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+            client = factory()
+            self._clients[key] = client
+            if loop is not None:
+                self._loops[key] = weakref.ref(loop)
+            self.created += 1
+            return client
+
+    def _prune_closed_loops(self):
+        for key, loop_ref in list(self._loops.items()):
+            loop = loop_ref()
+            if loop is None or loop.is_closed():
+                # The transport died with its loop; drop without awaiting aclose()
+                self._clients.pop(key, None)
+                del self._loops[key]
+
+    def close(self):
+        """Closes every sync client and forgets async ones. Safe to call more than once."""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+            self._loops.clear()
+        for key, client in clients:
+            close = getattr(client, "close", None)
+            if close and not asyncio.iscoroutinefunction(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+    async def aclose(self):
+        """Closes every client, awaiting async transports bound to the running loop."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._loops.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if not close:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+
+_POOL = ClientPool()
+
+
+def get_pool() -> ClientPool:
+    return _POOL
+
+
+def close_pool():
+    """Explicitly release all pooled connections (e.g. at the end of a batch run); also run at interpreter exit."""
+    _POOL.close()
+
+
+atexit.register(close_pool)
+
+
+def pool_key(kind: str, provider: str, api_key: Optional[str], base_url: Optional[str], async_mode: bool) -> Tuple:
+    return (kind, provider, _fingerprint(api_key), base_url or "", "async" if async_mode else "sync")
+
+
+def build_openai_client(client_cls: Any, api_key: str, base_url: Optional[str],
+                        pool_cfg: Dict[str, Any], async_mode: bool) -> Any:
+    """Creates an OpenAI-compatible client whose httpx transport honours the pool limits."""
+    kwargs = {"api_key": api_key, "base_url": base_url}
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+    if httpx is not None:
+        limits = httpx.Limits(
+            max_connections=pool_cfg["max_connections"],
+            max_keepalive_connections=pool_cfg["max_keepalive_connections"],
+            keepalive_expiry=pool_cfg["keepalive_expiry"],
+        )
+        try:
+            from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+            http_cls = DefaultAsyncHttpxClient if async_mode else DefaultHttpxClient
+        except ImportError:
+            http_cls = httpx.AsyncClient if async_mode else httpx.Client
+        kwargs["http_client"] = http_cls(limits=limits)
+    return client_cls(**kwargs)
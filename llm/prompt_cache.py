@@ -0,0 +1,130 @@
+import time
+import hashlib
+import threading
+from typing import Optional, List, Dict, Any
+
+# Prompt-prefix caching defaults; overridable via the "prompt_cache" block in config.json
+DEFAULT_PROMPT_CACHE_CONFIG = {
+    "enabled": True,
+    "min_chars": 16000,      # Gemini rejects cached content below ~4k tokens; skip small prompts
+    "ttl_seconds": 900,      # Lifetime requested for Gemini cached content
+}
+
+
+def arrange_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Canonical message layout so identical prompts produce byte-identical request prefixes.
+
+    Text is normalized to LF line endings with trailing whitespace stripped from every line,
+    which is what provider-side prefix caches (DeepSeek, DashScope, OpenAI) match on. The
+    order of messages is kept: a system message in the middle of the conversation applies
+    from that point on, so only the leading run of system messages forms the shared prefix.
+    """
+    arranged = []
+    for msg in messages:
+        content = msg.get("content")
+        if isinstance(content, str):
+            content = "\n".join(line.rstrip() for line in content.replace("\r\n", "\n").split("\n")).rstrip()
+            msg = {**msg, "content": content}
+        arranged.append(msg)
+    return arranged
+
+
+class PromptCache:
+    """
+    Handles for provider-side context caches that need explicit management.
+
+    Currently Gemini cached content: a long system instruction is uploaded once per
+    (model, text) and referenced by name until shortly before its TTL runs out. Other
+    providers cache matching prefixes implicitly and only need `arrange_messages`.
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None):
+        merged = dict(DEFAULT_PROMPT_CACHE_CONFIG)
+        merged.update(cfg or {})
+        self.enabled = bool(merged["enabled"])
+        self.min_chars = int(merged["min_chars"])
+        self.ttl_seconds = int(merged["ttl_seconds"])
+        self._handles: Dict[str, Any] = {}  # key -> (name or None, expires_at)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.failed = 0
+
+    @staticmethod
+    def _key(owner: str, model: str, text: str) -> str:
+        return hashlib.sha256(f"{owner}\x00{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, owner: str, model: str, text: Optional[str]):
+        """Returns (hit, name, key); `hit` is False when a new cache should be created."""
+        if not self.enabled or not text or len(text) < self.min_chars:
+            return True, None, None
+        key = self._key(owner, model, text)
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry and entry[1] > time.time():
+                if entry[0]:
+                    self.reused += 1
+                return True, entry[0], key
+        return False, None, key
+
+    def _remember(self, key: str, name: Optional[str]):
+        # Refresh a minute early so a request never references an expiring cache;
+        # failed creations are not retried until the same window has passed
+        with self._lock:
+            if name:
+                self.created += 1
+            else:
+                self.failed += 1
+            self._handles[key] = (name, time.time() + max(0, self.ttl_seconds - 60))
+
+    def _config(self, text: str) -> Any:
+        from google.genai import types
+        return types.CreateCachedContentConfig(system_instruction=text, ttl=f"{self.ttl_seconds}s")
+
+    def gemini_handle(self, client: Any, model: str, system_instruction: Optional[str],
+                      owner: str = "") -> Optional[str]:
+        """
+        Cached-content name to send instead of `system_instruction`, or None to send it inline.
+        `owner` scopes handles to an API key, since cached content is private to its project.
+        """
+        hit, name, key = self._lookup(owner, model, system_instruction)
+        if hit:
+            return name
+        try:
+            name = client.caches.create(model=model, config=self._config(system_instruction)).name
+        except Exception:
+            name = None  # Model without caching support, quota, ...: fall back to inline prompts
+        self._remember(key, name)
+        return name
+
+    async def agemini_handle(self, client: Any, model: str, system_instruction: Optional[str],
+                             owner: str = "") -> Optional[str]:
+        hit, name, key = self._lookup(owner, model, system_instruction)
+        if hit:
+            return name
+        try:
+            cached = await client.aio.caches.create(model=model, config=self._config(system_instruction))
+            name = cached.name
+        except Exception:
+            name = None
+        self._remember(key, name)
+        return name
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"handles": len(self._handles), "created": self.created,
+                    "reused": self.reused, "failed": self.failed}
+
+
+_PROMPT_CACHE: Optional[PromptCache] = None
+_PROMPT_CACHE_LOCK = threading.Lock()
+
+
+def get_prompt_cache(cfg: Optional[Dict[str, Any]] = None) -> PromptCache:
+    """Process-wide registry; the first caller's config wins."""
+    global _PROMPT_CACHE
+    with _PROMPT_CACHE_LOCK:
+        if _PROMPT_CACHE is None:
+            _PROMPT_CACHE = PromptCache(cfg)
+        return _PROMPT_CACHE
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import threading
+from typing import Optional, Dict, Any
+
+
+class TokenBucket:
+    """
+    Refills continuously at `per_minute / 60` units per second, bursting up to one minute's budget.
+
+    Reservations are taken immediately and may drive the balance negative; the caller then
+    waits until its share has refilled. Queued callers are therefore admitted in arrival
+    order without a condition variable, which works the same for threads and asyncio tasks.
+    """
+
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes `amount` and returns how many seconds the caller must wait before sending."""
+        self._refill(now)
+        self.tokens -= amount
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, now: float, pause: float = 0.0):
+        """Provider said 429: whatever we thought was left is not, and nothing refills for `pause` seconds."""
+        self._refill(now)
+        self.tokens = min(self.tokens, -pause * self.rate)
+
+
+class ProviderLimits:
+    __slots__ = ("rpm", "tpm", "admitted", "queued", "wait_seconds", "max_wait", "throttled")
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.admitted = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+
+class RateLimiter:
+    """
+    Client-side admission control per provider (requests- and tokens-per-minute).
+
+    Process-wide so every LLMClient, worker thread and asyncio task draws from the same
+    budget. Budgets come from the `rpm` / `tpm` keys of each provider block in config.json;
+    a missing or zero value means unlimited. The first configuration seen for a provider wins.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limits: Dict[str, ProviderLimits] = {}
+
+    def configure(self, provider: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        with self._lock:
+            if provider not in self._limits:
+                self._limits[provider] = ProviderLimits(rpm, tpm)
+
+    def _reserve(self, provider: str, tokens: int) -> float:
+        with self._lock:
+            limits = self._limits.get(provider)
+            if limits is None:
+                return 0.0
+            now = time.monotonic()
+            wait = 0.0
+            if limits.rpm:
+                wait = max(wait, limits.rpm.reserve(1, now))
+            if limits.tpm and tokens:
+                wait = max(wait, limits.tpm.reserve(tokens, now))
+            limits.admitted += 1
+            if wait > 0:
+                limits.queued += 1
+                limits.wait_seconds += wait
+                limits.max_wait = max(limits.max_wait, wait)
+            return wait
+
+    def acquire(self, provider: str, tokens: int = 0) -> float:
+        """Blocks until the call fits the provider's budget; returns the seconds spent queued."""
+        wait = self._reserve(provider, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, provider: str, tokens: int = 0) -> float:
+        wait = self._reserve(provider, tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.release(provider, tokens)
+                raise
+        return wait
+
+    def release(self, provider: str, tokens: int = 0):
+        """Returns a reservation that was never sent (e.g. a cancelled hedge lane)."""
+        with self._lock:
+            limits = self._limits.get(provider)
+            if limits is None:
+                return
+            now = time.monotonic()
+            if limits.rpm:
+                limits.rpm.refund(1, now)
+            if limits.tpm and tokens:
+                limits.tpm.refund(tokens, now)
+
+    def settle(self, provider: str, estimated: int, actual: Optional[int]):
+        """Corrects the token budget once the provider reports real usage."""
+        if actual is None or actual == estimated:
+            return
+        with self._lock:
+            limits = self._limits.get(provider)
+            if limits is None or limits.tpm is None:
+                return
+            now = time.monotonic()
+            if actual < estimated:
+                limits.tpm.refund(estimated - actual, now)
+            else:
+                limits.tpm.reserve(actual - estimated, now)
+
+    def throttled(self, provider: str, retry_after: Optional[float] = None):
+        """
+        Called on a provider 429 so queued callers back off instead of piling on; with the
+        provider's Retry-After, no caller is admitted again before it has passed.
+        """
+        with self._lock:
+            limits = self._limits.get(provider)
+            if limits is None:
+                return
+            now = time.monotonic()
+            limits.throttled += 1
+            if limits.rpm:
+                limits.rpm.drain(now, retry_after or 0.0)
+            if limits.tpm:
+                limits.tpm.drain(now, retry_after or 0.0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                p: {
+                    "admitted": l.admitted,
+                    "queued": l.queued,
+                    "wait_seconds": round(l.wait_seconds, 3),
+                    "max_wait": round(l.max_wait, 3),
+                    "throttled": l.throttled,
+                }
+                for p, l in self._limits.items()
+            }
+
+
+_LIMITER = RateLimiter()
+
+
+def get_rate_limiter() -> RateLimiter:
+    return _LIMITER
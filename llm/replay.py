@@ -0,0 +1,300 @@
+"""
+Record/replay of provider traffic for offline, deterministic runs.
+
+In "record" mode every live provider response is saved to a cassette (one JSON file)
+under its request fingerprint; in "replay" mode the cassette answers instead of the
+network, optionally with the recorded latencies. Select a mode with the "replay" block
+in config.json, `LLMClient(replay=...)`, or the SPARKFORGE_REPLAY environment variable:
+
+    SPARKFORGE_REPLAY=record:.agent/cassettes/plan.json make debate docs/plan.md
+    SPARKFORGE_REPLAY=replay:.agent/cassettes/plan.json make debate docs/plan.md
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import threading
+from typing import Optional, List, Dict, Any, Iterator, AsyncIterator, Tuple
+
+from .models import LLMResponse, Usage, StreamChunk
+
+# Replay defaults; overridable via the "replay" block in config.json
+DEFAULT_REPLAY_CONFIG = {
+    "mode": "off",                            # off | record | replay
+    "cassette": ".agent/cassettes/default.json",
+    "latency_scale": 1.0,                     # 0 replays instantly, 1 at recorded speed
+    "strict": False,                          # True: a fingerprint miss fails instead of serving by route
+}
+
+MODES = ("off", "record", "replay")
+CASSETTE_VERSION = 1
+STREAM_CHUNK_WORDS = 8  # Replayed streams are re-chunked into groups of this many words
+
+
+class ReplayMissError(LookupError):
+    """Replay mode has no recorded response for a request; never retried or sent live."""
+
+    def __init__(self, provider: str, model: str, fingerprint: str):
+        super().__init__(f"no recorded response for {provider}/{model} (fingerprint {fingerprint[:12]})")
+        self.provider = provider
+        self.model = model
+        self.fingerprint = fingerprint
+
+
+def _route(provider: str, model: str, role: Optional[str]) -> str:
+    return f"{provider}|{model}|{role or ''}"
+
+
+class Replay:
+    """
+    A cassette plus the mode it is used in.
+
+    Identical requests recorded several times (e.g. a temperature > 0 loop) are served
+    in recording order, the last one repeating. With `strict` off, a request whose
+    fingerprint is unknown (say, a prompt that embeds today's date) gets the next unserved
+    recording for the same provider, model and role, with a warning.
+    """
+
+    def __init__(self, mode: str, cassette: str, latency_scale: float = 1.0, strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"replay mode must be 'record' or 'replay', not {mode!r}")
+        self.mode = mode
+        self.path = cassette
+        self.latency_scale = float(latency_scale)
+        self.strict = bool(strict)
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._order: List[Tuple[str, int]] = []  # (fingerprint, index) in recording order
+        self._served: Dict[str, int] = {}
+        self._route_served: set = set()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(cassette):
+            self._load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"cassette not found: {cassette}")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]], root: str) -> Optional["Replay"]:
+        """Builds a Replay from config and SPARKFORGE_REPLAY ("<mode>[:<cassette>]"), or None when off."""
+        merged = dict(DEFAULT_REPLAY_CONFIG)
+        merged.update(cfg or {})
+        env = os.environ.get("SPARKFORGE_REPLAY", "").strip()
+        if env:
+            mode, _, cassette = env.partition(":")
+            merged["mode"] = mode
+            if cassette:
+                merged["cassette"] = cassette
+        if merged["mode"] not in MODES:
+            raise ValueError(f"unknown replay mode {merged['mode']!r}; expected one of {', '.join(MODES)}")
+        if merged["mode"] == "off":
+            return None
+        path = merged["cassette"]
+        path = path if os.path.isabs(path) else os.path.join(root, path)
+        return cls(merged["mode"], path, merged["latency_scale"], merged["strict"])
+
+    # ------------------------------------------------------------------
+    # Cassette file
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("interactions", []):
+            runs = self._interactions.setdefault(entry["fingerprint"], [])
+            self._order.append((entry["fingerprint"], len(runs)))
+            runs.append(entry)
+
+    def _save(self):
+        entries = [self._interactions[fp][i] for fp, i in self._order]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CASSETTE_VERSION, "interactions": entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, fingerprint: str, role: Optional[str], response: LLMResponse,
+               latency: float, ttft: Optional[float] = None):
+        usage = response.usage
+        entry = {
+            "fingerprint": fingerprint,
+            "route": _route(response.provider, response.model, role),
+            "response": {
+                "content": response.content,
+                "model": response.model,
+                "provider": response.provider,
+                "finish_reason": response.finish_reason,
+                "usage": usage.model_dump() if usage else None,
+            },
+            "ttft": round(ttft, 3) if ttft is not None else None,
+            "latency": round(latency, 3),
+            "recorded_at": round(time.time(), 3),
+        }
+        with self._lock:
+            runs = self._interactions.setdefault(fingerprint, [])
+            self._order.append((fingerprint, len(runs)))
+            runs.append(entry)
+            self.recorded += 1
+            self._save()
+
+    def record_stream(self, fingerprint: str, role: Optional[str], provider: str, model: str,
+                      chunks: Iterator[StreamChunk]) -> Iterator[StreamChunk]:
+        """Passes a live stream through, recording it once it has been fully consumed."""
+        recorder = _StreamRecorder(provider, model)
+        for chunk in chunks:
+            recorder.feed(chunk)
+            yield chunk
+        self.record(fingerprint, role, recorder.response(), recorder.latency, recorder.ttft)
+
+    async def arecord_stream(self, fingerprint: str, role: Optional[str], provider: str, model: str,
+                             chunks: AsyncIterator[StreamChunk]) -> AsyncIterator[StreamChunk]:
+        recorder = _StreamRecorder(provider, model)
+        async for chunk in chunks:
+            recorder.feed(chunk)
+            yield chunk
+        self.record(fingerprint, role, recorder.response(), recorder.latency, recorder.ttft)
+
+    # ------------------------------------------------------------------
+    # Replaying
+    # ------------------------------------------------------------------
+
+    def _lookup(self, fingerprint: str, provider: str, model: str, role: Optional[str]) -> Dict[str, Any]:
+        with self._lock:
+            runs = self._interactions.get(fingerprint)
+            if runs:
+                index = self._served.get(fingerprint, 0)
+                self._served[fingerprint] = index + 1
+                self._route_served.add((fingerprint, min(index, len(runs) - 1)))
+                self.hits += 1
+                return runs[min(index, len(runs) - 1)]
+            self.misses += 1
+            if not self.strict:
+                route = _route(provider, model, role)
+                for fp, i in self._order:
+                    entry = self._interactions[fp][i]
+                    if entry["route"] == route and (fp, i) not in self._route_served:
+                        self._route_served.add((fp, i))
+                        print(f"[LLMClient] ⚠️  replay: no exact match for {provider}/{model}, "
+                              f"serving the next recorded response for this route", file=sys.stderr)
+                        return entry
+        raise ReplayMissError(provider, model, fingerprint)
+
+    @staticmethod
+    def _response(entry: Dict[str, Any]) -> LLMResponse:
+        data = entry["response"]
+        return LLMResponse(
+            content=data["content"],
+            model=data["model"],
+            provider=data["provider"],
+            usage=Usage(**data["usage"]) if data.get("usage") else None,
+            finish_reason=data.get("finish_reason"),
+            raw=None
+        )
+
+    def _timings(self, entry: Dict[str, Any], pieces: int) -> Tuple[float, float]:
+        """(delay before the first piece, delay between later pieces), scaled."""
+        latency = (entry.get("latency") or 0.0) * self.latency_scale
+        ttft = entry.get("ttft")
+        first = ttft * self.latency_scale if ttft is not None else latency
+        rest = max(0.0, latency - first)
+        return first, rest / max(1, pieces - 1)
+
+    @staticmethod
+    def _pieces(entry: Dict[str, Any]) -> List[str]:
+        words = re.findall(r"\s*\S+\s*", entry["response"]["content"] or "") or [""]
+        return ["".join(words[i:i + STREAM_CHUNK_WORDS]) for i in range(0, len(words), STREAM_CHUNK_WORDS)]
+
+    @staticmethod
+    def _tail(entry: Dict[str, Any]) -> StreamChunk:
+        data = entry["response"]
+        usage = Usage(**data["usage"]) if data.get("usage") else None
+        return StreamChunk(usage=usage, finish_reason=data.get("finish_reason") or "stop")
+
+    def play(self, fingerprint: str, provider: str, model: str, role: Optional[str]) -> LLMResponse:
+        entry = self._lookup(fingerprint, provider, model, role)
+        delay = (entry.get("latency") or 0.0) * self.latency_scale
+        if delay:
+            time.sleep(delay)
+        return self._response(entry)
+
+    async def aplay(self, fingerprint: str, provider: str, model: str, role: Optional[str]) -> LLMResponse:
+        entry = self._lookup(fingerprint, provider, model, role)
+        delay = (entry.get("latency") or 0.0) * self.latency_scale
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(entry)
+
+    def play_stream(self, fingerprint: str, provider: str, model: str,
+                    role: Optional[str]) -> Iterator[StreamChunk]:
+        entry = self._lookup(fingerprint, provider, model, role)
+        pieces = self._pieces(entry)
+        first, gap = self._timings(entry, len(pieces))
+        for i, piece in enumerate(pieces):
+            delay = first if i == 0 else gap
+            if delay:
+                time.sleep(delay)
+            yield StreamChunk(delta=piece)
+        yield self._tail(entry)
+
+    async def aplay_stream(self, fingerprint: str, provider: str, model: str,
+                           role: Optional[str]) -> AsyncIterator[StreamChunk]:
+        entry = self._lookup(fingerprint, provider, model, role)
+        pieces = self._pieces(entry)
+        first, gap = self._timings(entry, len(pieces))
+        for i, piece in enumerate(pieces):
+            delay = first if i == 0 else gap
+            if delay:
+                await asyncio.sleep(delay)
+            yield StreamChunk(delta=piece)
+        yield self._tail(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"mode": self.mode, "cassette": self.path, "interactions": len(self._order),
+                    "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class _StreamRecorder:
+    __slots__ = ("provider", "model", "started", "first_at", "parts", "usage", "finish_reason")
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.started = time.time()
+        self.first_at: Optional[float] = None
+        self.parts: List[str] = []
+        self.usage: Optional[Usage] = None
+        self.finish_reason: Optional[str] = None
+
+    def feed(self, chunk: StreamChunk):
+        if chunk.delta:
+            if self.first_at is None:
+                self.first_at = time.time()
+            self.parts.append(chunk.delta)
+        if chunk.usage:
+            self.usage = chunk.usage
+        if chunk.finish_reason:
+            self.finish_reason = chunk.finish_reason
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_at - self.started if self.first_at is not None else None
+
+    @property
+    def latency(self) -> float:
+        return time.time() - self.started
+
+    def response(self) -> LLMResponse:
+        return LLMResponse(content="".join(self.parts), model=self.model, provider=self.provider,
+                           usage=self.usage, finish_reason=self.finish_reason or "stop", raw=None)
@@ -0,0 +1,238 @@
+"""
+Error classification and backoff for the retry loop.
+
+Errors are classified from the SDK exception type and HTTP status (matched by class
+name, so no provider SDK is imported here), falling back to message fragments for
+errors that carry neither. Backoff uses decorrelated jitter, honours Retry-After and
+rate-limit reset headers, and draws from a per-call retry budget.
+"""
+import random
+import threading
+import email.utils
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+# Retry defaults; overridable via the "retry" block in config.json
+DEFAULT_RETRY_CONFIG = {
+    "max_delay": 60,        # Longest single backoff; a longer Retry-After fails over instead
+    "budget_seconds": 180,  # Total backoff one public call may spend across all providers
+}
+
+FATAL = "fatal"            # This provider will never serve this request: fail over now
+RATE_LIMITED = "rate_limited"
+TRANSIENT = "transient"    # 5xx, timeouts, dropped connections: worth retrying
+
+# Error fragments that mean "this provider will never work for this request"
+FATAL_ERROR_MARKERS = ["404", "invalid_api_key", "permission_denied", "authentication"]
+
+# Error fragments that mean "provider is throttling us"
+RATE_LIMIT_MARKERS = ["429", "rate limit", "rate_limit", "resource_exhausted", "too many requests"]
+
+# A 429 carrying one of these is an exhausted quota, not a throttle: waiting will not help
+QUOTA_MARKERS = ["insufficient_quota", "billing", "quota exceeded"]
+
+FATAL_STATUSES = {400, 401, 403, 404, 405, 413, 422}
+
+# SDK exception class names (openai / google-genai / httpx / builtins) -> kind
+ERROR_TYPES = {
+    "AuthenticationError": FATAL,
+    "PermissionDeniedError": FATAL,
+    "NotFoundError": FATAL,
+    "BadRequestError": FATAL,
+    "UnprocessableEntityError": FATAL,
+    "ClientError": FATAL,           # google.genai 4xx
+    "RateLimitError": RATE_LIMITED,
+    "APITimeoutError": TRANSIENT,
+    "APIConnectionError": TRANSIENT,
+    "InternalServerError": TRANSIENT,
+    "ServerError": TRANSIENT,       # google.genai 5xx
+    "TimeoutException": TRANSIENT,  # httpx
+    "TransportError": TRANSIENT,    # httpx
+    "TimeoutError": TRANSIENT,
+    "ConnectionError": TRANSIENT,
+}
+
+
+class ErrorInfo:
+    __slots__ = ("kind", "status", "retry_after")
+
+    def __init__(self, kind: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def fatal(self) -> bool:
+        return self.kind == FATAL
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.kind == RATE_LIMITED
+
+
+def _status(error: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _duration(value: str) -> Optional[float]:
+    """OpenAI-style reset durations: "20ms", "1.5s", "6m0s", "1h2m3s"."""
+    total, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif value.startswith("ms", i):
+            total += float(number or 0) / 1000
+            number = ""
+            i += 1
+        elif ch in "hms":
+            total += float(number or 0) * {"h": 3600, "m": 60, "s": 1}[ch]
+            number = ""
+        else:
+            return None
+        i += 1
+    return total + float(number) if number else total
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or rate-limit reset headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                when = email.utils.parsedate_to_datetime(value)
+                return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        resets = [_duration(headers.get(name) or "") for name in
+                  ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+        resets = [r for r in resets if r]
+        return max(resets) if resets else None
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(error: BaseException) -> ErrorInfo:
+    status = _status(error)
+    message = str(error).lower()
+    kind = None
+    for cls in type(error).__mro__:
+        kind = ERROR_TYPES.get(cls.__name__)
+        if kind:
+            break
+    if status is not None:
+        if status == 429:
+            kind = RATE_LIMITED
+        elif status in FATAL_STATUSES:
+            kind = FATAL
+        elif status >= 500 or status in (408, 409, 425):
+            kind = TRANSIENT
+    if kind is None:
+        if any(marker in message for marker in FATAL_ERROR_MARKERS):
+            kind = FATAL
+        elif any(marker in message for marker in RATE_LIMIT_MARKERS):
+            kind = RATE_LIMITED
+        else:
+            kind = TRANSIENT
+    if kind == RATE_LIMITED and any(marker in message for marker in QUOTA_MARKERS):
+        kind = FATAL
+    return ErrorInfo(kind, status, retry_after(error) if kind == RATE_LIMITED or status == 503 else None)
+
+
+class Backoff:
+    """
+    Decorrelated jitter ("sleep = random(base, 3 * previous sleep)", capped), one per
+    provider attempt loop. Parallel calls failing together spread out instead of
+    retrying in lockstep.
+    """
+
+    __slots__ = ("base", "cap", "previous")
+
+    def __init__(self, base: float, cap: float):
+        self.base = max(0.0, base)
+        self.cap = cap
+        self.previous = self.base
+
+    def next_delay(self, info: ErrorInfo) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the provider asked for longer than `cap`."""
+        if info.retry_after is not None:
+            if info.retry_after > self.cap:
+                return None
+            return info.retry_after + random.uniform(0, self.base)
+        self.previous = min(self.cap, random.uniform(self.base, self.previous * 3))
+        return self.previous
+
+
+class RetryBudget:
+    """Backoff seconds left for one public call; shared by its providers and hedge lanes."""
+
+    __slots__ = ("remaining", "_lock")
+
+    def __init__(self, seconds: float):
+        self.remaining = seconds
+        self._lock = threading.Lock()
+
+    def take(self, seconds: float) -> bool:
+        with self._lock:
+            if seconds > self.remaining:
+                return False
+            self.remaining -= seconds
+            return True
+
+
+class RetryMetrics:
+    """Process-wide wall time lost to retries, per provider: failed attempts plus backoff."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, provider: str) -> Dict[str, Any]:
+        return self._providers.setdefault(provider, {
+            "failures": 0, "retries": 0, "failed_seconds": 0.0, "backoff_seconds": 0.0,
+            "budget_exhausted": 0, "kinds": {},
+        })
+
+    def failure(self, provider: str, info: ErrorInfo, seconds: float):
+        with self._lock:
+            entry = self._entry(provider)
+            entry["failures"] += 1
+            entry["failed_seconds"] += seconds
+            entry["kinds"][info.kind] = entry["kinds"].get(info.kind, 0) + 1
+
+    def backoff(self, provider: str, seconds: float):
+        with self._lock:
+            entry = self._entry(provider)
+            entry["retries"] += 1
+            entry["backoff_seconds"] += seconds
+
+    def exhausted(self, provider: str):
+        with self._lock:
+            self._entry(provider)["budget_exhausted"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                p: dict(e, failed_seconds=round(e["failed_seconds"], 3),
+                        backoff_seconds=round(e["backoff_seconds"], 3), kinds=dict(e["kinds"]))
+                for p, e in self._providers.items()
+            }
+
+
+_METRICS = RetryMetrics()
+
+
+def get_retry_metrics() -> RetryMetrics:
+    return _METRICS
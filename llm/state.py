@@ -0,0 +1,81 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+
+class StateStore:
+    """
+    Small namespaced key/value store for LLM routing state, backed by SQLite in WAL mode.
+
+    Every write is a single-row upsert that only lands if it is newer than what is
+    already stored, so concurrent threads and `make debate` processes never clobber
+    each other's entries and no update pays a full-file parse/serialize. Callers keep
+    their own in-memory view and sync dirty keys periodically.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        # One short-lived connection per operation keeps the store safe to share across threads
+        with self._lock:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            try:
+                conn.execute("PRAGMA synchronous=NORMAL")
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    def put_many(self, namespace: str, items: Iterable[Tuple[str, Dict[str, Any], float]]):
+        """Upserts (key, value, updated_at) rows; older writes never overwrite newer ones."""
+        rows = [(namespace, key, json.dumps(value, ensure_ascii=False), updated_at) for key, value, updated_at in items]
+        if not rows:
+            return
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at "
+                "WHERE excluded.updated_at > kv.updated_at",
+                rows,
+            )
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any], updated_at: float):
+        self.put_many(namespace, [(key, value, updated_at)])
+
+    def get_all(self, namespace: str, since: float = 0.0) -> Dict[str, Tuple[Dict[str, Any], float]]:
+        """Returns {key: (value, updated_at)} for rows updated after `since`."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "SELECT key, value, updated_at FROM kv WHERE namespace = ? AND updated_at > ?",
+                (namespace, since),
+            )
+            return {key: (json.loads(value), updated_at) for key, value, updated_at in cursor}
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, namespace: str, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
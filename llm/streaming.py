@@ -0,0 +1,234 @@
+import time
+from typing import Optional, Iterator, AsyncIterator, Callable
+
+from .models import LLMResponse, Usage, StreamChunk
+
+
+class _StreamState:
+    """Accumulates deltas, usage and timing shared by the sync and async streams."""
+
+    def __init__(self, provider: str, model: str, started_at: float,
+                 on_complete: Optional[Callable[[LLMResponse], None]] = None,
+                 on_abort: Optional[Callable[[LLMResponse, Optional[BaseException]], None]] = None):
+        self.provider = provider
+        self.model = model
+        self.started_at = started_at
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.on_complete = on_complete
+        self.on_abort = on_abort
+        self.aborted = False
+        self._parts = []
+        self._usage: Optional[Usage] = None
+        self._finish_reason: Optional[str] = None
+        self.response: Optional[LLMResponse] = None
+
+    def feed(self, chunk: StreamChunk) -> str:
+        if chunk.delta:
+            if self.first_token_at is None:
+                self.first_token_at = time.time()
+            self._parts.append(chunk.delta)
+        if chunk.usage:
+            self._usage = chunk.usage
+        if chunk.finish_reason:
+            self._finish_reason = chunk.finish_reason
+        return chunk.delta
+
+    def finish(self) -> LLMResponse:
+        if self.response is None:
+            self.finished_at = time.time()
+            self.response = LLMResponse(
+                content="".join(self._parts),
+                model=self.model,
+                provider=self.provider,
+                usage=self._usage,
+                finish_reason=self._finish_reason or "stop",
+                raw=None
+            )
+            if self.on_complete and not self.aborted:
+                self.on_complete(self.response)
+        return self.response
+
+    def abort(self, error: Optional[BaseException] = None):
+        """
+        The stream ended before its last chunk: it raised `error`, or (None) the reader
+        stopped iterating. `on_abort` gets what was generated so far, usage included.
+        """
+        if self.response is not None or self.aborted:
+            return
+        self.aborted = True
+        self.finished_at = time.time()
+        if self.on_abort:
+            partial = LLMResponse(content=self.text, model=self.model, provider=self.provider,
+                                  usage=self._usage, finish_reason=self._finish_reason, raw=None)
+            self.on_abort(partial, error)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class LLMStream:
+    """
+    Synchronous token stream returned by `LLMClient.chat_stream`.
+
+    Iterating yields text deltas as they arrive. Once exhausted, `response`
+    holds the aggregated `LLMResponse` (full content + final `Usage`). A stream
+    that raises, or that the reader stops iterating (or `close()`s), is closed
+    and reported through `on_abort` instead.
+    """
+
+    def __init__(self, chunks: Iterator[StreamChunk], provider: str, model: str,
+                 started_at: float, on_complete: Optional[Callable[[LLMResponse], None]] = None,
+                 on_abort: Optional[Callable[[LLMResponse, Optional[BaseException]], None]] = None):
+        self._chunks = chunks
+        self._state = _StreamState(provider, model, started_at, on_complete, on_abort)
+
+    def __iter__(self) -> Iterator[str]:
+        error = None
+        try:
+            for chunk in self._chunks:
+                delta = self._state.feed(chunk)
+                if delta:
+                    yield delta
+            self._state.finish()
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if self._state.response is None:
+                self.close(error)
+
+    def close(self, error: Optional[BaseException] = None):
+        """Stops the stream early, releasing its connection; a finished stream is left as is."""
+        if self._state.response is not None or self._state.aborted:
+            return
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass  # Closing an already broken connection must not mask the outcome
+        self._state.abort(error)
+
+    def collect(self) -> LLMResponse:
+        """Drain the remaining stream and return the aggregated response."""
+        for _ in self:
+            pass
+        return self._state.finish()
+
+    @property
+    def provider(self) -> str:
+        return self._state.provider
+
+    @property
+    def model(self) -> str:
+        return self._state.model
+
+    @property
+    def text(self) -> str:
+        return self._state.text
+
+    @property
+    def response(self) -> Optional[LLMResponse]:
+        return self._state.response
+
+    @property
+    def usage(self) -> Optional[Usage]:
+        return self._state.response.usage if self._state.response else None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from request start to the first non-empty delta."""
+        return self._state.ttft
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self._state.latency
+
+
+class AsyncLLMStream:
+    """Async counterpart of `LLMStream`, returned by `LLMClient.achat_stream`."""
+
+    def __init__(self, chunks: AsyncIterator[StreamChunk], provider: str, model: str,
+                 started_at: float, on_complete: Optional[Callable[[LLMResponse], None]] = None,
+                 on_abort: Optional[Callable[[LLMResponse, Optional[BaseException]], None]] = None):
+        self._chunks = chunks
+        self._state = _StreamState(provider, model, started_at, on_complete, on_abort)
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        error = None
+        try:
+            async for chunk in self._chunks:
+                delta = self._state.feed(chunk)
+                if delta:
+                    yield delta
+            self._state.finish()
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            if self._state.response is None:
+                await self.aclose(error)
+
+    async def aclose(self, error: Optional[BaseException] = None):
+        """Stops the stream early, releasing its connection; a finished stream is left as is."""
+        if self._state.response is not None or self._state.aborted:
+            return
+        close = getattr(self._chunks, "aclose", None)
+        if close is not None:
+            try:
+                await close()
+            except Exception:
+                pass
+        self._state.abort(error)
+
+    async def collect(self) -> LLMResponse:
+        """Drain the remaining stream and return the aggregated response."""
+        async for _ in self:
+            pass
+        return self._state.finish()
+
+    @property
+    def provider(self) -> str:
+        return self._state.provider
+
+    @property
+    def model(self) -> str:
+        return self._state.model
+
+    @property
+    def text(self) -> str:
+        return self._state.text
+
+    @property
+    def response(self) -> Optional[LLMResponse]:
+        return self._state.response
+
+    @property
+    def usage(self) -> Optional[Usage]:
+        return self._state.response.usage if self._state.response else None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self._state.ttft
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self._state.latency
@@ -0,0 +1,157 @@
+import re
+import math
+from typing import Optional, List, Dict, Any, Tuple
+
+# CJK ideographs, kana, hangul and full-width punctuation: tokenized far more densely than Latin text
+CJK_RE = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# (tokens per CJK character, characters per token for everything else), calibrated against
+# each provider's tokenizer on our prompts and reports. Errs on the high side.
+PROVIDER_RATIOS = {
+    "openai": (1.0, 4.0),
+    "openrouter": (1.0, 3.8),
+    "deepseek": (0.65, 3.6),
+    "dashscope": (0.7, 3.8),
+    "siliconflow": (0.75, 3.6),
+    "gemini": (0.8, 4.0),
+}
+DEFAULT_RATIO = (1.0, 3.5)
+
+MESSAGE_OVERHEAD = 4        # Role markers / separators per chat message
+MIN_COMPLETION_TOKENS = 1024  # Below this much room for the answer a call is not worth sending
+SAFETY_MARGIN = 0.05        # Share of the window kept free to absorb estimation error
+
+# Context windows (prompt + completion) of models we route to; providers' config.json
+# "context_window" covers their default model, this table covers per-role overrides
+MODEL_WINDOWS = {
+    "gpt-5-mini": 400000,
+    "deepseek-chat": 131072,
+    "deepseek-reasoner": 131072,
+    "gemini-3-pro-preview": 1048576,
+    "qwen-plus": 131072,
+    "qwen-max": 32768,
+    "x-ai/grok-4": 256000,
+    "zai-org/GLM-4.6": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 32768
+
+_ENCODINGS: Dict[str, Any] = {}
+
+
+class ContextWindowError(ValueError):
+    """Raised before sending when a prompt cannot fit the model's context window."""
+
+    def __init__(self, provider: str, model: str, prompt_tokens: int, window: int):
+        super().__init__(
+            f"prompt of ~{prompt_tokens} tokens leaves no room for a completion in "
+            f"{model}'s {window}-token window ({provider})"
+        )
+        self.provider = provider
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.window = window
+
+
+def _tiktoken_encoding(provider: Optional[str]) -> Any:
+    # tiktoken is imported on first use so `import llm` stays cheap for the other providers
+    if provider != "openai":
+        return None
+    if "o200k_base" not in _ENCODINGS:
+        try:
+            import tiktoken
+            _ENCODINGS["o200k_base"] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _ENCODINGS["o200k_base"] = None  # Not installed, or encoding files unavailable offline
+    return _ENCODINGS["o200k_base"]
+
+
+def count_tokens(text: str, provider: Optional[str] = None) -> int:
+    """Local token estimate for `text` as the given provider would bill it. Never hits the network."""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding(provider)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    per_cjk, chars_per_token = PROVIDER_RATIOS.get(provider, DEFAULT_RATIO)
+    cjk = len(CJK_RE.findall(text))
+    return math.ceil(cjk * per_cjk + (len(text) - cjk) / chars_per_token)
+
+
+def count_message_tokens(messages: List[Dict[str, str]], provider: Optional[str] = None) -> int:
+    return sum(count_tokens(m.get("content") or "", provider) + MESSAGE_OVERHEAD for m in messages)
+
+
+def context_window(model: Optional[str], provider_cfg: Optional[Dict[str, Any]] = None) -> int:
+    if model in MODEL_WINDOWS:
+        return MODEL_WINDOWS[model]
+    return int((provider_cfg or {}).get("context_window") or DEFAULT_CONTEXT_WINDOW)
+
+
+def usable_window(window: int) -> int:
+    return int(window * (1 - SAFETY_MARGIN))
+
+
+def truncate_to_tokens(text: str, limit: int, provider: Optional[str] = None, keep: str = "head") -> str:
+    """Cuts `text` on a line boundary so it fits in `limit` tokens, keeping its head or tail."""
+    if limit <= 0:
+        return ""
+    total = count_tokens(text, provider)
+    if total <= limit:
+        return text
+    size = int(len(text) * limit / total)
+    while size > 0:
+        piece = text[:size] if keep == "head" else text[len(text) - size:]
+        if keep == "head" and "\n" in piece:
+            piece = piece[:piece.rindex("\n")]
+        elif keep == "tail" and "\n" in piece:
+            piece = piece[piece.index("\n") + 1:]
+        if count_tokens(piece, provider) <= limit:
+            return piece
+        size = int(size * 0.9)
+    return ""
+
+
+class PromptBlock:
+    """
+    A named piece of a prompt for `fit_blocks`.
+
+    Blocks are trimmed in ascending `priority` (lowest first), each only as far as needed;
+    `required` blocks are never touched. `keep` chooses which end of a trimmed block survives.
+    """
+
+    __slots__ = ("name", "text", "priority", "keep", "required")
+
+    def __init__(self, name: str, text: str, priority: int = 0, keep: str = "head", required: bool = False):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.keep = keep
+        self.required = required
+
+
+def fit_blocks(blocks: List[PromptBlock], budget: int,
+               provider: Optional[str] = None) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Trims blocks until their combined estimate fits `budget` tokens.
+
+    Returns ({name: text}, {name: tokens removed}) with block order preserved in the first
+    dict. A trimmed block ends with a marker so the model knows material was omitted.
+    If the required blocks alone exceed the budget, every optional block is dropped and
+    the pre-flight check in LLMClient has the final say.
+    """
+    sizes = {b.name: count_tokens(b.text, provider) for b in blocks}
+    texts = {b.name: b.text for b in blocks}
+    trimmed: Dict[str, int] = {}
+    excess = sum(sizes.values()) - budget
+    for block in sorted((b for b in blocks if not b.required), key=lambda b: b.priority):
+        if excess <= 0:
+            break
+        before = sizes[block.name]
+        marker = f"\n…[{block.name} trimmed to fit the context window]\n"
+        target = max(0, before - excess - count_tokens(marker, provider))
+        kept = truncate_to_tokens(block.text, target, provider, keep=block.keep)
+        texts[block.name] = (kept + marker if block.keep == "head" else marker + kept) if kept else ""
+        sizes[block.name] = count_tokens(texts[block.name], provider)
+        trimmed[block.name] = before - sizes[block.name]
+        excess -= trimmed[block.name]
+    return texts, trimmed
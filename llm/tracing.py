@@ -0,0 +1,327 @@
+"""
+Lightweight tracing for LLM calls and the debate pipeline.
+
+Tracing is off (a shared no-op span, no context switches) until an exporter is attached,
+either in code via `configure_tracing` or with the SPARKFORGE_TRACE environment variable:
+
+    SPARKFORGE_TRACE=1 make debate docs/plan.md             # JSON trace under .agent/traces/
+    SPARKFORGE_TRACE=logs/run.json python scripts/...        # JSON trace at a given path
+    SPARKFORGE_TRACE=otel make debate docs/plan.md          # forward to OpenTelemetry
+
+The current span lives in a ContextVar, so asyncio tasks inherit it automatically; work
+handed to threads must be submitted through `contextvars.copy_context().run`.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import atexit
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Callable, Iterator
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TRACE_DIR = os.path.join(PROJECT_ROOT, ".agent", "traces")
+
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("sparkforge_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """One timed operation; attributes are plain str/int/float/bool values."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end_time",
+                 "attributes", "error", "_tracer")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.end_time: Optional[float] = None
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.set(**attributes)
+
+    def set(self, **attributes):
+        for key, value in attributes.items():
+            if value is not None:
+                self.attributes[key] = value if isinstance(value, (str, int, float, bool)) else str(value)
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_time is not None:
+            return
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.end_time = time.time()
+        self._tracer._finish(self)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.end_time - self.start if self.end_time is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, error: Optional[BaseException] = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Creates spans and hands them to exporters (`on_start(span)`, `on_end(span)`, `shutdown()`).
+    With no exporters every call returns NOOP_SPAN, so instrumentation costs next to nothing.
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = list(exporters or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def current(self) -> Optional[Span]:
+        return _CURRENT.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Any:
+        """Starts a span (child of `parent`, else of the current span) without activating it."""
+        if not self.exporters:
+            return NOOP_SPAN
+        span = Span(self, name, parent or _CURRENT.get(), attributes)
+        for exporter in self.exporters:
+            self._safely(exporter.on_start, span)
+        return span
+
+    @contextmanager
+    def activate(self, span: Any) -> Iterator[Any]:
+        """Makes `span` current for the block; ends it with the error if the block raises."""
+        if span is NOOP_SPAN:
+            yield span
+            return
+        token = _CURRENT.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            _CURRENT.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        span = self.start_span(name, **attributes)
+        with self.activate(span):
+            yield span
+        span.end()
+
+    def _finish(self, span: Span):
+        for exporter in self.exporters:
+            self._safely(exporter.on_end, span)
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            self._safely(exporter.shutdown)
+
+    @staticmethod
+    def _safely(fn: Callable, *args):
+        # A broken exporter must never fail the traced call
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"[tracing] exporter error: {e}", file=sys.stderr)
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Chain from the longest root span down through, at each level, the child that finished
+    last: the operations that actually determined the run's wall time.
+    """
+    finished = [s for s in spans if s.get("duration") is not None]
+    if not finished:
+        return []
+    children: Dict[str, List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in finished}
+    for s in finished:
+        if s["parent_id"] in ids:
+            children.setdefault(s["parent_id"], []).append(s)
+    roots = [s for s in finished if s["parent_id"] not in ids]
+    path = [max(roots, key=lambda s: s["duration"])]
+    while path[-1]["span_id"] in children:
+        path.append(max(children[path[-1]["span_id"]], key=lambda s: s["start"] + s["duration"]))
+    return [{"name": s["name"], "duration": s["duration"], "attributes": s["attributes"]} for s in path]
+
+
+class JsonExporter:
+    """
+    Writes every finished span to one JSON file, rewritten whenever a root span ends and
+    at exit, together with the run's critical path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        with self._lock:
+            self._spans.append(span.to_dict())
+        if span.parent_id is None:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start"])
+            if not spans:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"spans": spans, "critical_path": critical_path(spans)}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+
+    def shutdown(self):
+        self.flush()
+
+
+class OpenTelemetryExporter:
+    """Mirrors spans into the OpenTelemetry API (needs `opentelemetry-api` and an SDK set up)."""
+
+    def __init__(self, tracer_name: str = "sparkforge"):
+        try:
+            from opentelemetry import trace
+            from opentelemetry.trace import Status, StatusCode
+        except ImportError:
+            raise ImportError("OpenTelemetry tracing needs 'opentelemetry-api'. Install it with 'pip install opentelemetry-sdk'.")
+        self._trace = trace
+        self._status = (Status, StatusCode)
+        self._tracer = trace.get_tracer(tracer_name)
+        self._live: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        with self._lock:
+            parent = self._live.get(span.parent_id)
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self._tracer.start_span(span.name, context=context, attributes=span.attributes,
+                                            start_time=int(span.start * 1e9))
+        with self._lock:
+            self._live[span.span_id] = otel_span
+
+    def on_end(self, span: Span):
+        with self._lock:
+            otel_span = self._live.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes(span.attributes)
+        if span.error:
+            Status, StatusCode = self._status
+            otel_span.set_status(Status(StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+    def shutdown(self):
+        provider = self._trace.get_tracer_provider()
+        if hasattr(provider, "force_flush"):
+            provider.force_flush()
+
+
+_TRACER: Optional[Tracer] = None
+_TRACER_LOCK = threading.Lock()
+
+
+def default_trace_path(prefix: str = "trace") -> str:
+    return os.path.join(DEFAULT_TRACE_DIR, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+
+
+def _exporter_for(target: str) -> Any:
+    if target == "otel":
+        return OpenTelemetryExporter()
+    if target in ("1", "true", "json"):
+        return JsonExporter(default_trace_path())
+    return JsonExporter(os.path.abspath(target))
+
+
+def _build_tracer(target: Optional[str]) -> Tracer:
+    tracer = Tracer([_exporter_for(target)] if target else [])
+    if tracer.enabled:
+        atexit.register(tracer.shutdown)
+    return tracer
+
+
+def configure_tracing(target: Optional[str]) -> Tracer:
+    """
+    Replaces the process-wide tracer. `target` is "otel", "json" (default path under
+    .agent/traces/), a JSON file path, or None/"" to switch tracing off.
+    """
+    global _TRACER
+    tracer = _build_tracer(target)
+    with _TRACER_LOCK:
+        previous, _TRACER = _TRACER, tracer
+    if previous is not None:
+        previous.shutdown()
+    return tracer
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer, configured from SPARKFORGE_TRACE on first use."""
+    global _TRACER
+    with _TRACER_LOCK:
+        if _TRACER is None:
+            _TRACER = _build_tracer(os.environ.get("SPARKFORGE_TRACE", "").strip())
+        return _TRACER
+
+
+def trace_file() -> Optional[str]:
+    """Path of the active JSON trace, if any."""
+    for exporter in get_tracer().exporters:
+        if isinstance(exporter, JsonExporter):
+            return exporter.path
+    return None
+
+
+def traced(name: str, **attributes) -> Callable:
+    """Decorator: runs the function inside a span named `name`."""
+    def decorator(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                with get_tracer().span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
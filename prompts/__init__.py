@@ -1,9 +1,5 @@
-from .templates import (
-    AffirmativePrompt, AffirmativeConfig,
-    NegativePrompt, NegativeConfig,
-    AdjudicatorPrompt, AdjudicatorConfig,
-    loader
-)
+from . import templates
+from .templates import loader
 
 __all__ = [
     "AffirmativePrompt", "AffirmativeConfig",
@@ -11,3 +7,8 @@ __all__ = [
     "AdjudicatorPrompt", "AdjudicatorConfig",
     "loader"
 ]
+
+
+def __getattr__(name):
+    # Role prompts are parsed on first access, see prompts.templates
+    return getattr(templates, name)
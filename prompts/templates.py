@@ -1,5 +1,4 @@
 import os
-import yaml
 from pathlib import Path
 from typing import Dict, Any, Tuple
 
@@ -7,24 +6,34 @@ from typing import Dict, Any, Tuple
 PROMPT_DIR = Path(__file__).parent
 
 class PromptLoader:
+    """Loads `<role>.md` prompt files on first access, so importing this module parses nothing."""
+
     def __init__(self):
         self._prompts = {}
         self._configs = {}
-        self._load_all()
 
     def _load_all(self):
         """Load all markdown prompt files in the directory."""
         for md_file in PROMPT_DIR.glob("*.md"):
-            name = md_file.stem
+            self._load(md_file.stem)
+
+    def _load(self, role: str):
+        if role in self._prompts:
+            return
+        md_file = PROMPT_DIR / f"{role}.md"
+        if md_file.exists():
             content, config = self._parse_file(md_file)
-            self._prompts[name] = content
-            self._configs[name] = config
+        else:
+            content, config = "", {}
+        self._prompts[role] = content
+        self._configs[role] = config
 
     def _parse_file(self, filepath: Path) -> Tuple[str, Dict[str, Any]]:
         """Parse a markdown file with YAML front matter."""
         text = filepath.read_text(encoding="utf-8")
         
         if text.startswith("---\n"):
+            import yaml
             parts = text.split("---\n", 2)
             if len(parts) >= 3:
                 # Part 0 is empty, Part 1 is YAML, Part 2 is content
@@ -43,23 +52,33 @@ class PromptLoader:
 
     def get_prompt(self, role: str) -> str:
         """Get the raw prompt text for a role."""
+        self._load(role)
         return self._prompts.get(role, "")
 
     def get_config(self, role: str) -> Dict[str, Any]:
         """Get the model configuration for a role."""
+        self._load(role)
         return self._configs.get(role, {})
 
 # Singleton instance for easy import
 loader = PromptLoader()
 
-# Exposed variables for direct access
+# Exposed variables for direct access, resolved (and cached) on first access
 # Example usage: from prompts.templates import AffirmativePrompt, AffirmativeConfig
-AffirmativePrompt = loader.get_prompt("affirmative")
-AffirmativeConfig = loader.get_config("affirmative")
-
-NegativePrompt = loader.get_prompt("negative")
-NegativeConfig = loader.get_config("negative")
+ROLE_EXPORTS = {
+    "AffirmativePrompt": ("affirmative", "prompt"),
+    "AffirmativeConfig": ("affirmative", "config"),
+    "NegativePrompt": ("negative", "prompt"),
+    "NegativeConfig": ("negative", "config"),
+    "AdjudicatorPrompt": ("adjudicator", "prompt"),
+    "AdjudicatorConfig": ("adjudicator", "config"),
+}
 
-AdjudicatorPrompt = loader.get_prompt("adjudicator")
-AdjudicatorConfig = loader.get_config("adjudicator")
+def __getattr__(name):
+    if name not in ROLE_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    role, kind = ROLE_EXPORTS[name]
+    value = loader.get_prompt(role) if kind == "prompt" else loader.get_config(role)
+    globals()[name] = value
+    return value
 
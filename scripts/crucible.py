@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+The Crucible Engine
+
+Runs the Crucible protocol (.agent/workflows/crucible.md) end-to-end in one process:
+
+    scan -> debate -> score -> backup -> mend -> history -> (next loop)
+
+One warm LLMClient serves the Oracle scanner, the Council and the Surgeon. Every phase
+ends with a checkpoint in docs/reports/{path}/{stem}/crucible_state.json, so `--resume`
+picks a crashed or paused run up at the first unfinished phase. Completed phases are
+never repeated, and the client's response cache answers the calls an interrupted phase
+had already paid for, so a resume only pays for what is actually new.
+
+Knowledge retrieval (Phase 1) stays an agent action: the latest
+docs/knowledge/{path}/{stem}/latest.md, if any, is injected into every debate.
+"""
+import re
+import sys
+import json
+import shutil
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Tuple
+
+# Adjust path to include project root for imports
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.append(str(project_root))
+
+from llm import LLMClient
+from llm.tracing import configure_tracing, default_trace_path, get_tracer, trace_file, traced
+from scripts.dialecta_debate import Colors, arun_debate, format_tokens, report_dir_for
+from scripts.oracle_scanner import get_project_isolated_path, scan_for_questions
+
+STATE_NAME = "crucible_state.json"
+STATE_VERSION = 1
+
+PHASES = ("scan", "debate", "score", "backup", "mend", "history")
+
+# Convergence rules (crucible.md, Phase 3)
+MAX_LOOPS = 3
+SUCCESS_SCORE = 90
+ROLLBACK_DELTA = -10  # A drop beyond this restores the previous loop's backup
+STASIS_DELTA = 5      # Gains below this for STASIS_LOOPS loops in a row mean the loop has stalled
+STASIS_LOOPS = 2
+
+# Weighted scoring matrix: dimension -> (label in the verdict, weight)
+SCORE_WEIGHTS = {
+    "strategic": ("Strategic Alignment", 40),
+    "practical": ("Practical Value", 30),
+    "logical": ("Logical Consistency", 30),
+}
+APPROVED = ("直接通过", "approved")
+
+SURGEON_PROVIDER = "deepseek"
+SURGEON_MODEL = "deepseek-chat"
+
+SURGEON_PROMPT = """
+You are "The Surgeon" of the SparkForge Crucible. Apply the Adjudicator's Mending Orders to the target document with precise, atomic edits.
+
+Initial Objective: {instruction}
+
+Mending Orders:
+{orders}
+
+Target Document:
+{target_content}
+
+Instructions:
+1. Existence Guard: only act on orders that refer to text that actually exists in the document. Skip hallucinated critiques.
+2. Objective Check: never trade away the Initial Objective for a local improvement.
+3. Keep the document's language, tone and Markdown structure. Do not rewrite untouched passages.
+4. Express every change as a search/replace block. ORIGINAL must be copied verbatim from the document and be unique in it.
+
+Output Format (repeat per edit, nothing else):
+<<<<<<< ORIGINAL
+exact original text
+=======
+revised text
+>>>>>>> REVISED
+"""
+
+EDIT_BLOCK = re.compile(r'<<<<<<< ORIGINAL\n(.*?)\n?=======\n(.*?)\n?>>>>>>> REVISED', re.DOTALL)
+
+
+@dataclass
+class Verdict:
+    """The Adjudicator's scores, normalised to the 40/30/30 matrix (points per dimension)."""
+    score: Optional[float]
+    conclusion: str = ""
+    scores: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def approved(self) -> bool:
+        return any(word in self.conclusion.lower() for word in APPROVED)
+
+
+def parse_verdict(text: str) -> Verdict:
+    """
+    Reads the weighted scores from an Adjudicator verdict (or a whole debate report).
+
+    Each dimension may be scored against its weight ([32/40]) or out of 100 ([80/100]);
+    both are normalised to its weight. Without all three, the stated total is used.
+    """
+    marker = "## ⚖️ Adjudicator (Final Verdict)"
+    if marker in text:
+        text = text.split(marker, 1)[1]
+    scores = {}
+    for key, (label, weight) in SCORE_WEIGHTS.items():
+        match = re.search(rf'{label}[^\n]*?\[\s*(\d+(?:\.\d+)?)\s*/\s*(\d+)\s*\]', text)
+        if match and float(match.group(2)):
+            scores[key] = round(float(match.group(1)) / float(match.group(2)) * weight, 1)
+    score = round(sum(scores.values()), 1) if len(scores) == len(SCORE_WEIGHTS) else None
+    if score is None:
+        total = re.search(r'(?:加权总分|综合评分|评分)[^\d\n]*(\d+(?:\.\d+)?)\s*/\s*100', text)
+        score = float(total.group(1)) if total else None
+    conclusion = re.search(r'结论\s*[：:]\s*([^】\]\n]+)', text)
+    return Verdict(score, conclusion.group(1).strip() if conclusion else "", scores)
+
+
+def mending_orders(text: str) -> str:
+    """The Mending Orders section of a verdict; the whole verdict if it has none."""
+    marker = "## ⚖️ Adjudicator (Final Verdict)"
+    if marker in text:
+        text = text.split(marker, 1)[1]
+    match = re.search(r'#+\s*\d*\.?\s*强制修补指令[^\n]*\n(.*?)(?=\n#+\s*\d*\.?\s*元裁决|\Z)', text, re.DOTALL)
+    return (match.group(1) if match else text).strip()
+
+
+def converge(scores: List[Optional[float]], approved: bool) -> Tuple[str, str]:
+    """
+    Applies the convergence rules to the scores so far (current loop last).
+    Returns (decision, reason) with decision one of success/rollback/stasis/anomaly/continue.
+    """
+    score = scores[-1]
+    if score is None:
+        return "anomaly", "no weighted score found in the verdict"
+    if score >= SUCCESS_SCORE and approved:
+        return "success", f"score {score:g} >= {SUCCESS_SCORE} and approved"
+    known = [s for s in scores if s is not None]
+    deltas = [b - a for a, b in zip(known, known[1:])]
+    if deltas and deltas[-1] < ROLLBACK_DELTA:
+        return "rollback", f"score fell by {-deltas[-1]:g}, more than {-ROLLBACK_DELTA}"
+    if len(deltas) >= STASIS_LOOPS and all(d < STASIS_DELTA for d in deltas[-STASIS_LOOPS:]):
+        return "stasis", f"gained less than {STASIS_DELTA} points for {STASIS_LOOPS} loops"
+    return "continue", f"score {score:g}"
+
+
+def apply_edits(text: str, reply: str) -> Tuple[str, int, List[str]]:
+    """Applies the Surgeon's search/replace blocks; ORIGINAL text that is missing or ambiguous is rejected."""
+    applied, rejected = 0, []
+    for original, revised in EDIT_BLOCK.findall(reply):
+        count = text.count(original) if original.strip() else 0
+        if count != 1:
+            rejected.append(f"{'not found' if count == 0 else 'ambiguous'}: {original.strip()[:60]}")
+            continue
+        text = text.replace(original, revised, 1)
+        applied += 1
+    return text, applied, rejected
+
+
+class CrucibleEngine:
+    """
+    One Crucible run over a target. `state` is the checkpoint: the current loop and its
+    last completed phase, plus one record per loop with every phase's artifacts.
+    """
+
+    def __init__(self, target: str, instruction: str = "", max_loops: int = MAX_LOOPS, cite: bool = True,
+                 incremental: bool = True, surgeon: str = "llm", client: Optional[LLMClient] = None,
+                 state: Optional[dict] = None):
+        self.target = Path(target).absolute()
+        self.report_dir = report_dir_for(self.target)
+        self.state_path = self.report_dir / STATE_NAME
+        self.history_path = self.report_dir / "history_summary.md"
+        self.state = state or {
+            "version": STATE_VERSION,
+            "target": str(self.target),
+            "instruction": instruction,
+            "max_loops": max_loops,
+            "cite": cite,
+            "incremental": incremental,
+            "surgeon": surgeon,
+            "status": "running",
+            "loop": 1,
+            "phase": None,
+            "loops": [{"loop": 1}],
+        }
+        # The response cache is what lets a resumed phase replay the calls it already paid for
+        self.client = client or LLMClient(context_id=str(self.target), cache=True)
+
+    @classmethod
+    def resume(cls, target: str, **kwargs) -> Optional["CrucibleEngine"]:
+        """The engine for the target's saved checkpoint, or None if there is none."""
+        path = report_dir_for(Path(target).absolute()) / STATE_NAME
+        try:
+            state = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != STATE_VERSION:
+            return None
+        return cls(target, state=state, **kwargs)
+
+    @property
+    def record(self) -> dict:
+        return self.state["loops"][-1]
+
+    def checkpoint(self):
+        self.state["updated_at"] = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp.replace(self.state_path)
+
+    @traced("crucible")
+    async def run(self) -> dict:
+        """Runs (or resumes) loops until an exit condition; returns the final state."""
+        tracer = get_tracer()
+        if self.state["status"] == "paused":
+            self.state["status"] = "running"
+        while self.state["status"] == "running":
+            record = self.record
+            done = PHASES.index(self.state["phase"]) + 1 if self.state["phase"] else 0
+            for phase in PHASES[done:]:
+                print(f"\n{Colors.HEADER}🔥 [Loop {record['loop']}/{self.state['max_loops']}] {phase.capitalize()}{Colors.ENDC}")
+                with tracer.span(f"crucible.{phase}", loop=record["loop"]):
+                    await getattr(self, f"_{phase}")(record)
+                self.state["phase"] = phase
+                self.checkpoint()
+                if self.state["status"] != "running":
+                    return self.state  # Paused for an external Surgeon
+            decision = record.get("decision", "continue")
+            if decision != "continue":
+                self.state["status"] = decision
+            elif record["loop"] >= self.state["max_loops"]:
+                self.state["status"] = "timeout"
+            else:
+                self.state["loop"] += 1
+                self.state["phase"] = None
+                self.state["loops"].append({"loop": self.state["loop"]})
+            self.checkpoint()
+        return self.state
+
+    # ---------------------------------------------------------
+    # Phases: each reads/writes its loop record
+    # ---------------------------------------------------------
+
+    async def _scan(self, record):
+        request = await asyncio.to_thread(scan_for_questions, str(self.target), self.client)
+        record["scan"] = str(request)
+
+    async def _debate(self, record):
+        knowledge = get_project_isolated_path(self.target, "knowledge") / "latest.md"
+        outcome = {}
+        report = await arun_debate(
+            str(self.target),
+            str(self.history_path) if self.history_path.exists() else "",
+            self.state["instruction"],
+            client=self.client,
+            outcome=outcome,
+            loop=record["loop"],
+            cite_check=self.state["cite"],
+            incremental=self.state["incremental"],
+            oracle_file=str(knowledge) if knowledge.exists() else "",
+        )
+        if not report:
+            raise RuntimeError(f"debate failed: {outcome.get('error', 'see log')} ({outcome.get('log')})")
+        record["debate"] = {k: outcome.get(k) for k in ("report", "verdict", "prompt_tokens", "completion_tokens",
+                                                         "cost", "saved_tokens")}
+
+    async def _score(self, record):
+        verdict = parse_verdict(Path(record["debate"]["report"]).read_text(encoding='utf-8'))
+        scores = [r["score"]["score"] for r in self.state["loops"][:-1] if "score" in r] + [verdict.score]
+        known = [s for s in scores[:-1] if s is not None]
+        decision, reason = converge(scores, verdict.approved)
+        record["score"] = dict(asdict(verdict), approved=verdict.approved,
+                               delta=round(verdict.score - known[-1], 1) if known and verdict.score is not None else None)
+        record["decision"], record["reason"] = decision, reason
+        delta = f" (Δ {record['score']['delta']:+g})" if record["score"]["delta"] is not None else ""
+        score = f"{verdict.score:g}/100" if verdict.score is not None else "unscored"
+        print(f"⚖️  Score {score}{delta} · {verdict.conclusion or 'no conclusion'} → {decision.upper()}: {reason}")
+
+    async def _backup(self, record):
+        if record["decision"] == "rollback":
+            # The edits that led here are undone by restoring the previous loop's snapshot
+            previous = next((r for r in reversed(self.state["loops"][:-1]) if r.get("backup")), None)
+            if previous:
+                shutil.copyfile(previous["backup"]["target"], self.target)
+                if previous["backup"].get("history"):
+                    shutil.copyfile(previous["backup"]["history"], self.history_path)
+                record["restored"] = previous["backup"]["target"]
+                print(f"⏪ Rolled back to {previous['backup']['target']}")
+            return
+        if record["decision"] != "continue":
+            return
+        backups = self.report_dir / "backups"
+        backups.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stem = self.target.stem
+        record["backup"] = {"target": str(backups / f"{stem}_loop_{record['loop']}_{stamp}.md")}
+        shutil.copyfile(self.target, record["backup"]["target"])
+        if self.history_path.exists():
+            record["backup"]["history"] = str(backups / f"{stem}_history_loop_{record['loop']}_{stamp}.md")
+            shutil.copyfile(self.history_path, record["backup"]["history"])
+        print(f"💾 Snapshot: {record['backup']['target']}")
+
+    async def _mend(self, record):
+        if record["decision"] != "continue":
+            return
+        report = Path(record["debate"]["report"]).read_text(encoding='utf-8')
+        content = self.target.read_text(encoding='utf-8')
+        prompt = SURGEON_PROMPT.format(instruction=self.state["instruction"] or "未指定",
+                                       orders=mending_orders(report), target_content=content)
+        budget = self.client.prompt_budget(provider=SURGEON_PROVIDER, model=SURGEON_MODEL,
+                                           messages=[{"role": "user", "content": prompt}], max_tokens=8192)
+        if self.state["surgeon"] == "agent" or budget < 0:
+            # Too large for one Surgeon call (or asked for): an agent applies the orders, then --resume
+            record["mend"] = {"mode": "agent"}
+            self.state["status"] = "paused"
+            print(f"{Colors.YELLOW}⏸️  Apply the Mending Orders in {record['debate']['report']} to {self.target}, "
+                  f"then run again with --resume.{Colors.ENDC}")
+            return
+        response = await self.client.achat(
+            messages=[{"role": "user", "content": prompt}],
+            provider=SURGEON_PROVIDER,
+            model=SURGEON_MODEL,
+            temperature=0.2,
+            max_tokens=8192,
+            role="surgeon",
+            context=str(self.target),
+        )
+        mended, applied, rejected = apply_edits(content, response.content)
+        if applied:
+            self.target.write_text(mended, encoding='utf-8')
+        record["mend"] = {"mode": "llm", "applied": applied, "rejected": rejected}
+        print(f"⚡ Surgeon: {applied} edits applied" + (f", {len(rejected)} rejected" if rejected else ""))
+        for reason in rejected:
+            print(f"   {Colors.YELLOW}✂️  {reason}{Colors.ENDC}")
+
+    async def _history(self, record):
+        previous = self.history_path.read_text(encoding='utf-8') if self.history_path.exists() else "# Crucible History\n"
+        if re.search(rf"^## Loop {record['loop']} ", previous, re.MULTILINE):
+            return  # Written before a crash that preceded the checkpoint; --resume must not repeat it
+        score = record["score"]
+        lines = [
+            f"## Loop {record['loop']} · {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            "",
+            f"- **Score**: {score['score'] if score['score'] is not None else 'N/A'}/100"
+            + (f" (Δ {score['delta']:+g})" if score["delta"] is not None else "")
+            + f" · **Conclusion**: {score['conclusion'] or 'N/A'}",
+            f"- **Verdict**: {' '.join((record['debate'].get('verdict') or 'See report').split())}",
+            f"- **Decision**: {record['decision']} ({record['reason']})",
+        ]
+        mend = record.get("mend")
+        if mend and mend["mode"] == "llm":
+            lines.append(f"- **Edits**: {mend['applied']} applied, {len(mend['rejected'])} rejected")
+        elif mend:
+            lines.append("- **Edits**: applied by agent")
+        if record.get("restored"):
+            lines.append(f"- **Rollback**: restored `{Path(record['restored']).name}`")
+        lines.append(f"- **Report**: `{Path(record['debate']['report']).name}`")
+        self.history_path.write_text(previous.rstrip("\n") + "\n\n" + "\n".join(lines) + "\n", encoding='utf-8')
+
+
+def summarize(state: dict) -> str:
+    """One line per loop plus the exit status, for the console."""
+    lines = []
+    for r in state["loops"]:
+        score = r.get("score", {}).get("score")
+        tokens = ""
+        if r.get("debate"):
+            d = r["debate"]
+            tokens = f" | {format_tokens((d.get('prompt_tokens') or 0) + (d.get('completion_tokens') or 0))} tokens"
+            if d.get("saved_tokens"):
+                tokens += f" (♻️ {format_tokens(d['saved_tokens'])} saved)"
+        lines.append(f"  Loop {r['loop']}: {score if score is not None else '-'}/100 → {r.get('decision', 'pending')}{tokens}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SparkForge Crucible Engine")
+    parser.add_argument("target", help="Document to be refined")
+    parser.add_argument("--instruction", "-i", help="Initial optimization objective", default="")
+    parser.add_argument("--max-loops", type=int, default=None, help=f"Maximum iteration cycles (default {MAX_LOOPS})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the target's last run from its checkpoint, with the options it was started with")
+    parser.add_argument("--surgeon", choices=("llm", "agent"), default="llm",
+                        help="Apply Mending Orders with an LLM, or pause for an agent and --resume")
+    parser.add_argument("--no-cite", action="store_true", help="Disable strict citation enforcement")
+    parser.add_argument("--full", action="store_true", help="Re-debate the whole document every loop")
+    parser.add_argument("--trace", nargs="?", const="json", default=None,
+                        help="Record a span trace of the run: a JSON file path (default .agent/traces/) or 'otel'")
+
+    args = parser.parse_args()
+    if args.resume and (args.instruction or args.max_loops is not None):
+        parser.error("--instruction and --max-loops are fixed when a run starts and cannot be changed with --resume")
+    if not Path(args.target).is_file():
+        print(f"{Colors.RED}Error: Target file not found: {args.target}{Colors.ENDC}")
+        sys.exit(1)
+    if args.trace:
+        configure_tracing(default_trace_path("crucible") if args.trace == "json" else args.trace)
+
+    engine = CrucibleEngine.resume(args.target) if args.resume else None
+    if args.resume and not engine:
+        print(f"{Colors.RED}Error: No checkpoint to resume for {args.target}{Colors.ENDC}")
+        sys.exit(1)
+    if engine and engine.state["status"] not in ("running", "paused"):
+        print(f"Run already finished: {engine.state['status'].upper()}\n{summarize(engine.state)}")
+        sys.exit(0)
+    if engine:
+        print(f"{Colors.CYAN}↩️  Resuming loop {engine.state['loop']} after phase "
+              f"'{engine.state['phase'] or 'start'}'{Colors.ENDC}")
+    else:
+        max_loops = MAX_LOOPS if args.max_loops is None else args.max_loops
+        engine = CrucibleEngine(args.target, args.instruction, max_loops, cite=not args.no_cite,
+                                incremental=not args.full, surgeon=args.surgeon)
+
+    try:
+        state = asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}⚠️  Interrupted. Continue with --resume.{Colors.ENDC}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n{Colors.RED}💥 Loop {engine.state['loop']} failed after phase "
+              f"'{engine.state['phase'] or 'start'}': {e}. Continue with --resume.{Colors.ENDC}")
+        sys.exit(1)
+
+    color = Colors.GREEN if state["status"] == "success" else Colors.YELLOW
+    print(f"\n{color}🏁 Crucible {state['status'].upper()}{Colors.ENDC}\n{summarize(state)}")
+    print(f"📜 History: {engine.history_path}")
+    if trace_file():
+        print(f"🧭 Trace: {trace_file()}")
+    sys.exit(0 if state["status"] in ("success", "paused") else 2)
@@ -0,0 +1,129 @@
+"""
+Debate Snapshots for incremental Crucible loops.
+
+After a section-mode debate, the target's sections and each role's per-section critique
+are saved next to the debate reports. The next loop splits the (edited) target the same
+way and matches sections by content hash: only changed sections go back to the Council,
+while untouched ones reuse their saved critiques, with [Line XX] citations shifted to
+wherever the section now sits in the file.
+"""
+import re
+import json
+import difflib
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from scripts.sections import Section
+
+SNAPSHOT_NAME = "debate_snapshot.json"
+SNAPSHOT_VERSION = 1
+
+LINE_CITATION = re.compile(r'\[Line\s*(\d+)(?:\s*-\s*(\d+))?\]')
+
+
+def section_hash(section: Section) -> str:
+    """Content identity of a section; independent of where it sits in the file."""
+    return hashlib.sha256(section.text.encode('utf-8')).hexdigest()[:16]
+
+
+def fingerprint(*parts: str) -> str:
+    """Identity of everything besides the section text that shapes a critique (prompts, objective, flags)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+def shift_citations(text: str, delta: int) -> str:
+    """Moves every [Line XX] / [Line XX-YY] citation by `delta` lines."""
+    if not delta:
+        return text
+
+    def shift(match):
+        start = int(match.group(1)) + delta
+        if match.group(2):
+            return f"[Line {start}-{int(match.group(2)) + delta}]"
+        return f"[Line {start}]"
+
+    return LINE_CITATION.sub(shift, text)
+
+
+def diff_stats(old: str, new: str) -> Dict[str, int]:
+    """Lines added/removed between two versions of the target."""
+    added = removed = 0
+    for line in difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=0):
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return {"added": added, "removed": removed}
+
+
+class DebateSnapshot:
+    """
+    One debate's sections and critiques. `sections` holds, in document order:
+    {"hash", "title", "start_line", "end_line", "critiques": {role: {"content", "tokens"}}}
+    where a critique's content cites lines as of this snapshot and `tokens` is what it
+    originally cost (prompt + completion), i.e. what reusing it saves.
+    """
+
+    def __init__(self, fingerprint: str, text: str = "", sections: Optional[List[dict]] = None,
+                 loop: int = 0, created_at: str = ""):
+        self.fingerprint = fingerprint
+        self.text = text
+        self.sections = sections or []
+        self.loop = loop
+        self.created_at = created_at or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._by_hash = {s["hash"]: s for s in self.sections}
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: str) -> Optional["DebateSnapshot"]:
+        """The saved snapshot, or None if missing, unreadable or made under different prompts/objective."""
+        try:
+            data = json.loads(Path(path).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SNAPSHOT_VERSION or data.get("fingerprint") != fingerprint:
+            return None
+        return cls(fingerprint, data.get("text", ""), data.get("sections", []),
+                   data.get("loop", 0), data.get("created_at", ""))
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "fingerprint": self.fingerprint,
+            "loop": self.loop,
+            "created_at": self.created_at,
+            "text": self.text,
+            "sections": self.sections,
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp.replace(path)
+
+    def critique(self, section: Section, role: str) -> Optional[dict]:
+        """The saved critique of an unchanged section, its citations moved to the section's new lines."""
+        entry = self._by_hash.get(section_hash(section))
+        if not entry or role not in entry["critiques"]:
+            return None
+        saved = entry["critiques"][role]
+        return {
+            "content": shift_citations(saved["content"], section.start_line - entry["start_line"]),
+            "tokens": saved.get("tokens", 0),
+        }
+
+    def add(self, section: Section, role: str, content: str, tokens: int):
+        """Records one role's critique of a section (called in document order)."""
+        key = section_hash(section)
+        entry = self._by_hash.get(key)
+        if entry is None:
+            entry = {"hash": key, "title": section.title, "start_line": section.start_line,
+                     "end_line": section.end_line, "critiques": {}}
+            self.sections.append(entry)
+            self._by_hash[key] = entry
+        entry["critiques"][role] = {"content": content, "tokens": tokens}
@@ -13,11 +13,13 @@ import os
 import argparse
 import logging
 import time
-import threading
+import asyncio
 import itertools
+import glob
+import json
+import math
 from pathlib import Path
 from datetime import datetime
-import concurrent.futures
 import re
 
 # Adjust path to include project root for imports
@@ -26,12 +28,50 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 
 from llm import LLMClient
+from llm.tokens import PromptBlock, count_tokens, fit_blocks
+from llm.ledger import estimate_cost
+from llm.tracing import configure_tracing, default_trace_path, get_tracer, trace_file, traced
+from llm.replay import Replay
+from llm.deadline import CancelToken, Deadline
+from llm.ratelimit import get_rate_limiter
+from llm.models import LLMResponse, Usage
 from prompts.templates import (
     AffirmativeConfig, AffirmativePrompt,
     NegativeConfig, NegativePrompt,
     AdjudicatorConfig, AdjudicatorPrompt,
 )
-from scripts.grounding_verifier import run_grounding_check
+from scripts.grounding_verifier import GroundingVerifier, StreamingGrounding, summarize_grounding
+from scripts.sections import split_sections, outline
+from scripts.debate_snapshot import SNAPSHOT_NAME, DebateSnapshot, diff_stats, fingerprint
+
+# Wall-clock limit for the parallel argument phase, retries and fallbacks included
+ARGUMENT_TIMEOUT = 240
+
+# Section mode (documents too large for one request): section size, concurrent section
+# streams across both roles, and the smallest per-section answer cap
+SECTION_TOKENS = 6000
+SECTION_CONCURRENCY = 6
+SECTION_MIN_OUTPUT = 1024
+
+# Incremental mode: smaller sections anchored on chapter headings (level <= 2), so an edit
+# invalidates as little saved critique as possible
+INCREMENTAL_SECTION_TOKENS = 2000
+INCREMENTAL_ANCHOR_LEVEL = 2
+
+# Batch mode: debates run at once, and the rate-limiter key of the optional global token budget
+BATCH_JOBS = 4
+BATCH_BUDGET = "debate-batch"
+
+# Lower priority is trimmed first when a prompt would overflow a model's context window
+TRIM_PRIORITY = {
+    "history_summary": 0,
+    "oracle_fact_check": 1,
+    "document_outline": 2,
+    "grounding_report": 2,
+    "affirmative": 3,
+    "negative": 3,
+    "target_material": 4,
+}
 
 # ANSI Colors for CLI
 class Colors:
@@ -44,49 +84,70 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
-class ThinkingSpinner:
-    def __init__(self, message="Thinking...", delay=0.1):
+class ProgressLine:
+    """
+    One-line live status for a streaming phase. It is redrawn by the stream consumers as
+    tokens arrive (at most every `interval` seconds), and by an event-loop timer every
+    `idle` seconds while the providers are silent; no thread polls stdout.
+    """
+
+    def __init__(self, message="Thinking...", status=None, interval=0.1, idle=1.0, enabled=True):
+        self.enabled = enabled  # Off for concurrent batch debates, which would overwrite each other's line
         self.spinner = itertools.cycle(['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏'])
-        self.delay = delay
         self.message = message
-        self.running = False
-        self.thread = None
+        self.status = status  # Optional callable returning live progress text
+        self.interval = interval
+        self.idle = idle
+        self._drawn_at = 0.0
+        self._timer = None
+        self._width = len(message)
+
+    def _draw(self):
+        self._drawn_at = time.monotonic()
+        line = f"{self.message} {self.status()}" if self.status else self.message
+        self._width = max(self._width, len(line))
+        sys.stdout.write(f"\r{Colors.CYAN}{next(self.spinner)}{Colors.ENDC} {line}")
+        sys.stdout.flush()
+
+    def _tick(self):
+        if time.monotonic() - self._drawn_at >= self.idle:
+            self._draw()
+        self._timer = asyncio.get_running_loop().call_later(self.idle, self._tick)
 
-    def spin(self):
-        while self.running:
-            sys.stdout.write(f"\r{Colors.CYAN}{next(self.spinner)}{Colors.ENDC} {self.message}")
-            sys.stdout.flush()
-            time.sleep(self.delay)
+    def update(self):
+        if self.enabled and time.monotonic() - self._drawn_at >= self.interval:
+            self._draw()
 
     def __enter__(self):
-        self.running = True
-        self.thread = threading.Thread(target=self.spin)
-        self.thread.start()
+        if self.enabled:
+            self._drawn_at = time.monotonic()
+            self._timer = asyncio.get_running_loop().call_later(self.idle, self._tick)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.running = False
-        if self.thread:
-            self.thread.join()
-        sys.stdout.write(f"\r{' ' * (len(self.message) + 40)}\r")
+        if not self.enabled:
+            return
+        self._timer.cancel()
+        sys.stdout.write(f"\r{' ' * (self._width + 40)}\r")
         sys.stdout.flush()
 
 # Setup Logging
-def setup_logging(log_dir: Path):
+def setup_logging(log_dir: Path, name: str = "DialectaDebate", tag: str = "", console: bool = True, keep: int = 20):
     log_dir.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_dir / f"debate_exec_{timestamp}.log"
+    log_file = log_dir / f"debate_exec_{timestamp}{'_' + tag if tag else ''}.log"
     
     existing_logs = sorted(log_dir.glob("debate_exec_*.log"))
-    if len(existing_logs) > 20:
-        for old_log in existing_logs[:-20]:
+    if keep and len(existing_logs) > keep:
+        for old_log in existing_logs[:-keep]:
             try:
                 old_log.unlink()
             except:
                 pass
     
-    logger = logging.getLogger("DialectaDebate")
+    logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
+    logger.propagate = False
     
     if logger.hasHandlers():
         logger.handlers.clear()
@@ -96,16 +157,22 @@ def setup_logging(log_dir: Path):
     fh_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     fh.setFormatter(fh_formatter)
     
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setLevel(logging.INFO)
-    ch_formatter = logging.Formatter('%(message)s')
-    ch.setFormatter(ch_formatter)
-    
     logger.addHandler(fh)
-    logger.addHandler(ch)
+    if console:
+        ch = logging.StreamHandler(sys.stdout)
+        ch.setLevel(logging.INFO)
+        ch_formatter = logging.Formatter('%(message)s')
+        ch.setFormatter(ch_formatter)
+        logger.addHandler(ch)
     
     return logger, log_file
 
+def close_logging(logger: logging.Logger):
+    """Closes and detaches the handlers `setup_logging` attached, releasing the log file."""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
 def read_file(path: str, logger: logging.Logger) -> str:
     try:
         content = Path(path).read_text(encoding='utf-8')
@@ -123,7 +190,30 @@ def prepend_line_numbers(text: str) -> str:
 def format_usage(usage):
     if not usage:
         return "N/A"
-    return f"In:{usage.prompt_tokens} Out:{usage.completion_tokens} Tot:{usage.total_tokens}"
+    cached = f" (cached {usage.cached_tokens})" if usage.cached_tokens else ""
+    return f"In:{usage.prompt_tokens}{cached} Out:{usage.completion_tokens} Tot:{usage.total_tokens}"
+
+def fit_context(blocks, budget, logger):
+    """Trims prompt blocks (name -> (text, keep)) to `budget` tokens in TRIM_PRIORITY order."""
+    texts, trimmed = fit_blocks(
+        [PromptBlock(name, text, TRIM_PRIORITY[name], keep) for name, (text, keep) in blocks.items()],
+        budget
+    )
+    for name, tokens in trimmed.items():
+        logger.warning(f"{Colors.YELLOW}✂️  Context budget: trimmed <{name}> by ~{tokens} tokens{Colors.ENDC}")
+    return texts
+
+def format_latency(ttft, total):
+    if ttft is None:
+        return f"{total:.1f}s"
+    return f"TTFT {ttft:.1f}s / {total:.1f}s"
+
+def format_progress(progress: dict) -> str:
+    """Renders live streaming progress, e.g. 'Affirmative 1200c | Negative waiting'."""
+    parts = []
+    for role, chars in progress.items():
+        parts.append(f"{role} {chars}c" if chars else f"{role} waiting")
+    return " | ".join(parts)
 
 def extract_one_liner(content: str) -> str:
     """Extracts the first executive summary/one-liner found in markdown headers."""
@@ -140,18 +230,92 @@ def extract_one_liner(content: str) -> str:
     return ""
 
 def run_debate(target_file: str, reference_file: str = "", instruction: str = "", **kwargs):
+    """Blocking entry point: runs `arun_debate` on a fresh event loop."""
+    return asyncio.run(arun_debate(target_file, reference_file, instruction, **kwargs))
+
+def report_dir_for(target_file) -> Path:
+    """docs/reports/{path}/{stem}/ for a target under the project (docs/ prefix dropped), else reports/external/."""
+    target_p = Path(target_file).absolute()
+    try:
+        rel_from_root = target_p.relative_to(project_root)
+        rel_dir = rel_from_root.parent
+        if rel_dir.parts and rel_dir.parts[0] == 'docs':
+             rel_dir = Path(*rel_dir.parts[1:])
+    except ValueError:
+        rel_dir = Path("external")
+    return project_root / "docs" / "reports" / rel_dir / target_p.stem
+
+def merge_section_responses(sections, responses, notes=None) -> LLMResponse:
+    """Joins one role's per-section answers into a single response, headed by their line ranges."""
+    notes = notes or [""] * len(sections)
+    content = "\n\n".join(
+        f"### 📑 {section.title} (Lines {section.lines}){note}\n\n{resp.content}"
+        for section, resp, note in zip(sections, responses, notes)
+    )
+    usages = [r.usage for r in responses if r.usage]
+    usage = Usage(
+        prompt_tokens=sum(u.prompt_tokens for u in usages),
+        completion_tokens=sum(u.completion_tokens for u in usages),
+        total_tokens=sum(u.total_tokens for u in usages),
+        cached_tokens=sum(u.cached_tokens for u in usages),
+    ) if usages else None
+    first = responses[0]
+    return LLMResponse(content=content, model=first.model, provider=first.provider, usage=usage, finish_reason="stop")
+
+@traced("debate")
+async def arun_debate(target_file: str, reference_file: str = "", instruction: str = "", **kwargs):
+    """
+    Runs one Council debate and returns the report path, or None on failure.
+
+    The phases form an async pipeline (arguments -> grounding -> adjudication -> report),
+    so debates can be awaited from any event loop and many can share one process and client.
+    A target whose numbered text would have to be trimmed to fit (or any target with
+    `chunked=True`) is debated map-reduce style: Affirmative and Negative argue each Markdown
+    section in parallel, citing original line numbers, and the Adjudicator rules on the
+    merged arguments.
+
+    With `incremental=True` the target is always debated by section and the per-section
+    critiques are saved in a snapshot beside the reports. The next run (the next Crucible
+    loop) only sends sections whose text changed to the Council and reuses the saved
+    critiques for the rest; the Adjudicator still rules on the whole. Snapshots are tied to
+    the role prompts, objective and --cite, not to the history or Oracle files, which
+    change every loop and only reach the Adjudicator's judgement of the merged critiques.
+
+    Batch mode passes a shared `client`, `quiet=True` (file log only, no spinner), its own
+    `log_dir`/`log_tag`, and an `outcome` dict that is filled with the verdict, timings,
+    token usage and cost (or an "error") for the batch index.
+    """
     # Initialize infrastructure
-    log_dir = project_root / "logs"
-    logger, log_file_path = setup_logging(log_dir)
-    
+    outcome = kwargs['outcome'] if kwargs.get('outcome') is not None else {}
+    log_dir = kwargs.get('log_dir') or project_root / "logs"
+    log_tag = kwargs.get('log_tag', "")
+    logger, log_file_path = setup_logging(log_dir, name=f"DialectaDebate.{log_tag}" if log_tag else "DialectaDebate",
+                                          tag=log_tag, console=not kwargs.get('quiet'), keep=0 if log_tag else 20)
+    outcome["log"] = str(log_file_path)
+    try:
+        return await _debate(target_file, reference_file, instruction, logger, **{**kwargs, 'outcome': outcome})
+    finally:
+        # Batch mode runs one debate per target in a single process: release each log file
+        close_logging(logger)
+
+
+async def _debate(target_file: str, reference_file: str, instruction: str, logger: logging.Logger, **kwargs):
+    """The body of `arun_debate`, logging to the logger it set up."""
+    quiet = bool(kwargs.get('quiet'))
+    outcome = kwargs['outcome']
+
     logger.info(f"{Colors.HEADER}🏁 Starting Dialecta Debate Sequence{Colors.ENDC}")
     logger.info(f"📂 Target: {Colors.BOLD}{target_file}{Colors.ENDC}")
     
     start_time = time.time()
     usage_stats = {"affirmative": None, "negative": None, "adjudicator": None}
     time_stats = {}
+    ttft_stats = {}
     
-    client = LLMClient(context_id=str(Path(target_file).absolute()))
+    target_context = str(Path(target_file).absolute())
+    client = kwargs.get('client') or LLMClient(context_id=target_context, cache=kwargs.get('cache'),
+                                               replay=kwargs.get('replay'))
+    tracer = get_tracer()
     
     target_content_raw = read_file(target_file, logger)
     target_content = prepend_line_numbers(target_content_raw)
@@ -171,65 +335,238 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
     instr_block += "</instructions>"
     context_blocks.append(instr_block)
     
+    # Budget material against the tightest role before anything is sent. The adjudicator
+    # additionally needs room for both arguments, bounded by their max_tokens.
+    def fixed(prompt):
+        return [{"role": "system", "content": prompt}, {"role": "user", "content": instr_block}]
+
+    argument_reserve = AffirmativeConfig.get('max_tokens', 8192) + NegativeConfig.get('max_tokens', 8192)
+    context_budget = min(
+        client.prompt_budget(messages=fixed(AffirmativePrompt), **AffirmativeConfig),
+        client.prompt_budget(messages=fixed(NegativePrompt), **NegativeConfig),
+        client.prompt_budget(messages=fixed(AdjudicatorPrompt), **AdjudicatorConfig) - argument_reserve,
+    )
+    incremental = bool(kwargs.get('incremental'))
+    chunked = bool(kwargs.get('chunked')) or incremental
+    if not chunked and count_tokens(target_content) > context_budget:
+        # Rather than cut the document itself, debate it section by section
+        chunked = True
+        logger.info(f"📑 Target exceeds the ~{context_budget} token context budget: debating it section by section")
+    sections = []
+    doc_outline = ""
+    if chunked:
+        if incremental:
+            section_tokens = min(INCREMENTAL_SECTION_TOKENS, context_budget // 2)
+            sections = split_sections(target_content_raw, section_tokens, anchor_level=INCREMENTAL_ANCHOR_LEVEL)
+        else:
+            section_tokens = min(SECTION_TOKENS, context_budget // 2)
+            sections = split_sections(target_content_raw, section_tokens)
+        fitted = fit_context({
+            "history_summary": (ref_content, "tail"),
+            "oracle_fact_check": (oracle_content, "head"),
+            "document_outline": (outline(target_content_raw), "head"),
+        }, context_budget - section_tokens, logger)
+        doc_outline = fitted["document_outline"]
+        logger.info(f"📑 {len(sections)} sections: " + ", ".join(f"L{s.lines}" for s in sections))
+    else:
+        fitted = fit_context({
+            "history_summary": (ref_content, "tail"),
+            "oracle_fact_check": (oracle_content, "head"),
+            "target_material": (target_content, "head"),
+        }, context_budget, logger)
+        target_content = fitted["target_material"]
+    ref_content = fitted["history_summary"]
+    oracle_content = fitted["oracle_fact_check"]
+
+    # Incremental mode: sections unchanged since the previous snapshot keep their critiques
+    previous = snapshot = None
+    changed = list(sections)
+    saved_tokens = {"affirmative": 0, "negative": 0}
+    if incremental:
+        snapshot_path = report_dir_for(target_file) / SNAPSHOT_NAME
+        snapshot_id = fingerprint(instruction, str(bool(kwargs.get('cite_check'))), AffirmativePrompt, NegativePrompt,
+                                  json.dumps([AffirmativeConfig, NegativeConfig], sort_keys=True))
+        previous = DebateSnapshot.load(snapshot_path, snapshot_id)
+        snapshot = DebateSnapshot(snapshot_id, target_content_raw, loop=int(kwargs.get('loop', 0)))
+        if previous:
+            changed = [s for s in sections
+                       if not all(previous.critique(s, role) for role in ("affirmative", "negative"))]
+            stats = diff_stats(previous.text, target_content_raw)
+            logger.info(f"♻️  Incremental: {len(changed)}/{len(sections)} sections changed since loop {previous.loop} "
+                        f"(+{stats['added']}/-{stats['removed']} lines)"
+                        + (": " + ", ".join(f"L{s.lines}" for s in changed) if changed else ""))
+        else:
+            logger.info(f"♻️  Incremental: no snapshot for this target yet, debating all {len(sections)} sections")
+
     if oracle_content:
         context_blocks.append(f"<oracle_fact_check>\n{oracle_content}\n</oracle_fact_check>")
         logger.info(f"🔮 Oracle Knowledge injected ({len(oracle_content)} bytes)")
         
-    context_blocks.append(f"<history_summary>\n{ref_content}\n</history_summary>")
-    context_blocks.append(f"<target_material>\n{target_content}\n</target_material>")
-    
     user_input = "\n\n".join(context_blocks)
+
+    # The bulky material is identical for every role, so it leads each request as its own
+    # system message: providers can then serve it from their prefix cache on later calls.
+    # In section mode the whole-document part is the outline; each section follows it as a
+    # second system message, keeping the shared prefix identical across every section call.
+    shared_context = "\n\n".join([
+        f"<history_summary>\n{ref_content}\n</history_summary>",
+        f"<document_outline>\n{doc_outline}\n</document_outline>" if chunked
+        else f"<target_material>\n{target_content}\n</target_material>",
+    ])
+    line_width = len(str(len(target_content_raw.splitlines())))
+
+    def section_material(i, section):
+        return (f'<target_material section="{i}/{len(sections)}" lines="{section.lines}">\n'
+                f'{section.numbered(line_width)}\n</target_material>')
+
+    def section_request(i, section):
+        return (f"{user_input}\n\n【分段审阅】文档超出单次上下文，本次仅审阅第 {i}/{len(sections)} 部分"
+                f"（Lines {section.lines}：{section.title}）。请只针对本部分发表意见，<document_outline> 提供全文结构；"
+                f"引用一律使用原文行号 [Line XX]。")
     
     # ---------------------------------------------------------
     # Phase 1: Parallel Arguments (Affirmative vs Negative)
     # ---------------------------------------------------------
     
-    def call_phase(role_name, prompt, config):
+    progress = {"Affirmative": 0, "Negative": 0}
+    # Both roles share one deadline; the token lets us abort whichever is still streaming.
+    # Section mode gets one timeout per wave of concurrent section streams.
+    argument_timeout = ARGUMENT_TIMEOUT * (math.ceil(2 * max(1, len(changed)) / SECTION_CONCURRENCY) if chunked else 1)
+    argument_deadline = Deadline(argument_timeout)
+    cancel_arguments = CancelToken()
+    section_slots = asyncio.Semaphore(SECTION_CONCURRENCY)
+
+    # With --cite, each stream's citations are verified while it streams, so a side's
+    # grounding is ready as soon as it finishes rather than after the slower side does
+    verifier = GroundingVerifier(target_content_raw) if kwargs.get('cite_check') else None
+
+    async def ground(label, grounding, content):
+        try:
+            with tracer.span("debate.grounding", side=grounding.source) as span:
+                results = await asyncio.to_thread(grounding.finish, content)
+                span.set(citations=len(results), verified_early=grounding.early)
+            logger.debug(f"[{label}] Grounding ready: {len(results)} citations, {grounding.early} verified while streaming")
+            return results
+        except Exception as e:
+            logger.warning(f"⚠️  Grounding check failed for {label}: {e}")
+            return None
+
+    async def call_phase(role_name, prompt, config, progress_line, material=None, request=None, label=None):
+        """One streamed argument; returns (response, seconds, ttft, grounding results or None)."""
         p_start = time.time()
+        label = label or role_name
         provider = config.get('provider')
         model = config.get('model')
-        logger.info(f"🚀 [{role_name}] Engaging {provider} ({model})...")
+        logger.info(f"🚀 [{label}] Engaging {provider} ({model})...")
+        grounding = StreamingGrounding(verifier, role_name.lower()) if verifier else None
         try:
-            res = client.chat(
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_input}
-                ],
-                **config
-            )
-            return res, time.time() - p_start
+            with tracer.span(f"debate.{role_name.lower()}", provider=provider, model=model):
+                stream = await client.achat_stream(
+                    messages=[
+                        {"role": "system", "content": shared_context},
+                        *([{"role": "system", "content": material}] if material else []),
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": request or user_input}
+                    ],
+                    role=role_name.lower(),
+                    context=target_context,
+                    deadline=argument_deadline,
+                    cancel=cancel_arguments,
+                    **config
+                )
+                logger.debug(f"[{label}] First token from {stream.provider} after {stream.ttft or 0:.2f}s")
+                verifying = None
+                async for delta in stream:
+                    progress[role_name] += len(delta)
+                    progress_line.update()
+                    if grounding and grounding.feed(delta) and (verifying is None or verifying.done()):
+                        verifying = asyncio.create_task(asyncio.to_thread(grounding.verify_pending))
+            duration = time.time() - p_start
+            results = await ground(label, grounding, stream.response.content) if grounding else None
+            return stream.response, duration, stream.ttft, results
         except Exception as e:
-            logger.error(f"❌ {role_name} API Call Failed: {e}")
+            logger.error(f"❌ {label} API Call Failed: {e}")
             raise
 
+    async def argue_sections(role_name, prompt, config, progress_line):
+        """Map step: the role argues every section (bounded concurrency); answers are merged in order."""
+        p_start = time.time()
+        # Split the role's answer budget across sections so the merged arguments still fit the Adjudicator
+        section_config = dict(config, max_tokens=max(SECTION_MIN_OUTPUT, config.get('max_tokens', 8192) // len(sections)))
+
+        role = role_name.lower()
+
+        async def reuse(i, section, saved):
+            label = f"{role_name} §{i}"
+            logger.debug(f"[{label}] Unchanged since loop {previous.loop}: reusing its critique (~{saved['tokens']} tokens)")
+            saved_tokens[role] += saved["tokens"]
+            resp = LLMResponse(content=saved["content"], model=section_config.get('model'),
+                               provider=section_config.get('provider'), usage=None, finish_reason="reused")
+            grounding = StreamingGrounding(verifier, role) if verifier else None
+            results = await ground(label, grounding, resp.content) if grounding else None
+            return resp, 0.0, None, results
+
+        async def argue(i, section):
+            saved = previous.critique(section, role) if previous else None
+            if saved:
+                return await reuse(i, section, saved)
+            async with section_slots:
+                return await call_phase(role_name, prompt, section_config, progress_line,
+                                        material=section_material(i, section), request=section_request(i, section),
+                                        label=f"{role_name} §{i}")
+
+        parts = await asyncio.gather(*(argue(i, s) for i, s in enumerate(sections, start=1)))
+        ttfts = [p[2] for p in parts if p[2] is not None]
+        grounded_parts = [p[3] for p in parts]
+        results = None if verifier is None or any(g is None for g in grounded_parts) else sum(grounded_parts, [])
+        notes = None
+        if snapshot:
+            notes = []
+            for section, (resp, *_) in zip(sections, parts):
+                reused = resp.finish_reason == "reused"
+                tokens = previous.critique(section, role)["tokens"] if reused else (resp.usage.total_tokens if resp.usage else 0)
+                snapshot.add(section, role, resp.content, tokens)
+                notes.append(f" · ♻️ 沿用 Loop {previous.loop} 意见" if reused else "")
+        return (merge_section_responses(sections, [p[0] for p in parts], notes), time.time() - p_start,
+                min(ttfts) if ttfts else None, results)
+
+    argue_role = argue_sections if chunked else call_phase
+
     logger.info(f"\n{Colors.CYAN}🔥 [Council Phase] Generating arguments...{Colors.ENDC}")
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-        msg = "Council members are deliberating...\n"
-        workers_map = {}
-        
-        with ThinkingSpinner(msg, delay=1.0):
-            workers_map["affirmative"] = executor.submit(call_phase, "Affirmative", AffirmativePrompt, AffirmativeConfig)
-            workers_map["negative"] = executor.submit(call_phase, "Negative", NegativePrompt, NegativeConfig)
-            
-            done, not_done = concurrent.futures.wait(workers_map.values(), timeout=240)
-            
-            if not_done:
-                logger.error(f"{Colors.RED}💥 Timeout: Some LLM calls exceeded 240s.{Colors.ENDC}")
-                for f in not_done: f.cancel()
-                return None
+    with tracer.span("debate.arguments"), \
+            ProgressLine("Council members are deliberating...", status=lambda: format_progress(progress),
+                         enabled=not quiet) as progress_line:
+        # Tasks copy the current context, so their spans nest under this phase
+        workers_map = {
+            "affirmative": asyncio.create_task(argue_role("Affirmative", AffirmativePrompt, AffirmativeConfig, progress_line)),
+            "negative": asyncio.create_task(argue_role("Negative", NegativePrompt, NegativeConfig, progress_line)),
+        }
+        done, not_done = await asyncio.wait(workers_map.values(), timeout=argument_timeout)
+
+        if not_done:
+            logger.error(f"{Colors.RED}💥 Timeout: Some LLM calls exceeded {argument_timeout}s.{Colors.ENDC}")
+            # Closes the open streams so the tasks exit now instead of generating unread tokens
+            cancel_arguments.cancel("argument phase timed out")
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+            outcome["error"] = f"argument phase exceeded {argument_timeout}s"
+            return None
 
     # Collect Results
     responses = {}
+    grounded = {}
     
-    def process_result(key, future, color):
+    def process_result(key, task, color):
         try:
-            resp, dur = future.result()
+            resp, dur, ttft, grounded[key] = task.result()
             usage_stats[key] = resp.usage
             time_stats[key] = dur
+            ttft_stats[key] = ttft
             responses[key] = resp
             one_liner = extract_one_liner(resp.content)
-            logger.info(f"{color}✅ {key.capitalize()} generated.{Colors.ENDC} ({format_usage(resp.usage)})")
+            logger.info(f"{color}✅ {key.capitalize()} generated.{Colors.ENDC} ({format_usage(resp.usage)} | {format_latency(ttft, dur)})")
             if one_liner:
                 logger.info(f"   📢 Opinion: {one_liner[:100]}...")
             return resp
@@ -242,23 +579,17 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
         
     if not responses["affirmative"] or not responses["negative"]:
         logger.error("Critical failure: Affirmative or Negative failed.")
+        outcome["error"] = "affirmative or negative failed"
         return None
 
     # ---------------------------------------------------------
     # Phase 2: Grounding Verification
     # ---------------------------------------------------------
     grounding_report_md = ""
-    if kwargs.get('cite_check'):
+    if verifier and grounded.get("affirmative") is not None and grounded.get("negative") is not None:
         logger.info(f"\n{Colors.CYAN}🔍 [Grounding Check] Verifying citations...{Colors.ENDC}")
-        try:
-            grounding_report, grounding_report_md = run_grounding_check(
-                target_content_raw,
-                responses["affirmative"].content,
-                responses["negative"].content,
-                logger=logger
-            )
-        except Exception as e:
-            logger.warning(f"⚠️  Grounding check failed: {e}")
+        grounding_report = verifier.build_report(grounded["affirmative"] + grounded["negative"])
+        grounding_report_md = summarize_grounding(grounding_report, logger)
 
     # ---------------------------------------------------------
     # Phase 3: Adjudicator
@@ -267,47 +598,69 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
     provider = AdjudicatorConfig.get('provider')
     model = AdjudicatorConfig.get('model')
     logger.info(f"\n{Colors.HEADER}⚖️  [Adjudicator]{Colors.ENDC} Engaging {provider} ({model})...")
-    
+
+    adjudicator_fixed = [
+        {"role": "system", "content": shared_context},
+        {"role": "system", "content": AdjudicatorPrompt},
+        {"role": "user", "content": instr_block},
+    ]
+    fitted = fit_context({
+        "oracle_fact_check": (oracle_content, "head"),
+        "grounding_report": (grounding_report_md, "head"),
+        "affirmative": (responses["affirmative"].content, "head"),
+        "negative": (responses["negative"].content, "head"),
+    }, client.prompt_budget(messages=adjudicator_fixed, **AdjudicatorConfig), logger)
+
+    section_note = (f"\n【分段审阅】文档超出单次上下文，正反方已按 {len(sections)} 个章节分段审阅，观点按章节汇总；"
+                    f"行号均为原文行号，<document_outline> 提供全文结构。\n" if chunked else "")
+    if previous:
+        section_note += (f"【增量辩论】自 Loop {previous.loop} 以来仅 {len(changed)}/{len(sections)} 个章节有修改并已重新审阅；"
+                         f"其余章节原文未变，沿用上一轮意见（标注 ♻️）。请重点评估修改后的章节。\n")
     adjudicator_input = f"""
 {instr_block}
-
-<history_summary>
-{ref_content}
-</history_summary>
-
-【待审材料】
-{target_content}
-
+{section_note}
 【正方观点】 (SparkForge 价值辩护人)
-{responses["affirmative"].content}
+{fitted["affirmative"]}
 
 【反方观点】 (SparkForge 风险审计官 + Oracle-Driven Challenger)
-{responses["negative"].content}
+{fitted["negative"]}
 
 【🔮 Oracle 外部情报】
-{oracle_content if oracle_content else "(未提供外部情报)"}
+{fitted["oracle_fact_check"] if fitted["oracle_fact_check"] else "(未提供外部情报)"}
 
 【工具级事实锚定报告】
-{grounding_report_md if grounding_report_md else '(未启用)'}
+{fitted["grounding_report"] if fitted["grounding_report"] else '(未启用)'}
 """
+    verdict_progress = {"Adjudicator": 0}
     try:
-        with ThinkingSpinner(f"Final Verdict via {model}...", delay=0.1):
-            adjudicator_resp = client.chat(
+        with tracer.span("debate.adjudicator", provider=provider, model=model), \
+                ProgressLine(f"Final Verdict via {model}...", status=lambda: format_progress(verdict_progress),
+                             enabled=not quiet) as progress_line:
+            stream = await client.achat_stream(
                 messages=[
+                    {"role": "system", "content": shared_context},
                     {"role": "system", "content": AdjudicatorPrompt},
                     {"role": "user", "content": adjudicator_input}
                 ],
+                role="adjudicator",
+                context=target_context,
                 **AdjudicatorConfig
             )
+            async for delta in stream:
+                verdict_progress["Adjudicator"] += len(delta)
+                progress_line.update()
+            adjudicator_resp = stream.response
         usage_stats["adjudicator"] = adjudicator_resp.usage
+        ttft_stats["adjudicator"] = stream.ttft
     except Exception as e:
         logger.error(f"💥 Adjudicator failed: {e}")
+        outcome["error"] = f"adjudicator failed: {e}"
         return None
     
     time_stats["adjudicator"] = time.time() - phase_start
     
     one_liner = extract_one_liner(adjudicator_resp.content)
-    logger.info(f"{Colors.GREEN}✅ Verdict reached.{Colors.ENDC} ({format_usage(adjudicator_resp.usage)})")
+    logger.info(f"{Colors.GREEN}✅ Verdict reached.{Colors.ENDC} ({format_usage(adjudicator_resp.usage)} | {format_latency(ttft_stats['adjudicator'], time_stats['adjudicator'])})")
     if one_liner:
         logger.info(f"{Colors.YELLOW}⚖️  Verdict: {Colors.ENDC}{one_liner}")
 
@@ -315,18 +668,7 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
     # Save Report (with Gatekeeper Header)
     # ---------------------------------------------------------
     timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-    target_p = Path(target_file).absolute()
-    
-    try:
-        rel_from_root = target_p.relative_to(project_root)
-        rel_dir = rel_from_root.parent
-        if rel_dir.parts and rel_dir.parts[0] == 'docs':
-             rel_dir = Path(*rel_dir.parts[1:])
-    except ValueError:
-        rel_dir = Path("external")
-    
-    report_tag = target_p.stem
-    report_dir = project_root / "docs" / "reports" / rel_dir / report_tag
+    report_dir = report_dir_for(target_file)
     report_dir.mkdir(parents=True, exist_ok=True)
     report_path = report_dir / f"debate_{timestamp_str}.md"
     
@@ -349,10 +691,21 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
 
 ---
 """
+    prompt_tokens = sum(u.prompt_tokens for u in usage_stats.values() if u)
+    completion_tokens = sum(u.completion_tokens for u in usage_stats.values() if u)
+    saved = sum(saved_tokens.values())
+    incremental_summary = ""
+    if previous:
+        # A full run would have paid for the reused critiques again, on top of what this run spent
+        full_run = prompt_tokens + completion_tokens + saved
+        incremental_summary = (f"{len(changed)}/{len(sections)} sections re-debated since loop {previous.loop}; "
+                               f"reused critiques saved ~{format_tokens(saved)} tokens "
+                               f"({saved / full_run if full_run else 0:.0%} of a full run)")
+    incremental_note = f"> ♻️ **Incremental**: {incremental_summary}\n" if incremental_summary else ""
 
     report_content = f"""{gatekeeper_header}
 # Council Debate Report
-
+{incremental_note}
 ## ✊ Affirmative (Value Defender)
 {responses["affirmative"].content}
 
@@ -369,35 +722,290 @@ def run_debate(target_file: str, reference_file: str = "", instruction: str = ""
 ---
 {grounding_report_md}
 """
-    report_path.write_text(report_content, encoding='utf-8')
+    with tracer.span("debate.report"):
+        await asyncio.to_thread(report_path.write_text, report_content, encoding='utf-8')
     logger.info(f"\n📄 Report saved to: {Colors.BOLD}{report_path}{Colors.ENDC}")
+    if snapshot:
+        await asyncio.to_thread(snapshot.save, snapshot_path)
+        logger.debug(f"Snapshot saved to {snapshot_path}")
+    if incremental_summary:
+        logger.info(f"♻️  Incremental: {incremental_summary}")
+    logger.info(f"⏱️  Total {time.time() - start_time:.1f}s | " + " | ".join(
+        f"{k.capitalize()}: {format_latency(ttft_stats.get(k), v)}" for k, v in time_stats.items()
+    ))
+    if client.cache:
+        stats = client.cache.stats()
+        logger.info(f"🗃️  Response cache: {stats['hits']} hits / {stats['misses']} misses")
+    cached_tokens = sum(u.cached_tokens for u in usage_stats.values() if u)
+    if cached_tokens:
+        logger.info(f"♻️  Prompt cache: {cached_tokens}/{prompt_tokens} prompt tokens served from provider cache ({cached_tokens / prompt_tokens:.0%})")
+    costs = [estimate_cost(r.model, r.usage, client.config.get(r.provider))
+             for r in (responses["affirmative"], responses["negative"], adjudicator_resp)]
+    if any(c is not None for c in costs):
+        logger.info(f"💰 Estimated cost: ${sum(c for c in costs if c):.4f} (history: python -m llm.ledger)")
+    outcome.update(
+        verdict=one_liner,
+        report=str(report_path),
+        seconds=round(time.time() - start_time, 1),
+        timings={k: round(v, 1) for k, v in time_stats.items()},
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        cost=round(sum(c for c in costs if c), 4) if any(c is not None for c in costs) else None,
+    )
+    if incremental:
+        outcome.update(sections_changed=len(changed), sections=len(sections), saved_tokens=saved)
+    queued = {p: s for p, s in client.rate_limiter.stats().items() if s["queued"]}
+    if queued:
+        logger.info("⏳ Rate-limit queue: " + " | ".join(
+            f"{p} {s['queued']} calls, {s['wait_seconds']:.1f}s" for p, s in queued.items()
+        ))
+    retried = {p: s for p, s in client.retry_metrics.stats().items() if s["failures"]}
+    if retried:
+        logger.info("🔁 Retries: " + " | ".join(
+            f"{p} {s['failures']} failed, {s['failed_seconds'] + s['backoff_seconds']:.1f}s lost" for p, s in retried.items()
+        ))
+    if trace_file():
+        logger.info(f"🧭 Trace: {trace_file()}")
+    if client.replay:
+        stats = client.replay.stats()
+        if client.replay.replaying:
+            logger.info(f"📼 Replayed {stats['hits']} responses ({stats['misses']} unmatched) from {stats['cassette']}")
+        else:
+            logger.info(f"📼 Recorded {stats['recorded']} responses to {stats['cassette']}")
     logger.info(f"{Colors.YELLOW}👉 ACTION REQUIRED: Review the 'Gatekeeper Approval' section in the report.{Colors.ENDC}")
     
     return report_path
 
 
+# ---------------------------------------------------------
+# Batch Mode: many targets, one warm client
+# ---------------------------------------------------------
+
+def collect_targets(patterns):
+    """Expands files, directories (every *.md below them) and globs into a de-duplicated target list."""
+    reports_dir = (project_root / "docs" / "reports").absolute()
+    found, seen = [], set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(path.rglob("*.md"))
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = sorted(Path(m) for m in glob.glob(pattern, recursive=True) if Path(m).is_file())
+        for match in matches:
+            # Debate reports are markdown too; never feed them back in as targets
+            if reports_dir in match.absolute().parents:
+                continue
+            if match.absolute() not in seen:
+                seen.add(match.absolute())
+                found.append(match)
+    return found
+
+def estimate_debate_tokens(target_file) -> int:
+    """Upper bound reserved against the batch token budget: the material for three roles plus their outputs."""
+    try:
+        material = count_tokens(Path(target_file).read_text(encoding='utf-8'))
+    except OSError:
+        material = 0
+    outputs = sum(cfg.get('max_tokens', 8192) for cfg in (AffirmativeConfig, NegativeConfig, AdjudicatorConfig))
+    return 3 * material + outputs
+
+def format_tokens(n) -> str:
+    return f"{n / 1000:.1f}k" if n >= 1000 else str(n)
+
+def write_batch_index(results, started_at: datetime, wall_seconds: float, jobs: int) -> Path:
+    """Writes the consolidated index (markdown for people, JSON for tooling) under docs/reports/batch/."""
+    index_dir = project_root / "docs" / "reports" / "batch"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    stamp = started_at.strftime("%Y%m%d_%H%M%S")
+    index_path = index_dir / f"index_{stamp}.md"
+
+    ok = [r for r in results if not r.get("error")]
+    prompt = sum(r.get("prompt_tokens", 0) for r in ok)
+    completion = sum(r.get("completion_tokens", 0) for r in ok)
+    cached = sum(r.get("cached_tokens", 0) for r in ok)
+    costs = [r["cost"] for r in ok if r.get("cost") is not None]
+    debate_seconds = sum(r.get("seconds", 0) for r in results)
+
+    def rel(path):
+        try:
+            return Path(path).absolute().relative_to(project_root)
+        except ValueError:
+            return Path(path)
+
+    lines = [
+        "# 🗂️ Council Batch Debate Index",
+        "",
+        f"- **Date**: {stamp}",
+        f"- **Targets**: {len(results)} ({len(ok)} debated, {len(results) - len(ok)} failed)",
+        f"- **Wall time**: {wall_seconds:.1f}s for {debate_seconds:.1f}s of debates ({jobs} at a time)",
+        f"- **Tokens**: In {format_tokens(prompt)} (cached {format_tokens(cached)}) / Out {format_tokens(completion)}",
+    ]
+    if costs:
+        lines.append(f"- **Estimated cost**: ${sum(costs):.4f}")
+    lines += [
+        "",
+        "| Target | Verdict | Time | Tokens (in/out) | Cost | Report |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for r in results:
+        verdict = f"❌ {r['error']}" if r.get("error") else (r.get("verdict") or "See report")
+        verdict = " ".join(verdict.split()).replace("|", "\\|")
+        tokens = f"{format_tokens(r['prompt_tokens'])}/{format_tokens(r['completion_tokens'])}" if "prompt_tokens" in r else "-"
+        cost = f"${r['cost']:.4f}" if r.get("cost") is not None else "-"
+        report = f"[report]({os.path.relpath(r['report'], index_dir)})" if r.get("report") else "-"
+        lines.append(f"| `{rel(r['target'])}` | {verdict} | {r.get('seconds', 0):.1f}s | {tokens} | {cost} | {report} |")
+    index_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    summary = {
+        "date": stamp, "jobs": jobs, "wall_seconds": round(wall_seconds, 1),
+        "prompt_tokens": prompt, "completion_tokens": completion, "cached_tokens": cached,
+        "cost": round(sum(costs), 4) if costs else None,
+        "debates": [dict(r, target=str(rel(r["target"]))) for r in results],
+    }
+    index_path.with_suffix(".json").write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding='utf-8')
+    return index_path
+
+def run_batch_debate(targets, reference_file: str = "", instruction: str = "", jobs: int = BATCH_JOBS,
+                     tpm=None, **kwargs):
+    """Blocking entry point: runs `arun_batch_debate` on a fresh event loop."""
+    return asyncio.run(arun_batch_debate(targets, reference_file, instruction, jobs, tpm, **kwargs))
+
+@traced("debate.batch")
+async def arun_batch_debate(targets, reference_file: str = "", instruction: str = "", jobs: int = BATCH_JOBS,
+                            tpm=None, **kwargs):
+    """
+    Debates every target concurrently, at most `jobs` at a time, on one shared LLMClient so
+    config, connection pools and health/latency state stay warm across debates. With `tpm`,
+    each debate reserves its estimated tokens from a global tokens-per-minute budget before
+    it starts (settled against real usage afterwards), on top of the per-provider limits.
+
+    Returns (index path, per-target results).
+    """
+    started_at = datetime.now()
+    start = time.time()
+    client = LLMClient(cache=kwargs.pop('cache', None), replay=kwargs.pop('replay', None))
+    limiter = get_rate_limiter()
+    if tpm:
+        limiter.configure(BATCH_BUDGET, tpm=tpm)
+    log_dir = project_root / "logs" / f"batch_{started_at.strftime('%Y%m%d_%H%M%S')}"
+    width = len(str(len(targets)))
+    results = [None] * len(targets)
+    done_count = 0
+    slots = asyncio.Semaphore(max(1, jobs))
+
+    print(f"{Colors.HEADER}🏁 Batch debate: {len(targets)} targets, {jobs} at a time"
+          f"{f', {tpm} tokens/min' if tpm else ''}{Colors.ENDC}")
+    print(f"📝 Per-debate logs: {log_dir}")
+
+    async def debate(i, target):
+        nonlocal done_count
+        outcome = {"target": str(target)}
+        async with slots:
+            estimate = estimate_debate_tokens(target) if tpm else 0
+            if tpm:
+                outcome["queued"] = round(await limiter.aacquire(BATCH_BUDGET, estimate), 1)
+            d_start = time.time()
+            try:
+                await arun_debate(str(target), reference_file, instruction, client=client, quiet=True, outcome=outcome,
+                                  log_dir=log_dir, log_tag=f"{i + 1:0{width}d}_{Path(target).stem}", **kwargs)
+            except Exception as e:
+                outcome["error"] = str(e) or type(e).__name__
+            outcome.setdefault("seconds", round(time.time() - d_start, 1))
+            if tpm:
+                limiter.settle(BATCH_BUDGET, estimate, outcome.get("prompt_tokens", 0) + outcome.get("completion_tokens", 0))
+        results[i] = outcome
+        done_count += 1
+        if outcome.get("error"):
+            status = f"{Colors.RED}❌ {outcome['error']}{Colors.ENDC}"
+        else:
+            tokens = outcome["prompt_tokens"] + outcome["completion_tokens"]
+            status = f"{Colors.GREEN}✅{Colors.ENDC} {(outcome['verdict'] or 'See report')[:80]} ({format_tokens(tokens)} tokens)"
+        print(f"[{done_count:>{width}}/{len(targets)}] {target} {outcome['seconds']:.1f}s {status}")
+
+    # Tasks copy the current context, so each debate's spans nest under this batch span
+    await asyncio.gather(*(debate(i, t) for i, t in enumerate(targets)))
+
+    index_path = await asyncio.to_thread(write_batch_index, results, started_at, time.time() - start, jobs)
+    failed = sum(1 for r in results if r.get("error"))
+    print(f"\n🗂️  Index saved to: {Colors.BOLD}{index_path}{Colors.ENDC}")
+    print(f"⏱️  {len(targets)} debates in {time.time() - start:.1f}s"
+          f"{f' | {Colors.RED}{failed} failed{Colors.ENDC}' if failed else ''}")
+    if trace_file():
+        print(f"🧭 Trace: {trace_file()}")
+    return index_path, results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="SparkForge Council Debate CLI")
-    parser.add_argument("target", help="Path to the document to be optimized")
+    parser.add_argument("target", nargs="+",
+                        help="Document to be optimized; several files, directories or globs run a batch debate")
     parser.add_argument("--ref", help="Path to reference document (optional)", default="")
     parser.add_argument("--instruction", "-i", help="Temporary user instruction", default="")
     parser.add_argument("--loop", type=int, help="Current iteration loop number", default=0)
     parser.add_argument("--cite", action="store_true", help="Enable strict citation enforcement")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Debate section by section (automatic when the target exceeds the context budget)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-debate only the sections changed since the last --incremental run; reuse the rest")
     parser.add_argument("--oracle", help="Path to Oracle knowledge file (created by oracle_scanner.py)", default="")
+    parser.add_argument("--cache", action="store_true", default=None, help="Reuse cached LLM responses for unchanged inputs")
+    parser.add_argument("--trace", nargs="?", const="json", default=None,
+                        help="Record a span trace of the run: a JSON file path (default .agent/traces/) or 'otel'")
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument("--record", metavar="CASSETTE", help="Save every provider response to a replay cassette")
+    replay_group.add_argument("--replay", metavar="CASSETTE", help="Answer from a recorded cassette instead of the providers (offline)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="With --replay: 1 reproduces recorded latencies, 0 replays instantly")
+    parser.add_argument("--jobs", "-j", type=int, default=BATCH_JOBS, help="Batch mode: debates run concurrently")
+    parser.add_argument("--tpm", type=int, default=None,
+                        help="Batch mode: global tokens-per-minute budget shared by all debates")
     
     args = parser.parse_args()
-    if not os.path.exists(args.target):
-        print(f"{Colors.RED}Error: Target file not found: {args.target}{Colors.ENDC}")
+    targets = collect_targets(args.target)
+    if not targets:
+        print(f"{Colors.RED}Error: Target file not found: {' '.join(args.target)}{Colors.ENDC}")
         sys.exit(1)
+    batch = len(args.target) > 1 or not os.path.isfile(args.target[0])
+    if args.replay and not os.path.exists(args.replay):
+        print(f"{Colors.RED}Error: Cassette not found: {args.replay}{Colors.ENDC}")
+        sys.exit(1)
+    if args.trace:
+        configure_tracing(default_trace_path("debate") if args.trace == "json" else args.trace)
+    replay = None
+    if args.record or args.replay:
+        replay = Replay("record" if args.record else "replay", args.record or args.replay, args.latency_scale)
         
     try:
+        if batch:
+            _, results = run_batch_debate(
+                targets,
+                args.ref,
+                args.instruction,
+                jobs=args.jobs,
+                tpm=args.tpm,
+                loop=args.loop,
+                cite_check=args.cite,
+                chunked=args.chunked,
+                incremental=args.incremental,
+                oracle_file=args.oracle,
+                cache=args.cache,
+                replay=replay
+            )
+            sys.exit(1 if any(r.get("error") for r in results) else 0)
         result = run_debate(
-            args.target, 
+            args.target[0], 
             args.ref, 
             args.instruction, 
             loop=args.loop, 
             cite_check=args.cite,
-            oracle_file=args.oracle
+            chunked=args.chunked,
+            incremental=args.incremental,
+            oracle_file=args.oracle,
+            cache=args.cache,
+            replay=replay
         )
         if not result:
             sys.exit(1)
@@ -6,10 +6,13 @@ in multi-agent debates. It extracts citations from debate outputs and physically
 verifies them against the source document.
 """
 import re
+import threading
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from difflib import SequenceMatcher
 
+from llm.tracing import get_tracer
+
 
 @dataclass
 class Citation:
@@ -108,6 +111,7 @@ class GroundingVerifier:
         self.source_content = source_content
         self.source_lines = source_lines or source_content.splitlines()
         self.total_lines = len(self.source_lines)
+        self._verified: Dict[Tuple, VerificationResult] = {}  # Memo for verify_cached, keyed by citation_key
     
     def extract_citations(self, content: str, source: str) -> List[Citation]:
         """
@@ -286,6 +290,32 @@ class GroundingVerifier:
             error_reason="Unknown citation type - skipped"
         )
     
+    @staticmethod
+    def citation_key(citation: Citation) -> Tuple:
+        """What a verification depends on: the same reference always verifies the same way."""
+        return (citation.line_number, citation.quoted_text, citation.section_ref)
+
+    def verify_cached(self, citation: Citation) -> VerificationResult:
+        """`verify_citation`, memoized so references verified while streaming are not redone."""
+        key = self.citation_key(citation)
+        result = self._verified.get(key)
+        if result is None:
+            result = self._verified[key] = self.verify_citation(citation)
+        return replace(result, citation=citation)
+
+    def build_report(self, results: List[VerificationResult]) -> GroundingReport:
+        report = GroundingReport(total_citations=len(results))
+        for result in results:
+            report.results.append(result)
+            if result.is_valid:
+                if result.confidence >= self.FUZZY_MATCH_THRESHOLD:
+                    report.verified_count += 1
+                else:
+                    report.weak_match_count += 1
+            else:
+                report.hallucination_count += 1
+        return report
+
     def verify_debate_outputs(
         self, 
         affirmative_content: str, 
@@ -301,29 +331,64 @@ class GroundingVerifier:
         Returns:
             GroundingReport with complete verification results
         """
-        report = GroundingReport()
-        
         # Extract citations from both sides
         aff_citations = self.extract_citations(affirmative_content, "affirmative")
         neg_citations = self.extract_citations(negative_content, "negative")
         
-        all_citations = aff_citations + neg_citations
-        report.total_citations = len(all_citations)
-        
         # Verify each citation
-        for citation in all_citations:
-            result = self.verify_citation(citation)
-            report.results.append(result)
-            
-            if result.is_valid:
-                if result.confidence >= self.FUZZY_MATCH_THRESHOLD:
-                    report.verified_count += 1
-                else:
-                    report.weak_match_count += 1
-            else:
-                report.hallucination_count += 1
-        
-        return report
+        return self.build_report([self.verify_cached(c) for c in aff_citations + neg_citations])
+
+
+class StreamingGrounding:
+    """
+    Verifies one debate side's citations while its output is still streaming.
+
+    `feed` scans each newly completed line (with some overlap, since a quote may wrap)
+    and queues the references it has not seen; `verify_pending` verifies the queue and
+    may run in a worker thread while tokens keep arriving. `finish` extracts citations
+    from the final text exactly as a post-hoc check would, so the result is identical;
+    only references first seen at the very end still need verifying then.
+    """
+
+    OVERLAP = 120  # Longer than the longest quote pattern, so nothing straddling a line is lost
+
+    def __init__(self, verifier: GroundingVerifier, source: str):
+        self.verifier = verifier
+        self.source = source
+        self.early = 0  # References already verified when the stream ended
+        self._buffer = ""  # Unscanned text, led by the tail of what was already scanned
+        self._seen = set()
+        self._pending: List[Citation] = []
+        self._lock = threading.Lock()
+
+    def feed(self, delta: str) -> bool:
+        """Adds streamed text; True when new references are waiting for `verify_pending`."""
+        self._buffer += delta
+        if "\n" not in delta:
+            return False
+        boundary = self._buffer.rfind("\n") + 1
+        window = self._buffer[:boundary]
+        self._buffer = self._buffer[max(0, boundary - self.OVERLAP):]
+        found = False
+        for citation in self.verifier.extract_citations(window, self.source):
+            key = self.verifier.citation_key(citation)
+            if key not in self._seen:
+                self._seen.add(key)
+                self._pending.append(citation)
+                found = True
+        return found
+
+    def verify_pending(self):
+        with self._lock:
+            while self._pending:
+                self.verifier.verify_cached(self._pending.pop(0))
+                self.early += 1
+
+    def finish(self, content: str) -> List[VerificationResult]:
+        """Results for the complete output, in the order a post-hoc check would give them."""
+        with self._lock:
+            self._pending.clear()
+            return [self.verifier.verify_cached(c) for c in self.verifier.extract_citations(content, self.source)]
 
 
 def run_grounding_check(
@@ -338,13 +403,20 @@ def run_grounding_check(
     Returns:
         Tuple of (GroundingReport, markdown_summary)
     """
-    verifier = GroundingVerifier(target_content)
-    report = verifier.verify_debate_outputs(affirmative_output, negative_output)
+    with get_tracer().span("debate.grounding") as span:
+        verifier = GroundingVerifier(target_content)
+        report = verifier.verify_debate_outputs(affirmative_output, negative_output)
+        span.set(citations=report.total_citations, hallucinations=report.hallucination_count)
     
+    return report, summarize_grounding(report, logger)
+
+
+def summarize_grounding(report: GroundingReport, logger=None) -> str:
+    """Logs the outcome of a grounding check and returns its markdown summary."""
     if logger:
         if report.hallucination_count > 0:
             logger.warning(f"🔍 Grounding Check: {report.hallucination_count} hallucinations detected!")
         else:
             logger.info(f"🔍 Grounding Check: All {report.total_citations} citations verified.")
     
-    return report, report.to_markdown()
+    return report.to_markdown()
@@ -15,6 +15,14 @@ project_root = current_dir.parent
 sys.path.append(str(project_root))
 
 from llm.client import LLMClient
+from llm.tokens import count_tokens
+from scripts.sections import split_sections
+
+SCAN_PROVIDER = "deepseek"
+SCAN_MODEL = "deepseek-chat"
+
+# A document that does not fit one scan is scanned per section of at most this many tokens
+SCAN_SECTION_TOKENS = 12000
 
 # Oracle Scanner Prompt
 ORACLE_SCAN_PROMPT = """
@@ -41,6 +49,30 @@ Output Format (Markdown):
 ...
 """
 
+# Reduce step for sectioned scans: keep the few uncertainties that matter for the whole document
+ORACLE_MERGE_PROMPT = """
+You are the "Oracle Scanner". A long document was scanned section by section; below are the candidate verification requests from each section.
+
+Candidate Requests:
+{candidates}
+
+Instructions:
+1. Select the 3-5 most critical uncertainties for the document as a whole, merging duplicates.
+2. Keep each selected item's Risk and Search Query (refine them if merging).
+
+Output Format (Markdown):
+## 🔮 Oracle Search Request
+**Target**: `{filename}`
+**Date**: {date}
+
+### 1. [Query Topic]
+- **Risk**: Why verify this?
+- **Search Query**: `exact search keywords`
+
+### 2. [Query Topic]
+...
+"""
+
 SUMMARY_PROMPT = """
 You are a knowledge archivist. Given a list of Oracle search requests from multiple sessions, extract a consolidated summary of the key knowledge gaps and recurring themes.
 
@@ -73,7 +105,7 @@ def get_project_isolated_path(target_path: Path, base_dir: str) -> Path:
     return project_root / "docs" / base_dir / rel_dir / target_path.stem
 
 
-def update_summary(req_dir: Path, target_name: str):
+def update_summary(req_dir: Path, target_name: str, client: LLMClient = None):
     """Update the summary.md file with insights from all request files."""
     request_files = sorted(req_dir.glob("request_*.md"))
     if not request_files:
@@ -86,7 +118,7 @@ def update_summary(req_dir: Path, target_name: str):
     
     combined = "\n\n---\n\n".join(all_contents)
     
-    client = LLMClient(context_id="oracle_summary")
+    client = client or LLMClient(context_id="oracle_summary")
     response = client.chat(
         messages=[
             {"role": "user", "content": SUMMARY_PROMPT.format(
@@ -97,7 +129,8 @@ def update_summary(req_dir: Path, target_name: str):
         ],
         provider="deepseek",
         model="deepseek-chat",
-        temperature=0.2
+        temperature=0.2,
+        role="oracle_summary"
     )
     
     summary_file = req_dir / "summary.md"
@@ -105,7 +138,8 @@ def update_summary(req_dir: Path, target_name: str):
     print(f"📋 Summary updated: {summary_file}")
 
 
-def scan_for_questions(target_file: str):
+def scan_for_questions(target_file: str, client: LLMClient = None) -> Path:
+    """Writes the Oracle search request for `target_file` and returns its path; pass `client` to reuse a warm one."""
     target_path = Path(target_file).absolute()
     if not target_path.exists():
         print(f"Error: File {target_path} not found.")
@@ -113,22 +147,50 @@ def scan_for_questions(target_file: str):
         
     content = target_path.read_text(encoding='utf-8')
     
-    client = LLMClient(context_id="oracle_scanner")
+    client = client or LLMClient(context_id="oracle_scanner")
+    date = datetime.now().strftime("%Y-%m-%d")
     
-    print(f"🔮 Scanning {target_path.name} for knowledge gaps...")
+    def scan_prompt(text):
+        return ORACLE_SCAN_PROMPT.format(target_content=text, filename=target_path.name, date=date)
+
+    budget = client.prompt_budget(provider=SCAN_PROVIDER, model=SCAN_MODEL,
+                                  messages=[{"role": "user", "content": scan_prompt("")}])
     
-    response = client.chat(
-        messages=[
-           {"role": "user", "content": ORACLE_SCAN_PROMPT.format(
-               target_content=content[:10000],
-               filename=target_path.name,
-               date=datetime.now().strftime("%Y-%m-%d")
-           )} 
-        ],
-        provider="deepseek",
-        model="deepseek-chat",
-        temperature=0.3
-    )
+    if count_tokens(content, SCAN_PROVIDER) <= budget:
+        print(f"🔮 Scanning {target_path.name} for knowledge gaps...")
+        response = client.chat(
+            messages=[{"role": "user", "content": scan_prompt(content)}],
+            provider=SCAN_PROVIDER,
+            model=SCAN_MODEL,
+            temperature=0.3,
+            role="oracle_scan"
+        )
+    else:
+        # Map: scan every section in parallel; reduce: pick the requests that matter overall
+        sections = split_sections(content, min(budget, SCAN_SECTION_TOKENS), SCAN_PROVIDER)
+        print(f"🔮 Scanning {target_path.name} for knowledge gaps ({len(sections)} sections)...")
+        batch = client.chat_many(
+            [{"messages": [{"role": "user", "content": scan_prompt(section.text)}]} for section in sections],
+            provider=SCAN_PROVIDER,
+            model=SCAN_MODEL,
+            temperature=0.3,
+            role="oracle_scan"
+        )
+        candidates = [
+            f"### Section: {section.title} (Lines {section.lines})\n\n{item.response.content}"
+            for section, item in zip(sections, batch) if item.ok
+        ]
+        if not candidates:
+            raise batch[0].error
+        response = client.chat(
+            messages=[{"role": "user", "content": ORACLE_MERGE_PROMPT.format(
+                candidates="\n\n---\n\n".join(candidates), filename=target_path.name, date=date
+            )}],
+            provider=SCAN_PROVIDER,
+            model=SCAN_MODEL,
+            temperature=0.2,
+            role="oracle_scan"
+        )
     
     # Output to stdout
     print("\n" + "="*50)
@@ -145,12 +207,13 @@ def scan_for_questions(target_file: str):
     print(f"✅ Request saved to: {req_file}")
     
     # Update summary
-    update_summary(req_dir, target_path.name)
+    update_summary(req_dir, target_path.name, client)
     
     # Also create/update a 'latest.md' symlink-like file for easy access
     latest_file = req_dir / "latest.md"
     latest_file.write_text(response.content, encoding='utf-8')
     print(f"🔗 Latest request: {latest_file}")
+    return req_file
 
 
 if __name__ == "__main__":
@@ -21,6 +21,10 @@ from markdown.preprocessors import Preprocessor
 from markdown.postprocessors import Postprocessor
 from markdown.extensions import Extension
 
+# Project root on the path for the shared tracing hooks (SPARKFORGE_TRACE=1 to record a trace)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from llm.tracing import get_tracer, traced
+
 class MathJaxPreprocessor(Preprocessor):
     """
     Protects MathJax formulas by stashing them before Markdown parsing.
@@ -166,6 +170,7 @@ def process_file_content(filepath, file_registry, is_spec_file=False):
     header_marker = f'<div id="{anchor}" class="doc-anchor" style="position:relative; top:-20px;"></div>\n\n'
     return header_marker + content
 
+@traced("pdf.render")
 def render_html_to_pdf_puppeteer(html_path, pdf_path, width, is_a4=False, is_a3=False):
     """Call the node renderer to convert HTML to PDF."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -182,6 +187,7 @@ def render_html_to_pdf_puppeteer(html_path, pdf_path, width, is_a4=False, is_a3=
         print(f"❌ Failed to render {html_path}")
         return False
 
+@traced("pdf.convert")
 def main():
     parser = argparse.ArgumentParser(description="Universal Markdown to PDF Converter (Council Engine)")
     parser.add_argument("inputs", nargs='+', help="Path to input Markdown files or directories")
@@ -235,7 +241,8 @@ def main():
     # Extensions: toc is needed for [TOC] tags, even if we build PDF outline separately
     # We add our custom MathJaxExtension to protect formulas
     extensions = ['tables', 'fenced_code', 'toc', 'sane_lists', MathJaxExtension()]
-    html_body = markdown.markdown(full_md_content, extensions=extensions)
+    with get_tracer().span("pdf.markdown", files=len(files_to_process), chars=len(full_md_content)):
+        html_body = markdown.markdown(full_md_content, extensions=extensions)
     
     # Layout Plugins
     if args.glass_cards:
@@ -0,0 +1,122 @@
+"""
+Markdown Section Splitter for SparkForge Council.
+
+Splits a document into heading-delimited sections that each fit a token budget, so
+documents larger than a model's context window can be debated (or scanned) piecewise.
+Every section keeps its original line range: its numbered text uses the line numbers of
+the whole file, so [Line XX] citations made against a section point into the original.
+"""
+import re
+from typing import List, Optional
+from dataclasses import dataclass
+
+from llm.tokens import count_tokens
+
+HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE = re.compile(r'^\s*(```|~~~)')
+
+
+@dataclass
+class Section:
+    """A contiguous slice of the document (1-based, inclusive line range)."""
+    title: str
+    level: int  # Heading depth; 0 for the preamble before the first heading
+    start_line: int
+    end_line: int
+    text: str
+
+    @property
+    def lines(self) -> str:
+        return f"{self.start_line}-{self.end_line}"
+
+    def numbered(self, width: int) -> str:
+        """The section's text with its original line numbers, as `prepend_line_numbers` formats them."""
+        return "\n".join(
+            f"{str(self.start_line + i).rjust(width)} | {line}" for i, line in enumerate(self.text.splitlines())
+        )
+
+
+def _headed_blocks(lines: List[str]) -> List[Section]:
+    """One block per heading (fenced code is never mistaken for a heading)."""
+    blocks: List[Section] = []
+    title, level, start = "Preamble", 0, 1
+    in_fence = False
+    for i, line in enumerate(lines, start=1):
+        if FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else HEADING.match(line)
+        if match and i > start:
+            blocks.append(Section(title, level, start, i - 1, "\n".join(lines[start - 1:i - 1])))
+        if match:
+            title, level, start = match.group(2), len(match.group(1)), i
+    if start <= len(lines):
+        blocks.append(Section(title, level, start, len(lines), "\n".join(lines[start - 1:])))
+    return [b for b in blocks if b.text.strip()]
+
+
+def _split_oversized(section: Section, max_tokens: int, width: int, provider: Optional[str]) -> List[Section]:
+    """Breaks a section that alone exceeds the budget at paragraph (or, failing that, line) boundaries."""
+    lines = section.text.splitlines()
+    sizes = [count_tokens(f"{'0' * width} | {line}\n", provider) for line in lines]
+    parts = []
+    start, tokens = 0, 0
+    last_blank = None
+    for i, line_tokens in enumerate(sizes):
+        if tokens + line_tokens > max_tokens and i > start:
+            cut = last_blank + 1 if last_blank is not None and last_blank >= start else i
+            parts.append((start, cut))
+            start = cut
+            tokens = sum(sizes[start:i])
+            last_blank = None
+        tokens += line_tokens
+        if not lines[i].strip():
+            last_blank = i
+    parts.append((start, len(lines)))
+    return [
+        Section(f"{section.title} ({n}/{len(parts)})", section.level, section.start_line + a,
+                section.start_line + b - 1, "\n".join(lines[a:b]))
+        for n, (a, b) in enumerate(parts, start=1) if b > a
+    ]
+
+
+def split_sections(text: str, max_tokens: int, provider: Optional[str] = None,
+                   anchor_level: Optional[int] = None) -> List[Section]:
+    """
+    Splits markdown into sections of at most ~`max_tokens` (as numbered text) each.
+
+    Consecutive small sections are merged, so a document of short chapters does not turn
+    into dozens of tiny requests; a merged section takes the title of its first heading.
+    With `anchor_level`, headings of that depth or shallower always start a new section:
+    merges never cross them, so editing one chapter cannot move another's boundaries.
+    """
+    lines = text.splitlines()
+    width = len(str(len(lines)))
+    merged: List[Section] = []
+    for block in _headed_blocks(lines):
+        pieces = [block]
+        if count_tokens(block.numbered(width), provider) > max_tokens:
+            pieces = _split_oversized(block, max_tokens, width, provider)
+        for n, piece in enumerate(pieces):
+            anchored = anchor_level is not None and n == 0 and 0 < piece.level <= anchor_level
+            if merged and not anchored and count_tokens(merged[-1].numbered(width) + "\n" + piece.numbered(width), provider) <= max_tokens:
+                last = merged[-1]
+                merged[-1] = Section(last.title, last.level, last.start_line, piece.end_line,
+                                     "\n".join(lines[last.start_line - 1:piece.end_line]))
+            else:
+                merged.append(piece)
+    return merged
+
+
+def outline(text: str) -> str:
+    """Heading outline with original line numbers, giving each section pass the shape of the whole."""
+    entries = []
+    in_fence = False
+    for i, line in enumerate(text.splitlines(), start=1):
+        if FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else HEADING.match(line)
+        if match:
+            entries.append(f"{'  ' * (len(match.group(1)) - 1)}- [Line {i}] {match.group(2)}")
+    return "\n".join(entries)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test script for the Crucible engine: score parsing, convergence rules, the Surgeon's
+edits, and checkpoint/resume.
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# Add project root
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+import scripts.dialecta_debate as dialecta_debate
+from scripts.crucible import CrucibleEngine, apply_edits, converge, mending_orders, parse_verdict
+
+# ANSI Colors
+GREEN = '\033[92m'
+RED = '\033[91m'
+CYAN = '\033[96m'
+ENDC = '\033[0m'
+BOLD = '\033[1m'
+
+VERDICT = """## 💡 决策简报 (Executive Summary)
+
+【评分: 81/100】 【结论：细节优化】 本轮吸收了成本挑战。
+
+### 1. 战略加权评分矩阵 (Weighted Scoring)
+
+- **战略对齐 (Strategic Alignment - 40%)**: [34/40] - 满足初始目标
+- **实战价值 (Practical Value - 30%)**: [80/100] - 可落地
+- **逻辑自洽 (Logical Consistency - 30%)**: [23/30] - 基本自洽
+- **[加权总分]**: **81 / 100**
+
+### 5. 强制修补指令 (Mending Orders)
+
+1. 在 [Line 12] 补充压测数据。
+
+### 6. 元裁决（Meta-Verdict）
+
+**[全局健康度评估]**：良好
+"""
+
+
+def test_parse_verdict():
+    """Dimension scores are normalised to the 40/30/30 matrix; the total is the fallback."""
+    print(f"\n{CYAN}Test 1: Weighted Score Parsing{ENDC}")
+    verdict = parse_verdict(VERDICT)
+    assert verdict.scores == {"strategic": 34.0, "practical": 24.0, "logical": 23.0}, verdict.scores
+    assert verdict.score == 81.0
+    assert verdict.conclusion == "细节优化" and not verdict.approved
+    assert parse_verdict("【评分: 92/100】 【结论：直接通过】").score == 92.0
+    assert parse_verdict("【结论：直接通过】").approved
+    assert parse_verdict("no scores here").score is None
+    assert mending_orders(VERDICT) == "1. 在 [Line 12] 补充压测数据。"
+    print(f"  {GREEN}✓{ENDC} 34/40 + 80/100 + 23/30 → {verdict.score:g}/100, orders extracted")
+    return True
+
+
+def test_convergence_rules():
+    """Success, rollback and stasis follow crucible.md Phase 3."""
+    print(f"\n{CYAN}Test 2: Convergence Rules{ENDC}")
+    assert converge([92], approved=True)[0] == "success"
+    assert converge([92], approved=False)[0] == "continue", "A high score without approval keeps iterating"
+    assert converge([70], approved=False)[0] == "continue"
+    assert converge([80, 68], approved=False)[0] == "rollback"
+    assert converge([80, 70], approved=False)[0] == "continue", "A drop of exactly 10 is not a rollback"
+    assert converge([70, 73, 75], approved=False)[0] == "stasis"
+    assert converge([70, 73, 80], approved=False)[0] == "continue"
+    assert converge([70, None], approved=False)[0] == "anomaly"
+    print(f"  {GREEN}✓{ENDC} success / rollback / stasis / anomaly decided as specified")
+    return True
+
+
+def test_surgeon_edits():
+    """Only edits whose ORIGINAL text exists exactly once are applied."""
+    print(f"\n{CYAN}Test 3: Surgeon Edits{ENDC}")
+    text = "alpha\nbeta\nbeta\ngamma\n"
+    reply = """<<<<<<< ORIGINAL
+alpha
+=======
+ALPHA
+>>>>>>> REVISED
+<<<<<<< ORIGINAL
+beta
+=======
+BETA
+>>>>>>> REVISED
+<<<<<<< ORIGINAL
+delta
+=======
+DELTA
+>>>>>>> REVISED"""
+    mended, applied, rejected = apply_edits(text, reply)
+    assert mended == "ALPHA\nbeta\nbeta\ngamma\n"
+    assert applied == 1
+    assert [r.split(":")[0] for r in rejected] == ["ambiguous", "not found"]
+    print(f"  {GREEN}✓{ENDC} 1 applied, hallucinated and ambiguous edits rejected")
+    return True
+
+
+class ScriptedEngine(CrucibleEngine):
+    """Phases without LLM calls: scores come from a script, debate crashes once on request."""
+
+    scores = [70, 76, 95]
+    crash_at = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, client=object(), **kwargs)
+        self.calls = []
+
+    async def _scan(self, record):
+        self.calls.append(("scan", record["loop"]))
+
+    async def _debate(self, record):
+        self.calls.append(("debate", record["loop"]))
+        if self.crash_at == record["loop"]:
+            self.crash_at = None
+            raise RuntimeError("provider outage")
+        verdict = "【结论：直接通过】" if self.scores[record["loop"] - 1] >= 90 else "【结论：细节优化】"
+        report = self.report_dir / f"debate_{record['loop']}.md"
+        report.write_text(f"【评分: {self.scores[record['loop'] - 1]}/100】 {verdict}", encoding='utf-8')
+        record["debate"] = {"report": str(report), "verdict": verdict}
+
+    async def _mend(self, record):
+        if record["decision"] == "continue":
+            self.calls.append(("mend", record["loop"]))
+            record["mend"] = {"mode": "llm", "applied": 1, "rejected": []}
+
+
+def test_checkpoint_resume():
+    """A crash mid-loop resumes at the failed phase; completed phases are not repeated."""
+    print(f"\n{CYAN}Test 4: Checkpoint & Resume{ENDC}")
+    original_root = dialecta_debate.project_root
+    with tempfile.TemporaryDirectory() as tmp:
+        dialecta_debate.project_root = Path(tmp)
+        try:
+            target = Path(tmp) / "docs" / "plan.md"
+            target.parent.mkdir(parents=True)
+            target.write_text("# Plan\n", encoding='utf-8')
+
+            engine = ScriptedEngine(str(target), "objective")
+            engine.crash_at = 2
+            try:
+                asyncio.run(engine.run())
+                assert False, "The scripted outage should propagate"
+            except RuntimeError:
+                pass
+            assert engine.state["loop"] == 2 and engine.state["phase"] == "scan"
+
+            resumed = ScriptedEngine.resume(str(target))
+            assert resumed and resumed.state["phase"] == "scan"
+            state = asyncio.run(resumed.run())
+            assert resumed.calls == [("debate", 2), ("mend", 2), ("scan", 3), ("debate", 3)], resumed.calls
+            assert state["status"] == "success"
+            assert [r["score"]["score"] for r in state["loops"]] == [70, 76, 95]
+            assert state["loops"][1]["score"]["delta"] == 6
+            backups = sorted(p.name for p in (engine.report_dir / "backups").iterdir())
+            assert [b.rsplit("_", 2)[0] for b in backups] == ["plan_history_loop_2", "plan_loop_1", "plan_loop_2"], backups
+            history = engine.history_path.read_text(encoding='utf-8')
+            assert history.count("## Loop") == 3 and "(Δ +6)" in history
+            asyncio.run(resumed._history(resumed.record))
+            assert engine.history_path.read_text(encoding='utf-8') == history, "A replayed history phase must not append twice"
+        finally:
+            dialecta_debate.project_root = original_root
+    print(f"  {GREEN}✓{ENDC} Resumed at loop 2 debate, succeeded at loop 3 without repeating the scan")
+    return True
+
+
+def main():
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}🔥 Crucible Engine - Unit Tests{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    tests = [
+        ("Weighted Score Parsing", test_parse_verdict),
+        ("Convergence Rules", test_convergence_rules),
+        ("Surgeon Edits", test_surgeon_edits),
+        ("Checkpoint & Resume", test_checkpoint_resume),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"  {GREEN}✅ {name} PASSED{ENDC}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  {RED}❌ {name} FAILED: {e}{ENDC}")
+        except Exception as e:
+            failed += 1
+            print(f"  {RED}❌ {name} ERROR: {e}{ENDC}")
+
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}📊 Results: {passed} passed, {failed} failed{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
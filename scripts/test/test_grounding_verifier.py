@@ -9,7 +9,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from scripts.grounding_verifier import GroundingVerifier, run_grounding_check
+from scripts.grounding_verifier import GroundingVerifier, StreamingGrounding, run_grounding_check
 
 # ANSI Colors
 GREEN = '\033[92m'
@@ -130,6 +130,39 @@ The claim about "quantum-resistant encryption" is not supported by the document.
     return True
 
 
+def test_streaming_verification():
+    """Citations verified while streaming give the same report as a post-hoc check."""
+    print(f"\n{CYAN}Test 4: Streaming Verification{ENDC}")
+    
+    source = """# Project Requirements
+1. The system must handle 1000 requests per second.
+2. All data should be encrypted at rest.
+3. User authentication is mandatory."""
+    
+    output = """## Risk Assessment
+[Line 2] sets a throughput target, yet "1000 requests per second" has no load test.
+The plan promises "quantum-resistant encryption" nowhere in the source,
+and [Line 9] does not exist.
+Section 3 is silent on key rotation; see [Line 4]."""
+    
+    verifier = GroundingVerifier(source)
+    grounding = StreamingGrounding(verifier, "negative")
+    # Feed in small, line-straddling chunks as a provider stream would
+    for i in range(0, len(output), 7):
+        if grounding.feed(output[i:i + 7]):
+            grounding.verify_pending()
+    streamed = verifier.build_report(grounding.finish(output))
+    expected, _ = run_grounding_check(source, "", output)
+    
+    assert grounding.early >= 4, f"Most citations should be verified before the stream ends ({grounding.early})"
+    assert [(r.citation.line_number, r.citation.quoted_text, r.is_valid) for r in streamed.results] == \
+        [(r.citation.line_number, r.citation.quoted_text, r.is_valid) for r in expected.results]
+    assert streamed.hallucination_count == expected.hallucination_count >= 2
+    print(f"  {GREEN}✓{ENDC} {grounding.early}/{streamed.total_citations} citations verified while streaming, report unchanged")
+    
+    return True
+
+
 def main():
     print(f"\n{BOLD}{'='*60}{ENDC}")
     print(f"{BOLD}🔍 Grounding Verifier - Unit Tests{ENDC}")
@@ -139,6 +172,7 @@ def main():
         ("Line Number Verification", test_line_number_verification),
         ("Quote Verification", test_quote_verification),
         ("Full Debate Verification", test_full_debate_verification),
+        ("Streaming Verification", test_streaming_verification),
     ]
     
     passed = 0
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the llm and prompts packages.
+
+Each check runs in a fresh interpreter so nothing is already cached in sys.modules.
+"""
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+# Add project root
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+# ANSI Colors
+GREEN = '\033[92m'
+RED = '\033[91m'
+YELLOW = '\033[93m'
+CYAN = '\033[96m'
+ENDC = '\033[0m'
+BOLD = '\033[1m'
+
+# What `make debate` imports before doing any work, in seconds (best of RUNS)
+IMPORT_BUDGET = 0.4
+RUNS = 3
+
+# Modules that must only load once a provider / prompt actually needs them
+LAZY_MODULES = ["openai", "google.genai", "dotenv", "httpx", "tiktoken"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(m for m in {lazy!r} if m in sys.modules), {extra}}}))
+"""
+
+
+def probe(statement: str, extra: str = "") -> dict:
+    code = PROBE.format(statement=statement, lazy=LAZY_MODULES, extra=extra)
+    result = subprocess.run([sys.executable, "-c", code], cwd=str(project_root),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(statement: str, top: int = 8) -> list:
+    """Top cumulative entries of `python -X importtime`, for diagnosing a blown budget."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=str(project_root),
+                            capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def test_llm_import_is_lazy():
+    """`import llm` resolves nothing; `from llm import LLMClient` loads no provider SDK."""
+    print(f"\n{CYAN}Test 1: Lazy llm Package{ENDC}")
+    bare = probe("import llm", extra='"client": "llm.client" in sys.modules')
+    assert not bare["client"], "import llm should not load llm.client"
+    assert bare["modules"] == [], f"SDKs imported by `import llm`: {bare['modules']}"
+
+    client = probe("from llm import LLMClient; LLMClient()")
+    sdks = [m for m in client["modules"] if m != "dotenv"]  # .env is read on construction
+    assert sdks == [], f"Provider SDKs imported before any call: {sdks}"
+    print(f"  {GREEN}✓{ENDC} no provider SDK loaded ({client['elapsed'] * 1000:.0f}ms incl. client construction)")
+    return True
+
+
+def test_prompts_load_per_role():
+    """Importing prompt templates parses only the roles that are accessed."""
+    print(f"\n{CYAN}Test 2: Lazy Prompt Loading{ENDC}")
+    none = probe("import prompts.templates as t", extra='"loaded": sorted(t.loader._prompts)')
+    assert none["loaded"] == [], f"Prompts parsed at import: {none['loaded']}"
+    one = probe("from prompts.templates import NegativeConfig; import prompts.templates as t",
+                extra='"loaded": sorted(t.loader._prompts)')
+    assert one["loaded"] == ["negative"], f"Only the requested role should be parsed, got {one['loaded']}"
+    print(f"  {GREEN}✓{ENDC} roles parsed on demand")
+    return True
+
+
+def test_cli_import_budget():
+    """The debate CLI's imports stay within IMPORT_BUDGET."""
+    print(f"\n{CYAN}Test 3: Cold-Start Budget{ENDC}")
+    statement = "from llm import LLMClient; from prompts.templates import AffirmativePrompt, NegativePrompt, AdjudicatorPrompt"
+    best = min(probe(statement)["elapsed"] for _ in range(RUNS))
+    if best > IMPORT_BUDGET:
+        for micros, module in slowest_imports(statement):
+            print(f"  {YELLOW}{micros / 1000:7.1f}ms{ENDC} {module}")
+    assert best <= IMPORT_BUDGET, f"Cold start took {best * 1000:.0f}ms (budget {IMPORT_BUDGET * 1000:.0f}ms)"
+    print(f"  {GREEN}✓{ENDC} cold start {best * 1000:.0f}ms (budget {IMPORT_BUDGET * 1000:.0f}ms)")
+    return True
+
+
+def main():
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}⏱️  Import-Time Benchmark{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    tests = [
+        ("Lazy llm Package", test_llm_import_is_lazy),
+        ("Lazy Prompt Loading", test_prompts_load_per_role),
+        ("Cold-Start Budget", test_cli_import_budget),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"  {GREEN}✅ {name} PASSED{ENDC}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  {RED}❌ {name} FAILED: {e}{ENDC}")
+        except Exception as e:
+            failed += 1
+            print(f"  {RED}❌ {name} ERROR: {e}{ENDC}")
+
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}📊 Results: {passed} passed, {failed} failed{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1044 @@
+#!/usr/bin/env python3
+"""
+Offline tests for LLMClient behaviour (no API keys or network required).
+
+Provider SDK clients are replaced with in-process fakes so that retries,
+fallback and streaming aggregation can be exercised deterministically.
+"""
+import sys
+import json
+import time
+import asyncio
+import threading
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add project root
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from llm import LLMClient, LLMRequest, LLMResponse, Message
+from llm.batch import run_batch
+from llm.cache import ResponseCache
+from llm.health import HealthTracker
+from llm.ratelimit import RateLimiter
+from llm.prompt_cache import PromptCache, arrange_messages
+from llm.tokens import PromptBlock, count_tokens, fit_blocks
+from llm.state import StateStore
+from llm.ledger import Ledger, aggregate, format_report
+from llm.tracing import Tracer, JsonExporter, NOOP_SPAN
+from llm.replay import Replay, ReplayMissError
+from llm.retry import Backoff, RetryMetrics, classify
+from llm.deadline import CallCancelled, CancelToken, DeadlineExceeded
+
+# ANSI Colors
+GREEN = '\033[92m'
+RED = '\033[91m'
+CYAN = '\033[96m'
+ENDC = '\033[0m'
+BOLD = '\033[1m'
+
+
+def _usage(prompt, completion):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+
+def _event(text=None, finish_reason=None, usage=None):
+    choices = []
+    if text is not None or finish_reason is not None:
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeCompletions:
+    """Mimics `client.chat.completions` for both plain and streaming calls."""
+
+    def __init__(self, reply="Hello world", fail_times=0, error="503 Service Unavailable", delay=0.0):
+        self.reply = reply
+        self.fail_times = fail_times
+        self.error = error
+        self.delay = delay
+        self.calls = []
+
+    def _check(self, kwargs):
+        self.calls.append(kwargs)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise RuntimeError(self.error)
+
+    def _events(self):
+        words = self.reply.split(" ")
+        yield _event(text="")  # role-only preamble chunk
+        for i, word in enumerate(words):
+            yield _event(text=word if i == 0 else " " + word)
+        yield _event(finish_reason="stop")
+        yield _event(usage=_usage(10, len(words)))
+
+    def create(self, **kwargs):
+        if self.delay:
+            time.sleep(self.delay)
+        self._check(kwargs)
+        if kwargs.get("stream"):
+            return self._events()
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=_usage(10, len(self.reply.split(" ")))
+        )
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self._check(kwargs)
+        if kwargs.get("stream"):
+            async def gen():
+                for event in self._events():
+                    yield event
+            return gen()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply), finish_reason="stop")],
+            usage=_usage(10, len(self.reply.split(" ")))
+        )
+
+
+def make_client(fakes, **client_kwargs):
+    """Builds an LLMClient whose providers are served by the given fake completions."""
+    client = LLMClient(**client_kwargs)
+    client.health = HealthTracker()  # isolated, never persisted
+    client.rate_limiter = RateLimiter()  # unlimited unless a test configures it
+    client.ledger = None  # tests that inspect the ledger attach their own
+
+    def fake_get_client(provider, async_mode=False, **overrides):
+        completions = fakes[provider]
+        if async_mode and not isinstance(completions, FakeAsyncCompletions):
+            async_fake = FakeAsyncCompletions(completions.reply, completions.fail_times, completions.error, completions.delay)
+            async_fake.calls = completions.calls
+            fakes[provider] = completions = async_fake
+        return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    client._get_client = fake_get_client
+    return client
+
+
+def test_chat_stream_aggregates_usage():
+    """Streaming yields deltas and aggregates content + usage at the end."""
+    print(f"\n{CYAN}Test 1: Streaming Aggregation{ENDC}")
+    fakes = {"deepseek": FakeCompletions("The council has spoken")}
+    client = make_client(fakes)
+
+    stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="deepseek")
+    deltas = list(stream)
+
+    assert "".join(deltas) == "The council has spoken", "Deltas should reassemble the reply"
+    assert stream.response.content == "The council has spoken"
+    assert stream.response.usage.completion_tokens == 4, "Usage should come from the final chunk"
+    assert stream.ttft is not None, "TTFT should be recorded"
+    assert fakes["deepseek"].calls[0]["stream"] is True
+    print(f"  {GREEN}✓{ENDC} {len(deltas)} deltas aggregated, TTFT={stream.ttft:.4f}s")
+    return True
+
+
+def test_chat_stream_falls_back_before_first_token():
+    """A provider failing before its first token triggers the fallback chain."""
+    print(f"\n{CYAN}Test 2: Streaming Fallback{ENDC}")
+    fakes = {
+        "deepseek": FakeCompletions(fail_times=10, error="invalid_api_key"),
+        "dashscope": FakeCompletions("fallback answer"),
+    }
+    client = make_client(fakes)
+
+    stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="deepseek", retry_delay=0)
+    assert stream.collect().content == "fallback answer"
+    assert stream.provider == "dashscope", "Stream should be committed to the fallback provider"
+    assert len(fakes["deepseek"].calls) == 1, "Fatal errors should skip remaining retries"
+    print(f"  {GREEN}✓{ENDC} Fell back to {stream.provider}")
+    return True
+
+
+def test_achat_stream():
+    """Async streaming mirrors the sync API."""
+    print(f"\n{CYAN}Test 3: Async Streaming{ENDC}")
+    fakes = {"deepseek": FakeAsyncCompletions("async tokens arrive")}
+    client = make_client(fakes)
+
+    async def run():
+        stream = await client.achat_stream([{"role": "user", "content": "hi"}], provider="deepseek")
+        deltas = [d async for d in stream]
+        return deltas, stream
+
+    deltas, stream = asyncio.run(run())
+    assert "".join(deltas) == "async tokens arrive"
+    assert stream.response.usage.total_tokens == 13
+    print(f"  {GREEN}✓{ENDC} Async stream aggregated {len(deltas)} deltas")
+    return True
+
+
+def test_response_cache_hits_and_bypass():
+    """Identical requests are served from disk; use_cache=False forces a fresh call."""
+    print(f"\n{CYAN}Test 4: Response Cache{ENDC}")
+    with tempfile.TemporaryDirectory() as tmp:
+        fakes = {"deepseek": FakeCompletions("cached verdict")}
+        client = make_client(fakes, cache=ResponseCache(tmp))
+        messages = [{"role": "user", "content": "same input"}]
+
+        first = client.chat(messages, provider="deepseek")
+        # Trailing whitespace / CRLF differences normalize to the same key
+        second = client.chat([{"role": "user", "content": "same input \r\n"}], provider="deepseek")
+        assert first.content == second.content == "cached verdict"
+        assert len(fakes["deepseek"].calls) == 1, "Second call should be a cache hit"
+
+        client.chat(messages, provider="deepseek", temperature=0.1)
+        assert len(fakes["deepseek"].calls) == 2, "Different sampling params must miss"
+
+        client.chat(messages, provider="deepseek", use_cache=False)
+        assert len(fakes["deepseek"].calls) == 3, "use_cache=False must bypass the cache"
+        assert "use_cache" not in fakes["deepseek"].calls[-1], "Control kwargs must not reach the SDK"
+
+        stream = client.chat_stream(messages, provider="deepseek")
+        assert stream.collect().content == "cached verdict"
+        assert len(fakes["deepseek"].calls) == 3, "Streams should be served from the cache too"
+
+        stats = client.cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 2, f"Unexpected stats: {stats}"
+        print(f"  {GREEN}✓{ENDC} hits={stats['hits']} misses={stats['misses']}")
+    return True
+
+
+def test_response_cache_eviction_and_ttl():
+    """Size-bounded LRU eviction keeps recently used entries; TTL expires old ones."""
+    print(f"\n{CYAN}Test 5: Cache Eviction & TTL{ENDC}")
+    from llm.models import LLMResponse
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp, ttl_seconds=None, max_bytes=2000)
+        body = "x" * 400
+        for i in range(3):
+            cache.put(f"{i:064x}", LLMResponse(content=body, model="m", provider="p"))
+            time.sleep(0.01)
+        assert cache.get(f"{0:064x}") is not None  # touch entry 0 so it becomes most recent
+        for i in range(3, 6):
+            cache.put(f"{i:064x}", LLMResponse(content=body, model="m", provider="p"))
+            time.sleep(0.01)
+
+        assert cache.evictions > 0, "Exceeding max_bytes should evict"
+        assert cache.stats()["bytes"] <= 2000
+        assert cache.get(f"{1:064x}") is None, "Least recently used entry should be evicted first"
+        print(f"  {GREEN}✓{ENDC} {cache.evictions} entries evicted")
+
+        ttl_cache = ResponseCache(tmp, ttl_seconds=0)
+        time.sleep(0.01)
+        assert ttl_cache.get(f"{5:064x}") is None, "Expired entries should miss"
+        assert ttl_cache.expired == 1
+        print(f"  {GREEN}✓{ENDC} Expired entry dropped")
+    return True
+
+
+def test_achat_fallback_and_circuit_breaker():
+    """achat walks the fallback chain, routes around an open circuit and recovers after cool-down."""
+    print(f"\n{CYAN}Test 6: Async Fallback & Circuit Breaker{ENDC}")
+    fakes = {
+        "deepseek": FakeAsyncCompletions("primary", fail_times=3, error="503 overloaded"),
+        "dashscope": FakeAsyncCompletions("rescued"),
+    }
+    client = make_client(fakes)
+
+    async def ask():
+        return await client.achat([{"role": "user", "content": "hi"}], provider="deepseek", retry_delay=0)
+
+    first = asyncio.run(ask())
+    assert first.provider == "dashscope"
+    assert len(fakes["deepseek"].calls) == 3, "Retryable errors should use all attempts once"
+    assert client.health.is_open("deepseek"), "Three consecutive failures should open the circuit"
+
+    second = asyncio.run(ask())
+    assert second.provider == "dashscope"
+    assert len(fakes["deepseek"].calls) == 3, "Open circuit should be routed around without a call"
+    print(f"  {GREEN}✓{ENDC} deepseek circuit open, routed to dashscope")
+
+    client.health._providers["deepseek"].opened_at -= client.health.open_seconds  # cool-down elapsed
+    third = asyncio.run(ask())
+    assert third.provider == "deepseek", "Half-open probe should succeed and close the circuit"
+    assert client.health.snapshot()["deepseek"]["state"] == "closed"
+    print(f"  {GREEN}✓{ENDC} deepseek recovered after cool-down")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(str(Path(tmp) / "llm_state.db"))
+        persisted = HealthTracker(store)
+        persisted.record_failure("siliconflow", fatal=True)
+        persisted.flush()
+        assert HealthTracker(store).is_open("siliconflow"), "Open circuits should survive a restart"
+        print(f"  {GREEN}✓{ENDC} health snapshot persisted")
+
+        async def fan_out():
+            return await asyncio.gather(*[
+                client.achat([{"role": "user", "content": f"q{i}"}], provider="dashscope") for i in range(200)
+            ])
+
+        results = asyncio.run(fan_out())
+        assert all(r.content == "rescued" for r in results)
+        print(f"  {GREEN}✓{ENDC} {len(results)} concurrent calls on one event loop")
+    return True
+
+
+def test_client_pool_reuse():
+    """SDK clients are shared across LLMClient instances and per-call overrides."""
+    print(f"\n{CYAN}Test 7: Shared Client Pool{ENDC}")
+    from llm.pool import get_pool, close_pool
+
+    close_pool()
+    a, b = LLMClient(), LLMClient()
+    first = a._get_client("deepseek", api_key="sk-test")
+    assert b._get_client("deepseek", api_key="sk-test") is first, "Instances should share pooled clients"
+
+    override = a._get_client("deepseek", api_key="sk-other", base_url="https://proxy.example/v1")
+    assert override is not first, "Overrides need their own transport"
+    assert b._get_client("deepseek", api_key="sk-other", base_url="https://proxy.example/v1") is override
+    print(f"  {GREEN}✓{ENDC} pool stats: {get_pool().stats()}")
+
+    a.close()
+    assert b._get_client("deepseek", api_key="sk-test") is first, "Closing one instance must not close the shared pool"
+
+    close_pool()
+    assert get_pool().stats()["clients"] == 0, "close_pool should drop every client"
+    assert a._get_client("deepseek", api_key="sk-test") is not first, "Pool should reconnect lazily after close"
+    close_pool()
+    return True
+
+
+def test_hedged_requests():
+    """A slow primary is raced by the next provider; the fast answer wins without penalising the primary."""
+    print(f"\n{CYAN}Test 8: Hedged Requests{ENDC}")
+    from llm.hedging import HedgePolicy, LatencyTracker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fakes = {
+            "deepseek": FakeCompletions("slow primary", delay=1.0),
+            "dashscope": FakeCompletions("fast hedge"),
+        }
+        client = make_client(fakes)
+        client.hedge_policy = HedgePolicy({"enabled": True, "default_delay": 0.05, "min_delay": 0.05}, LatencyTracker())
+
+        start = time.time()
+        response = client.chat([{"role": "user", "content": "hi"}], provider="deepseek")
+        elapsed = time.time() - start
+        assert response.content == "fast hedge", "Hedge lane should win"
+        assert elapsed < 0.9, f"Hedged call should not wait for the slow primary ({elapsed:.2f}s)"
+        assert not client.health.is_open("deepseek"), "Being outrun is not a failure"
+        print(f"  {GREEN}✓{ENDC} sync hedge won in {elapsed:.2f}s")
+
+        stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="deepseek")
+        assert stream.collect().content == "fast hedge"
+        print(f"  {GREEN}✓{ENDC} streaming hedge raced on first token")
+
+        fakes["deepseek"] = FakeAsyncCompletions("slow primary", delay=1.0)
+        fakes["dashscope"] = FakeAsyncCompletions("fast hedge")
+        start = time.time()
+        response = asyncio.run(client.achat([{"role": "user", "content": "hi"}], provider="deepseek"))
+        assert response.content == "fast hedge"
+        assert time.time() - start < 0.9
+        print(f"  {GREEN}✓{ENDC} async hedge won, slow lane cancelled")
+
+        # Hedge delay adapts to observed latency once enough samples exist
+        tracker = LatencyTracker()
+        for seconds in [1, 2, 3, 4, 10]:
+            tracker.record("deepseek", seconds)
+        policy = HedgePolicy({"percentile": 0.75, "min_samples": 5, "min_delay": 0}, tracker)
+        assert policy.delay_for("deepseek") == 4
+        assert policy.delay_for("dashscope") == policy.default_delay
+        print(f"  {GREEN}✓{ENDC} p75 hedge delay = {policy.delay_for('deepseek')}s")
+    return True
+
+
+def test_state_store_concurrent_writers():
+    """Health snapshots from concurrent threads/trackers merge without lost updates."""
+    print(f"\n{CYAN}Test 9: Concurrent State Store{ENDC}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "llm_state.db")
+        # Two trackers sharing one store stand in for two `make debate` processes
+        proc_a = HealthTracker(StateStore(path))
+        proc_b = HealthTracker(StateStore(path))
+
+        def hammer(tracker, provider, n):
+            for i in range(n):
+                tracker.record_success(provider, 0.5 + i / 100)
+                if i % 10 == 0:
+                    tracker.flush()
+            tracker.flush()
+
+        threads = [threading.Thread(target=hammer, args=(proc_a, f"prov_a{i}", 50)) for i in range(4)]
+        threads += [threading.Thread(target=hammer, args=(proc_b, f"prov_b{i}", 50)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        proc_b.record_failure("siliconflow", fatal=True)
+        proc_b.flush()
+        proc_a.flush()
+        assert proc_a.is_open("siliconflow"), "Circuit state should propagate between processes"
+
+        fresh = HealthTracker(StateStore(path)).snapshot()
+        assert len(fresh) == 9, f"Every provider entry should survive concurrent writes, got {sorted(fresh)}"
+        assert all(fresh[f"prov_a{i}"]["successes"] == 50 for i in range(4))
+        assert fresh["siliconflow"]["state"] == "open", "Open circuits should survive a restart"
+
+        # Stale writes never overwrite newer rows
+        store = StateStore(path)
+        store.put("health", "siliconflow", {"state": "closed"}, updated_at=0.0)
+        assert store.get("health", "siliconflow")["state"] == "open"
+        print(f"  {GREEN}✓{ENDC} {len(fresh)} provider rows merged, stale write rejected")
+    return True
+
+
+def test_rate_limiter_queues_calls():
+    """RPM/TPM budgets queue calls client-side, shared across threads and tasks."""
+    print(f"\n{CYAN}Test 10: Rate Limiter{ENDC}")
+    fakes = {"deepseek": FakeCompletions("ok")}
+    client = make_client(fakes)
+    client.rate_limiter.configure("deepseek", rpm=600)  # 10 requests/s
+    client.rate_limiter.throttled("deepseek")            # as if the provider just answered 429
+
+    start = time.time()
+    threads = [threading.Thread(target=client.chat, args=([{"role": "user", "content": "hi"}],),
+                                kwargs={"provider": "deepseek"}) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    stats = client.rate_limiter.stats()["deepseek"]
+    assert len(fakes["deepseek"].calls) == 4
+    assert stats["queued"] == 4 and 0.35 < stats["max_wait"] < 0.45, stats
+    assert elapsed >= 0.35, f"Calls should have been spaced out, took {elapsed:.2f}s"
+    print(f"  {GREEN}✓{ENDC} 4 threaded calls queued, max wait {stats['max_wait']:.2f}s")
+
+    async def fan_out():
+        return await asyncio.gather(*[
+            client.achat([{"role": "user", "content": f"q{i}"}], provider="deepseek") for i in range(3)
+        ])
+
+    client.rate_limiter.throttled("deepseek")
+    asyncio.run(fan_out())
+    stats = client.rate_limiter.stats()["deepseek"]
+    assert stats["queued"] == 7 and stats["throttled"] == 2
+    print(f"  {GREEN}✓{ENDC} async tasks share the same budget ({stats['wait_seconds']:.2f}s queued in total)")
+
+    # TPM: the completion cap is reserved up front, then refunded down to real usage
+    limiter = RateLimiter()
+    limiter.configure("dashscope", tpm=6000)
+    assert limiter.acquire("dashscope", 5000) == 0
+    assert limiter.acquire("dashscope", 1010) > 0, "Second call exceeds the minute's token budget"
+    limiter.settle("dashscope", 5000, 12)
+    assert limiter._limits["dashscope"].tpm.tokens > 4900, "Unused reservation should be refunded"
+    print(f"  {GREEN}✓{ENDC} TPM reservation settled against reported usage")
+    return True
+
+
+def test_chat_many_batches():
+    """chat_many / achat_many keep input order, cap concurrency and isolate failures."""
+    print(f"\n{CYAN}Test 11: Batch API{ENDC}")
+    fakes = {
+        "deepseek": FakeCompletions("fast", delay=0.05),
+        "gemini": FakeCompletions("stuck", delay=1.0),
+    }
+    client = make_client(fakes)
+    requests = [{"messages": [{"role": "user", "content": f"q{i}"}]} for i in range(6)]
+    requests[2] = {"messages": [{"role": "user", "content": "slow"}], "provider": "gemini", "timeout": 0.2}
+    requests[4] = LLMRequest(messages=[Message(role="user", content="typed")], max_tokens=64)
+
+    caller = CancelToken()
+    batch = client.chat_many(requests, concurrency=3, provider="deepseek", max_retries=1, cancel=caller)
+    assert not caller.cancelled, "A batch timeout must not cancel the caller's own token"
+    assert len(batch) == 6 and [item.index for item in batch] == list(range(6))
+    assert batch.succeeded == 5 and batch.failed == 1
+    assert isinstance(batch[2].error, TimeoutError), "Overdue requests should fail alone"
+    assert any(call["max_tokens"] == 64 for call in fakes["deepseek"].calls), "LLMRequest fields should be forwarded"
+    assert batch.elapsed < 0.6, f"Slow request must not hold the batch hostage ({batch.elapsed:.2f}s)"
+    assert batch.usage.total_tokens == 5 * 11
+    print(f"  {GREEN}✓{ENDC} sync: {batch.summary()}")
+
+    def crashing(**kwargs):
+        if kwargs["messages"] == "boom":
+            raise KeyboardInterrupt
+        return LLMResponse(content="ok", model="m", provider="p")
+
+    workers = set()
+    batch = run_batch(lambda **kwargs: workers.add(threading.current_thread().name) or crashing(**kwargs),
+                      [{"messages": "boom"}] + [{"messages": "fine"}] * 9, concurrency=2, timeout=None)
+    assert isinstance(batch[0].error, KeyboardInterrupt) and batch.succeeded == 9, "BaseExceptions are reported, not hung on"
+    assert len(workers) <= 2, f"Requests must run on a bounded pool, saw {len(workers)} threads"
+
+    caller.cancel("user abort")
+    cancelled = client.chat_many([{"messages": [{"role": "user", "content": "q"}]}], provider="deepseek", cancel=caller)
+    assert isinstance(cancelled[0].error, CallCancelled), "The caller's token still cancels the batch"
+    print(f"  {GREEN}✓{ENDC} bounded pool, BaseExceptions reported, caller's token linked but never cancelled")
+
+    in_flight = {"now": 0, "peak": 0}
+
+    class CountingCompletions(FakeAsyncCompletions):
+        async def create(self, **kwargs):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            try:
+                return await super().create(**kwargs)
+            finally:
+                in_flight["now"] -= 1
+
+    fakes = {
+        "deepseek": CountingCompletions("ok", delay=0.02, fail_times=1),
+        "dashscope": CountingCompletions("rescued", delay=0.02),
+    }
+    client = make_client(fakes)
+    requests = [{"messages": [{"role": "user", "content": f"q{i}"}]} for i in range(20)]
+    batch = asyncio.run(client.achat_many(requests, concurrency=4, provider="deepseek", max_retries=1))
+    assert in_flight["peak"] <= 4, f"Concurrency cap exceeded: {in_flight['peak']}"
+    assert batch.succeeded == 20
+    assert [r.provider for r in batch.responses].count("dashscope") == 1, "Failed item should fall back alone"
+    assert all(0 < call["timeout"] <= 300 for call in fakes["dashscope"].calls), "Async requests get the batch deadline too"
+    print(f"  {GREEN}✓{ENDC} async: peak {in_flight['peak']} in flight, {batch.summary()}")
+    return True
+
+
+def test_prompt_prefix_caching():
+    """Shared prefixes are canonicalized, cache hits are counted, Gemini handles are reused."""
+    print(f"\n{CYAN}Test 12: Prompt Prefix Caching{ENDC}")
+    fakes = {"deepseek": FakeCompletions("ok")}
+    client = make_client(fakes)
+    material = "<target_material>\r\nline 1  \r\n</target_material>\n\n"
+    client.chat([{"role": "system", "content": material}, {"role": "system", "content": "role A \r\n"},
+                 {"role": "user", "content": "q1"}], provider="deepseek")
+    client.chat([{"role": "system", "content": material.replace("  \r\n", "\n")},
+                 {"role": "system", "content": "role A"}, {"role": "user", "content": "q2"},
+                 {"role": "system", "content": "late rule"}], provider="deepseek")
+    first, second = (call["messages"] for call in fakes["deepseek"].calls)
+    assert first[:2] == second[:2], "Equivalent prefixes must be byte-identical"
+    assert "line 1\n" in first[0]["content"], "Trailing whitespace is stripped on every line"
+    assert [m["role"] for m in second] == ["system", "system", "user", "system"], "Mid-conversation system turns stay put"
+    print(f"  {GREEN}✓{ENDC} prefixes canonicalized")
+
+    deepseek_usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=50, total_tokens=1250,
+                                     prompt_cache_hit_tokens=1024, prompt_cache_miss_tokens=176)
+    dashscope_usage = SimpleNamespace(prompt_tokens=900, completion_tokens=10, total_tokens=910,
+                                      prompt_tokens_details=SimpleNamespace(cached_tokens=512))
+    plain_usage = _usage(10, 2)
+    assert LLMClient._openai_usage(SimpleNamespace(usage=deepseek_usage)).cached_tokens == 1024
+    assert LLMClient._openai_usage(SimpleNamespace(usage=dashscope_usage)).cached_tokens == 512
+    assert LLMClient._openai_usage(SimpleNamespace(usage=plain_usage)).cached_tokens == 0
+    print(f"  {GREEN}✓{ENDC} cached tokens parsed for DeepSeek and OpenAI-style usage")
+
+    created = []
+    genai = SimpleNamespace(caches=SimpleNamespace(
+        create=lambda model, config: created.append(model) or SimpleNamespace(name=f"cachedContents/{len(created)}")
+    ))
+    prompt_cache = PromptCache({"min_chars": 100})
+    prompt_cache._config = lambda text: {"system_instruction": text}  # no google-genai needed
+    long_prompt = "rules " * 50
+    assert prompt_cache.gemini_handle(genai, "gemini-pro", "short") is None, "Small prompts are sent inline"
+    handle = prompt_cache.gemini_handle(genai, "gemini-pro", long_prompt, owner="key-a")
+    assert handle == "cachedContents/1"
+    assert prompt_cache.gemini_handle(genai, "gemini-pro", long_prompt, owner="key-a") == handle
+    assert prompt_cache.gemini_handle(genai, "gemini-pro", long_prompt, owner="key-b") == "cachedContents/2"
+    assert prompt_cache.stats()["reused"] == 1 and len(created) == 2
+    print(f"  {GREEN}✓{ENDC} Gemini cached content created once per key and reused")
+    return True
+
+
+def test_token_budgeting():
+    """Local token estimates drive pre-flight window checks and priority trimming."""
+    print(f"\n{CYAN}Test 13: Token Budgeting{ENDC}")
+    assert count_tokens("论证" * 100, "deepseek") < count_tokens("论证" * 100, "openrouter")
+    assert 90 <= count_tokens("word " * 80, "openai") <= 110
+    print(f"  {GREEN}✓{ENDC} per-provider estimates (CJK-aware)")
+
+    history = "\n".join(f"round {i}: old debate notes" for i in range(400))
+    target = "\n".join(f"[Line {i}] requirement text" for i in range(400))
+    texts, trimmed = fit_blocks([
+        PromptBlock("instructions", "goal: ship it", required=True),
+        PromptBlock("history_summary", history, priority=0, keep="tail"),
+        PromptBlock("target_material", target, priority=4),
+    ], budget=count_tokens(target) + 200)
+    assert list(trimmed) == ["history_summary"], "Lowest-priority block is trimmed first, and only it"
+    assert texts["target_material"] == target and texts["instructions"] == "goal: ship it"
+    assert "round 399" in texts["history_summary"] and "round 0:" not in texts["history_summary"]
+    total = sum(count_tokens(t) for t in texts.values())
+    assert total <= count_tokens(target) + 200, total
+    print(f"  {GREEN}✓{ENDC} history trimmed to its newest rounds, target untouched")
+
+    fakes = {"deepseek": FakeCompletions("small"), "dashscope": FakeCompletions("big")}
+    client = make_client(fakes)
+    client.config = {**client.config,
+                     "deepseek": {**client.config["deepseek"], "model": "small-model", "context_window": 4000},
+                     "dashscope": {**client.config["dashscope"], "model": "big-model", "context_window": 100000}}
+    huge = [{"role": "user", "content": "x" * 40000}]
+    response = client.chat(huge, provider="deepseek", max_tokens=2048)
+    assert response.provider == "dashscope", "Oversize prompt should skip the small window without a call"
+    assert fakes["deepseek"].calls == [] and "deepseek" not in client.health.snapshot()
+    print(f"  {GREEN}✓{ENDC} oversize prompt rejected locally, routed to a larger window")
+
+    client.chat([{"role": "user", "content": "x" * 8000}], provider="deepseek", max_tokens=4000)
+    assert fakes["deepseek"].calls[-1]["max_tokens"] < 4000, "Completion cap should shrink to fit"
+    assert client.prompt_budget(provider="dashscope", max_tokens=8000) == int(100000 * 0.95) - 8000
+    print(f"  {GREEN}✓{ENDC} max_tokens clamped to remaining room ({fakes['deepseek'].calls[-1]['max_tokens']})")
+    return True
+
+
+def test_call_ledger():
+    """Every attempt (failures, fallbacks, streams) lands in the ledger with tokens and cost."""
+    print(f"\n{CYAN}Test 14: Call Ledger{ENDC}")
+    with tempfile.TemporaryDirectory() as tmp:
+        fakes = {"deepseek": FakeCompletions("unused", fail_times=5, error="401 authentication failed"),
+                 "dashscope": FakeCompletions("fallback answer here")}
+        client = make_client(fakes, context_id="docs/plan.md")
+        client.ledger = Ledger(str(Path(tmp) / "ledger.jsonl"))
+
+        client.chat([{"role": "user", "content": "hi"}], provider="deepseek", role="negative", retry_delay=0)
+        stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", role="adjudicator")
+        stream.collect()
+        records = list(client.ledger.records())
+        assert [(r["provider"], r["ok"]) for r in records] == [
+            ("deepseek", False), ("dashscope", True), ("dashscope", True)], records
+        failed, fallback, streamed = records
+        assert failed["error"] == "RuntimeError" and failed["attempt"] == 1 and "cost" not in failed
+        assert fallback["hop"] == 1 and fallback["role"] == "negative" and len(fallback["ctx"]) == 12
+        assert fallback["model"] == "qwen-plus" and fallback["in"] == 10 and fallback["out"] == 3
+        assert abs(fallback["cost"] - (10 * 0.40 + 3 * 1.20) / 1e6) < 1e-9
+        assert streamed["role"] == "adjudicator" and "ttft" in streamed and streamed["latency"] >= streamed["ttft"]
+        assert streamed["out"] == 3, "Stream entry should be completed with the final usage"
+        print(f"  {GREEN}✓{ENDC} failed attempt, fallback hop and stream recorded with usage and cost")
+
+        rows = aggregate(client.ledger.records(), by=("role", "provider"))
+        by_key = {(r["role"], r["provider"]): r for r in rows}
+        assert by_key[("negative", "deepseek")]["failed"] == 1
+        assert by_key[("negative", "dashscope")]["fallbacks"] == 1
+        assert by_key[("adjudicator", "dashscope")]["p50_ttft"] is not None
+        report = format_report(rows, ("role", "provider"))
+        assert "3 attempts (1 failed)" in report, report
+        print(f"  {GREEN}✓{ENDC} report aggregates by role and provider")
+
+        client.chat([{"role": "user", "content": "hi"}], provider="dashscope", context="docs/other.md")
+        other = list(client.ledger.records())[-1]
+        assert len(other["ctx"]) == 12 and other["ctx"] != fallback["ctx"], "Per-call context should override the client's"
+        print(f"  {GREEN}✓{ENDC} per-call context attributes a shared client's calls to their target")
+
+        class BrokenCompletions(FakeCompletions):
+            """Streams two words and the usage so far, then drops the connection (or notes being closed)."""
+            closed = False
+
+            def _events(self):
+                try:
+                    yield _event(text="partial")
+                    yield _event(text=" answer", usage=_usage(10, 2))
+                    yield _event(text=" never")
+                    raise RuntimeError("502 connection reset mid-stream")
+                finally:
+                    BrokenCompletions.closed = True
+
+        fakes["dashscope"] = BrokenCompletions()
+        for delta in client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", role="affirmative"):
+            break
+        abandoned = list(client.ledger.records())[-1]
+        assert BrokenCompletions.closed, "Abandoning a stream must close the provider stream"
+        assert abandoned["role"] == "affirmative" and not abandoned["ok"] and abandoned["kind"] == "abandoned"
+        assert abandoned["latency"] >= abandoned["ttft"], abandoned
+
+        stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", role="negative")
+        try:
+            stream.collect()
+            assert False, "The mid-stream error should reach the reader"
+        except RuntimeError:
+            pass
+        broken = list(client.ledger.records())[-1]
+        assert not broken["ok"] and broken["error"] == "RuntimeError" and broken["kind"] == "transient", broken
+        assert broken["in"] == 10 and broken["out"] == 2, "Usage seen before the failure is still billed"
+
+        async def abort_async():
+            stream = await client.achat_stream([{"role": "user", "content": "hi"}], provider="dashscope",
+                                               role="adjudicator")
+            try:
+                async for _ in stream:
+                    pass
+            except RuntimeError:
+                pass
+        asyncio.run(abort_async())
+        assert list(client.ledger.records())[-1]["role"] == "adjudicator", "Async streams settle the same way"
+        assert len(list(client.ledger.records())) == 7
+        print(f"  {GREEN}✓{ENDC} abandoned and failed streams ledgered as failed attempts with partial usage")
+    return True
+
+
+def test_tracing_spans():
+    """Calls, attempts, backoff and provider requests nest into one trace, across hedge threads."""
+    print(f"\n{CYAN}Test 15: Tracing{ENDC}")
+    assert Tracer().start_span("noop") is NOOP_SPAN, "Tracing must be a no-op without exporters"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trace.json"
+        tracer = Tracer([JsonExporter(str(path))])
+        fakes = {"deepseek": FakeCompletions("unused", fail_times=5),
+                 "dashscope": FakeCompletions("fallback answer", delay=0.05)}
+        client = make_client(fakes)
+        client.tracer = tracer
+
+        with tracer.span("debate") as root:
+            client.chat([{"role": "user", "content": "hi"}], provider="deepseek", max_retries=2, retry_delay=0.01)
+            stream = client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", role="adjudicator")
+            stream.collect()
+            client.chat([{"role": "user", "content": "again"}], provider="deepseek", hedge=True, retry_delay=0)
+
+        trace = json.loads(path.read_text())
+        spans = trace["spans"]
+        by_id = {s["span_id"]: s for s in spans}
+        assert all(s["trace_id"] == root.trace_id for s in spans), "Everything belongs to one trace"
+
+        def parent(span):
+            return by_id[span["parent_id"]]["name"]
+
+        names = [s["name"] for s in spans]
+        assert names.count("llm.chat") == 2 and names.count("llm.chat_stream") == 1
+        assert names.count("llm.backoff") >= 1, "Retry waits should be visible"
+        attempts = [s for s in spans if s["name"] == "llm.attempt"]
+        assert all(parent(a) in ("llm.chat", "llm.chat_stream") for a in attempts), "Hedge lanes must keep their parent"
+        assert sum(1 for a in attempts if a["error"]) >= 3, "Failed attempts carry their error"
+        requests = [s for s in spans if s["name"] == "llm.request"]
+        assert requests and all(parent(r) == "llm.attempt" for r in requests)
+        streamed = next(s for s in spans if s["name"] == "llm.chat_stream")
+        assert streamed["attributes"]["completion_tokens"] == 2 and streamed["attributes"]["role"] == "adjudicator"
+        first_chat = next(s for s in spans if s["name"] == "llm.chat")
+        assert first_chat["attributes"]["provider_used"] == "dashscope" and first_chat["attributes"]["fallbacks"] == 1
+        print(f"  {GREEN}✓{ENDC} {len(spans)} spans nested under one root (attempts, backoff, requests, stream)")
+
+        path_names = [step["name"] for step in trace["critical_path"]]
+        assert path_names[0] == "debate" and path_names[1] == "llm.chat", path_names
+        print(f"  {GREEN}✓{ENDC} critical path: {' → '.join(path_names)}")
+
+        client.tracer = tracer = Tracer([JsonExporter(str(path))])
+        with tracer.span("debate"):
+            token = CancelToken()
+            try:
+                for _ in client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", cancel=token):
+                    token.cancel("reader gave up")
+            except CallCancelled:
+                pass
+            for _ in client.chat_stream([{"role": "user", "content": "hi"}], provider="dashscope", role="skimmer"):
+                break
+        cancelled, abandoned = (s for s in json.loads(path.read_text())["spans"] if s["name"] == "llm.chat_stream")
+        assert cancelled["error"] == "CallCancelled: reader gave up", "Streams stopped mid-generation end with their error"
+        assert abandoned["attributes"]["abandoned"] is True and abandoned["attributes"]["role"] == "skimmer"
+        print(f"  {GREEN}✓{ENDC} cancelled and abandoned streams still export their span")
+    return True
+
+
+def test_record_replay():
+    """A recorded run replays offline: same answers, no provider calls, scaled latency."""
+    print(f"\n{CYAN}Test 16: Record / Replay{ENDC}")
+    messages = [{"role": "user", "content": "Critique the plan"}]
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = str(Path(tmp) / "run.json")
+
+        recorder = make_client({"deepseek": FakeCompletions("first answer", delay=0.05),
+                                "dashscope": FakeCompletions("streamed answer here")},
+                               replay=Replay("record", cassette))
+        recorded = recorder.chat(messages, provider="deepseek", role="negative").content
+        streamed = recorder.chat_stream(messages, provider="dashscope", role="affirmative").collect().content
+        asyncio.run(recorder.achat([{"role": "user", "content": "async"}], provider="deepseek"))
+        assert recorder.replay.stats()["recorded"] == 3
+        assert json.loads(Path(cassette).read_text())["interactions"][1]["response"]["content"] == streamed
+        print(f"  {GREEN}✓{ENDC} recorded 3 interactions (sync, stream, async)")
+
+        offline = {"deepseek": FakeCompletions("LIVE", fail_times=99, error="network is off"),
+                   "dashscope": FakeCompletions("LIVE", fail_times=99, error="network is off")}
+        player = make_client(offline, replay=Replay("replay", cassette, latency_scale=0))
+        assert player.chat(messages, provider="deepseek", role="negative").content == recorded
+        stream = player.chat_stream(messages, provider="dashscope", role="affirmative")
+        assert "".join(stream) == streamed and stream.response.usage.completion_tokens == 3
+        reply = asyncio.run(player.achat([{"role": "user", "content": "async"}], provider="deepseek"))
+        assert reply.content == "first answer"
+        assert not offline["deepseek"].calls and not offline["dashscope"].calls, "Replay must never reach a provider"
+        print(f"  {GREEN}✓{ENDC} replayed sync, stream and async responses without provider calls")
+
+        timed = make_client(offline, replay=Replay("replay", cassette, latency_scale=1.0))
+        start = time.time()
+        timed.chat(messages, provider="deepseek", role="negative")
+        assert time.time() - start >= 0.04, "Recorded latency should be reproduced at scale 1"
+        print(f"  {GREEN}✓{ENDC} recorded latency reproduced ({time.time() - start:.2f}s)")
+
+        loose = make_client(offline, replay=Replay("replay", cassette, latency_scale=0))
+        edited = [{"role": "user", "content": "Critique the revised plan"}]
+        assert loose.chat(edited, provider="deepseek", role="negative", max_retries=1).content == recorded
+        strict = make_client(offline, replay=Replay("replay", cassette, latency_scale=0, strict=True))
+        try:
+            strict.chat(edited, provider="deepseek", role="negative", max_retries=1)
+            assert False, "Strict replay should fail on an unrecorded request"
+        except ReplayMissError:
+            pass
+        assert not offline["deepseek"].calls, "A replay miss must not fall through to a live call"
+        print(f"  {GREEN}✓{ENDC} unmatched request served by route; strict mode raises ReplayMissError")
+    return True
+
+
+def test_gemini_turns():
+    """Native Gemini requests keep the conversation's roles instead of a flattened transcript."""
+    print(f"\n{CYAN}Test 17: Gemini Contents{ENDC}")
+    messages = arrange_messages([
+        {"role": "system", "content": "You are the adjudicator."},
+        {"role": "user", "content": "Affirmative says A."},
+        {"role": "user", "content": "Negative says B."},
+        {"role": "assistant", "content": "Draft verdict."},
+        {"role": "user", "content": "Finalize."},
+    ])
+    assert LLMClient._gemini_system(messages) == "You are the adjudicator."
+    turns = LLMClient._gemini_turns(messages)
+    assert turns == [("user", "Affirmative says A.\n\nNegative says B."),
+                     ("model", "Draft verdict."), ("user", "Finalize.")], turns
+    print(f"  {GREEN}✓{ENDC} {len(turns)} alternating turns, system prompt kept out of contents")
+
+    def reply(reason):
+        return SimpleNamespace(candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name=reason))])
+    assert LLMClient._gemini_finish_reason(reply("STOP")) == "stop"
+    assert LLMClient._gemini_finish_reason(reply("MAX_TOKENS")) == "length"
+    assert LLMClient._gemini_finish_reason(reply("SAFETY")) == "content_filter"
+    assert LLMClient._gemini_finish_reason(SimpleNamespace(candidates=[SimpleNamespace(finish_reason=None)])) is None
+    print(f"  {GREEN}✓{ENDC} finish reasons mapped to OpenAI terms (truncation reported as 'length')")
+    return True
+
+
+def test_compact_responses():
+    """Responses are slots objects; the SDK payload is kept, serialized lazily or dropped per config."""
+    print(f"\n{CYAN}Test 18: Compact Responses{ENDC}")
+    from llm.models import LLMResponse, Usage
+    fakes = {"deepseek": FakeCompletions("small answer")}
+    client = make_client(fakes)
+
+    assert LLMClient().raw_mode == "keep", "raw stays the SDK object unless a config opts out"
+    client.raw_mode = "keep"
+    kept = client.chat([{"role": "user", "content": "hi"}], provider="deepseek")
+    assert not hasattr(kept, "__dict__") and not hasattr(kept.usage, "__dict__"), "Responses should use __slots__"
+    assert kept.raw.choices[0].message.content == "small answer", "keep: the SDK object itself"
+
+    client.raw_mode = "lazy"
+    lazy = client.chat([{"role": "user", "content": "hi"}], provider="deepseek")
+    assert isinstance(lazy._raw.data, str), "lazy: stored as JSON text, not the object graph"
+    assert lazy.raw["choices"][0]["message"]["content"] == "small answer", "lazy: decoded on access"
+    assert lazy.raw is lazy.raw, "lazy: decoded once, then memoized"
+
+    client.raw_mode = "drop"
+    dropped = client.chat([{"role": "user", "content": "hi"}], provider="deepseek")
+    assert dropped.raw is None and dropped.content == "small answer"
+    print(f"  {GREEN}✓{ENDC} raw payload kept / serialized lazily / dropped")
+
+    data = kept.model_dump(exclude={"raw"})
+    assert data["usage"] == {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12, "cached_tokens": 0}
+    restored = LLMResponse(**json.loads(json.dumps(data)))
+    assert restored == LLMResponse(**data) and isinstance(restored.usage, Usage), "Cache round trip keeps the fields"
+    print(f"  {GREEN}✓{ENDC} model_dump / constructor round trip compatible with the response cache")
+    return True
+
+
+def test_retry_classification_and_backoff():
+    """Errors are classified by type and status, Retry-After is honoured, backoff is jittered and budgeted."""
+    print(f"\n{CYAN}Test 19: Retry Classification & Backoff{ENDC}")
+
+    class RateLimitError(Exception):
+        def __init__(self, message, headers=None):
+            super().__init__(message)
+            self.status_code = 429
+            self.response = SimpleNamespace(status_code=429, headers=headers or {})
+
+    class NotFoundError(Exception):
+        status_code = 404
+
+    assert classify(RateLimitError("slow down", {"retry-after": "7"})).retry_after == 7.0
+    assert classify(RateLimitError("slow down", {"x-ratelimit-reset-tokens": "1m30s"})).retry_after == 90.0
+    assert classify(RateLimitError("You exceeded your current quota: insufficient_quota")).fatal
+    assert classify(NotFoundError("model gone")).fatal
+    assert classify(TimeoutError("read timed out")).kind == "transient"
+    assert classify(RuntimeError("503 Service Unavailable")).kind == "transient"
+    assert classify(RuntimeError("invalid_api_key")).fatal, "Message markers remain the last resort"
+    print(f"  {GREEN}✓{ENDC} classified by exception type, HTTP status and quota markers")
+
+    delays = [Backoff(1.0, 30.0) for _ in range(50)]
+    firsts = [b.next_delay(classify(RuntimeError("503"))) for b in delays]
+    assert all(1.0 <= d <= 3.0 for d in firsts) and len({round(d, 3) for d in firsts}) > 10, "Jitter must spread retries"
+    assert Backoff(0.1, 30.0).next_delay(classify(RateLimitError("x", {"retry-after": "120"}))) is None, \
+        "A Retry-After beyond max_delay fails over"
+    print(f"  {GREEN}✓{ENDC} decorrelated jitter spreads {len(firsts)} synchronized retries over "
+          f"{min(firsts):.2f}-{max(firsts):.2f}s")
+
+    fakes = {"deepseek": FakeCompletions("unused", fail_times=5),
+             "dashscope": FakeCompletions("fallback answer")}
+    client = make_client(fakes)
+    client.retry_metrics = RetryMetrics()
+    start = time.time()
+    response = client.chat([{"role": "user", "content": "hi"}], provider="deepseek",
+                           max_retries=3, retry_delay=5, retry_budget=1)
+    assert response.content == "fallback answer" and time.time() - start < 1, "Over-budget backoff fails over"
+    stats = client.retry_metrics.stats()["deepseek"]
+    assert stats["failures"] == 1 and stats["budget_exhausted"] == 1 and stats["kinds"] == {"transient": 1}
+
+    fakes = {"deepseek": FakeCompletions("recovered", fail_times=2)}
+    client = make_client(fakes)
+    client.retry_metrics = RetryMetrics()
+    client.chat([{"role": "user", "content": "hi"}], provider="deepseek", max_retries=3, retry_delay=0.01)
+    stats = client.retry_metrics.stats()["deepseek"]
+    assert stats["retries"] == 2 and stats["backoff_seconds"] > 0
+    print(f"  {GREEN}✓{ENDC} retry budget enforced; {stats['backoff_seconds']:.3f}s of backoff recorded")
+    return True
+
+
+def test_deadlines_and_cancellation():
+    """Deadlines become SDK timeouts and bound retries; a cancel token stops calls and open streams."""
+    print(f"\n{CYAN}Test 20: Deadlines & Cancellation{ENDC}")
+    fakes = {"deepseek": FakeCompletions("ok")}
+    client = make_client(fakes)
+    client.chat([{"role": "user", "content": "hi"}], provider="deepseek", deadline=5)
+    assert 0 < fakes["deepseek"].calls[0]["timeout"] <= 5, "Remaining deadline is sent as the SDK timeout"
+    assert "deadline" not in fakes["deepseek"].calls[0] and "cancel" not in fakes["deepseek"].calls[0]
+
+    failing = {p: FakeCompletions("never", fail_times=99, delay=0.1) for p in ["deepseek", "dashscope", "siliconflow", "gemini", "openai"]}
+    client = make_client(failing)
+    start = time.time()
+    try:
+        client.chat([{"role": "user", "content": "hi"}], provider="deepseek", deadline=0.3, retry_delay=0.05, max_retries=50)
+        assert False, "An exhausted deadline must surface as DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    elapsed = time.time() - start
+    assert elapsed < 0.6, f"Retries and fallbacks must stop at the deadline (took {elapsed:.2f}s)"
+    print(f"  {GREEN}✓{ENDC} deadline mapped to SDK timeout; retries + fallback stopped after {elapsed:.2f}s")
+
+    class SlowStream(FakeCompletions):
+        def _events(self):
+            for event in super()._events():
+                time.sleep(0.02)
+                yield event
+
+    slow = {"deepseek": SlowStream(" ".join(f"w{i}" for i in range(200)))}
+    client = make_client(slow)
+    token = CancelToken()
+    received, outcome = [], {}
+
+    def consume():
+        try:
+            for delta in client.chat_stream([{"role": "user", "content": "long"}], provider="deepseek", cancel=token):
+                received.append(delta)
+        except CallCancelled as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=consume)
+    worker.start()
+    time.sleep(0.2)
+    token.cancel("orchestrator timeout")
+    worker.join(timeout=1)
+    assert not worker.is_alive(), "Cancelled stream should release its thread"
+    assert isinstance(outcome.get("error"), CallCancelled) and 0 < len(received) < 200
+    print(f"  {GREEN}✓{ENDC} in-flight stream cancelled after {len(received)}/200 tokens")
+
+    token = CancelToken()
+    try:
+        for _ in make_client({"deepseek": FakeCompletions("a b c")}).chat_stream(
+                [{"role": "user", "content": "q"}], provider="deepseek", cancel=token):
+            token.cancel("reader gave up")
+        assert False, "A stream closed on cancellation must not end as if it were complete"
+    except CallCancelled:
+        pass
+    print(f"  {GREEN}✓{ENDC} cancelling between chunks raises instead of truncating the reply")
+
+    class StalledStream(FakeAsyncCompletions):
+        async def create(self, **kwargs):
+            self._check(kwargs)
+
+            async def gen():
+                yield _event(text="first")
+                await asyncio.sleep(30)  # a read blocked on a silent connection
+                yield _event(text=" never")
+            return gen()
+
+    async def stalled(**controls):
+        stream = await make_client({"deepseek": StalledStream("")}).achat_stream(
+            [{"role": "user", "content": "hi"}], provider="deepseek", **controls)
+        async for _ in stream:
+            pass
+
+    async def cancel_soon(token):
+        await asyncio.sleep(0.1)
+        token.cancel("orchestrator timeout")
+
+    for controls, expected in ((dict(deadline=0.2), DeadlineExceeded), (dict(cancel=CancelToken()), CallCancelled)):
+        async def run():
+            if "cancel" in controls:
+                asyncio.get_running_loop().create_task(cancel_soon(controls["cancel"]))
+            await stalled(**controls)
+        start = time.time()
+        try:
+            asyncio.run(run())
+            assert False, "A stalled async stream must be interrupted"
+        except expected:
+            pass
+        assert time.time() - start < 1, f"{expected.__name__} should interrupt a blocked async read"
+    print(f"  {GREEN}✓{ENDC} blocked async reads interrupted by the deadline and by cancellation")
+
+    calls_before = len(slow["deepseek"].calls)
+    try:
+        client.chat([{"role": "user", "content": "hi"}], provider="deepseek", cancel=token)
+        assert False, "A cancelled token must stop the call before it is sent"
+    except CallCancelled:
+        pass
+    assert len(slow["deepseek"].calls) == calls_before and client.health.allow("deepseek")
+    print(f"  {GREEN}✓{ENDC} cancelled calls never reach the provider or count against its health")
+    return True
+
+
+def main():
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}🤖 LLMClient - Offline Tests{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    tests = [
+        ("Streaming Aggregation", test_chat_stream_aggregates_usage),
+        ("Streaming Fallback", test_chat_stream_falls_back_before_first_token),
+        ("Async Streaming", test_achat_stream),
+        ("Response Cache", test_response_cache_hits_and_bypass),
+        ("Cache Eviction & TTL", test_response_cache_eviction_and_ttl),
+        ("Async Fallback & Circuit Breaker", test_achat_fallback_and_circuit_breaker),
+        ("Shared Client Pool", test_client_pool_reuse),
+        ("Hedged Requests", test_hedged_requests),
+        ("Concurrent State Store", test_state_store_concurrent_writers),
+        ("Rate Limiter", test_rate_limiter_queues_calls),
+        ("Batch API", test_chat_many_batches),
+        ("Prompt Prefix Caching", test_prompt_prefix_caching),
+        ("Token Budgeting", test_token_budgeting),
+        ("Call Ledger", test_call_ledger),
+        ("Tracing", test_tracing_spans),
+        ("Record / Replay", test_record_replay),
+        ("Gemini Contents", test_gemini_turns),
+        ("Compact Responses", test_compact_responses),
+        ("Retry Classification & Backoff", test_retry_classification_and_backoff),
+        ("Deadlines & Cancellation", test_deadlines_and_cancellation),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"  {GREEN}✅ {name} PASSED{ENDC}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  {RED}❌ {name} FAILED: {e}{ENDC}")
+        except Exception as e:
+            failed += 1
+            print(f"  {RED}❌ {name} ERROR: {e}{ENDC}")
+
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}📊 Results: {passed} passed, {failed} failed{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
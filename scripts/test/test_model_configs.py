@@ -26,42 +26,32 @@ ENDC = '\033[0m'
 BOLD = '\033[1m'
 
 TEST_PROMPT = "Please respond with exactly one word: 'OK'"
+TEST_MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": TEST_PROMPT}
+]
 
-def test_config(role_name: str, config: dict) -> bool:
-    """Test a single model configuration."""
-    provider = config.get('provider', 'unknown')
-    model = config.get('model', 'unknown')
-    
+def report(role_name: str, config: dict, response=None, error=None) -> bool:
+    """Print the outcome of one configuration check."""
     print(f"\n{CYAN}Testing {BOLD}{role_name}{ENDC}{CYAN}...{ENDC}")
-    print(f"  Provider: {provider}")
-    print(f"  Model: {model}")
+    print(f"  Provider: {config.get('provider', 'unknown')}")
+    print(f"  Model: {config.get('model', 'unknown')}")
     print(f"  Temperature: {config.get('temperature', 'N/A')}")
-    
-    client = LLMClient(context_id=f"test_{role_name}")
-    
-    try:
-        response = client.chat(
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": TEST_PROMPT}
-            ],
-            **config
-        )
-        
-        # Check if we got a valid response
-        if response and response.content:
-            content_preview = response.content[:50].replace('\n', ' ')
-            print(f"  {GREEN}✅ SUCCESS{ENDC}")
-            print(f"  Response: \"{content_preview}...\"")
-            if response.usage:
-                print(f"  Tokens: In={response.usage.prompt_tokens}, Out={response.usage.completion_tokens}")
-            return True
-        else:
-            print(f"  {RED}❌ FAILED: Empty response{ENDC}")
-            return False
-            
-    except Exception as e:
-        print(f"  {RED}❌ FAILED: {e}{ENDC}")
+
+    if error is not None:
+        print(f"  {RED}❌ FAILED: {error}{ENDC}")
+        return False
+
+    # Check if we got a valid response
+    if response and response.content:
+        content_preview = response.content[:50].replace('\n', ' ')
+        print(f"  {GREEN}✅ SUCCESS{ENDC}")
+        print(f"  Response: \"{content_preview}...\"")
+        if response.usage:
+            print(f"  Tokens: In={response.usage.prompt_tokens}, Out={response.usage.completion_tokens}")
+        return True
+    else:
+        print(f"  {RED}❌ FAILED: Empty response{ENDC}")
         return False
 
 def main():
@@ -75,15 +65,22 @@ def main():
         "Adjudicator (Chief Judge)": AdjudicatorConfig,
     }
     
+    # All roles are probed concurrently; results come back in role order
+    client = LLMClient(context_id="test_model_configs")
+    batch = client.chat_many(
+        [{"messages": TEST_MESSAGES, **config} for config in configs.values()],
+        use_cache=False
+    )
     results = {}
-    for role_name, config in configs.items():
-        results[role_name] = test_config(role_name, config)
+    for (role_name, config), item in zip(configs.items(), batch):
+        results[role_name] = report(role_name, config, response=item.response, error=item.error)
     
     # Summary
     print(f"\n{BOLD}{'='*60}{ENDC}")
     print(f"{BOLD}📊 Test Summary{ENDC}")
     print(f"{BOLD}{'='*60}{ENDC}")
     
+    print(f"  ⏱️  {batch.summary()}")
     all_passed = True
     for role_name, passed in results.items():
         status = f"{GREEN}PASS{ENDC}" if passed else f"{RED}FAIL{ENDC}"
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for the Markdown section splitter used by section-mode debates,
+the snapshots that let incremental debates reuse unchanged sections, and the
+context a section-mode debate sends to the Council.
+"""
+import sys
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+
+# Add project root
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from llm.tokens import count_tokens
+from scripts.sections import split_sections, outline
+from scripts.debate_snapshot import DebateSnapshot, shift_citations
+import scripts.dialecta_debate as dialecta_debate
+import llm.client as llm_client
+
+sys.path.insert(0, str(Path(__file__).parent))
+from test_llm_client import FakeCompletions, make_client
+
+# ANSI Colors
+GREEN = '\033[92m'
+RED = '\033[91m'
+CYAN = '\033[96m'
+ENDC = '\033[0m'
+BOLD = '\033[1m'
+
+
+def _document(chapters=6, paragraphs=8):
+    lines = ["Intro line before any heading.", ""]
+    for c in range(1, chapters + 1):
+        lines += [f"## Chapter {c}", ""]
+        for p in range(paragraphs):
+            lines += [f"Chapter {c} paragraph {p} talks about requirement {c}.{p} in some detail.", ""]
+    lines += ["```", "# not a heading inside a code fence", "```"]
+    return "\n".join(lines)
+
+
+def test_sections_cover_document():
+    """Sections tile the document in order, with original line ranges and numbering."""
+    print(f"\n{CYAN}Test 1: Section Coverage{ENDC}")
+    text = _document()
+    lines = text.splitlines()
+    sections = split_sections(text, max_tokens=250)
+
+    assert len(sections) > 1, "A document over budget should split"
+    assert sections[0].start_line == 1 and sections[-1].end_line == len(lines)
+    for prev, nxt in zip(sections, sections[1:]):
+        assert nxt.start_line == prev.end_line + 1, "Sections must be contiguous"
+    for s in sections:
+        assert s.text == "\n".join(lines[s.start_line - 1:s.end_line])
+        assert count_tokens(s.numbered(3)) <= 250, f"Section {s.lines} exceeds the budget"
+    numbered = sections[1].numbered(3).splitlines()[0]
+    assert numbered.startswith(f"{str(sections[1].start_line).rjust(3)} | "), "Numbering must use original lines"
+    print(f"  {GREEN}✓{ENDC} {len(sections)} contiguous sections within budget: "
+          + ", ".join(s.lines for s in sections))
+    return True
+
+
+def test_headings_and_oversized_sections():
+    """Splits fall on headings; a single chapter over budget is cut at paragraph breaks."""
+    print(f"\n{CYAN}Test 2: Headings & Oversized Sections{ENDC}")
+    text = _document(chapters=2, paragraphs=30)
+    lines = text.splitlines()
+    sections = split_sections(text, max_tokens=200)
+
+    starts = {s.start_line for s in sections}
+    chapter_two = lines.index("## Chapter 2") + 1
+    assert chapter_two in starts, "A heading should start a section when sections cannot be merged"
+    assert any(s.title.endswith(")") and "(1/" in s.title for s in sections), "Oversized chapter should be split"
+    continued = [s for s in sections if "(" in s.title and "(1/" not in s.title]
+    assert continued and all(lines[s.start_line - 2] == "" for s in continued), \
+        "Oversized chapters should be cut at paragraph breaks"
+    assert "not a heading" not in outline(text), "Fenced code must not count as a heading"
+    assert outline(text).splitlines()[0] == "  - [Line 3] Chapter 1"
+    print(f"  {GREEN}✓{ENDC} {len(sections)} sections, outline ignores fenced code")
+    return True
+
+
+def test_incremental_snapshot():
+    """Anchored sections survive an edit elsewhere; their saved critiques follow them to new lines."""
+    print(f"\n{CYAN}Test 3: Incremental Snapshot{ENDC}")
+    text = _document(chapters=4, paragraphs=6)
+    before = split_sections(text, max_tokens=400, anchor_level=2)
+    assert len(before) >= 4, "Anchored chapters must not merge into each other"
+
+    snapshot = DebateSnapshot("fp", text, loop=1)
+    for s in before:
+        snapshot.add(s, "negative", f"Weak claim [Line {s.start_line}] to [Line {s.start_line}-{s.end_line}]", 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "snapshot.json"
+        snapshot.save(path)
+        assert DebateSnapshot.load(path, "other prompts") is None, "A different fingerprint must not be reused"
+        previous = DebateSnapshot.load(path, "fp")
+
+    # Insert two lines into chapter 2: chapter 1 is untouched in place, chapters 3+ move down by 2
+    edited = text.replace("Chapter 2 paragraph 0", "Chapter 2 paragraph 0 (revised)\n\nNew evidence.")
+    after = split_sections(edited, max_tokens=400, anchor_level=2)
+    reused = [s for s in after if previous.critique(s, "negative")]
+    changed = [s for s in after if not previous.critique(s, "negative")]
+    assert changed and all("Chapter 2" in s.title for s in changed), f"Only chapter 2 changed: {[s.title for s in changed]}"
+    assert len(reused) == len(after) - len(changed)
+
+    moved = next(s for s in reused if "Chapter 3" in s.title)
+    critique = previous.critique(moved, "negative")
+    assert critique["content"] == f"Weak claim [Line {moved.start_line}] to [Line {moved.start_line}-{moved.end_line}]"
+    assert critique["tokens"] == 100
+    assert previous.critique(moved, "affirmative") is None, "Critiques are per role"
+    assert shift_citations("[Line 7] and [Line 8-9]", -2) == "[Line 5] and [Line 6-7]"
+    print(f"  {GREEN}✓{ENDC} {len(changed)}/{len(after)} sections re-debated, citations shifted by 2 lines")
+    return True
+
+
+def test_chunked_debate_context():
+    """A target over the context budget is debated by section, still with the history and Oracle facts."""
+    print(f"\n{CYAN}Test 4: Chunked Debate Context{ENDC}")
+    fakes = {p: FakeCompletions("## 💡 One-Liner\n\nSection reviewed.") for p in llm_client.FALLBACK_CHAIN}
+    client = make_client(fakes, cache=False)
+    # A ~1200 token context budget (the Adjudicator's reserve for both arguments on top) forces section mode
+    reserve = sum(cfg.get('max_tokens', 8192) for cfg in (dialecta_debate.AffirmativeConfig, dialecta_debate.NegativeConfig))
+    client.prompt_budget = lambda **kwargs: reserve + 1200
+    original_root = dialecta_debate.project_root
+    with tempfile.TemporaryDirectory() as tmp:
+        dialecta_debate.project_root = Path(tmp)
+        try:
+            target = Path(tmp) / "docs" / "plan.md"
+            target.parent.mkdir(parents=True)
+            target.write_text(_document(chapters=6, paragraphs=12), encoding='utf-8')
+            history = Path(tmp) / "history.md"
+            history.write_text("HISTORY-MARKER: loop 1 asked for load tests.", encoding='utf-8')
+            oracle = Path(tmp) / "oracle.md"
+            oracle.write_text("ORACLE-MARKER: vendor SLA is 99.9%.", encoding='utf-8')
+            outcome = {}
+            report = asyncio.run(dialecta_debate.arun_debate(
+                str(target), str(history), "objective", client=client, quiet=True, outcome=outcome,
+                log_dir=Path(tmp) / "logs", log_tag="chunked", oracle_file=str(oracle)))
+        finally:
+            dialecta_debate.project_root = original_root
+
+    assert report, outcome.get("error")
+    assert not logging.getLogger("DialectaDebate.chunked").handlers, "The debate's log file must be closed when it ends"
+    calls = [c for fake in fakes.values() for c in fake.calls]
+    sections = [c for c in calls if any('<target_material section=' in m["content"] for m in c["messages"])]
+    assert sections, "Chunked mode should send per-section requests"
+    for call in sections:
+        text = "\n".join(m["content"] for m in call["messages"])
+        assert "HISTORY-MARKER" in text, "History must reach every section prompt"
+        assert "ORACLE-MARKER" in text, "Oracle facts must reach every section prompt"
+    print(f"  {GREEN}✓{ENDC} {len(sections)} section calls carry the history and Oracle facts")
+    return True
+
+
+def main():
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}📑 Section Splitter - Unit Tests{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    tests = [
+        ("Section Coverage", test_sections_cover_document),
+        ("Headings & Oversized Sections", test_headings_and_oversized_sections),
+        ("Incremental Snapshot", test_incremental_snapshot),
+        ("Chunked Debate Context", test_chunked_debate_context),
+    ]
+
+    passed = 0
+    failed = 0
+
+    for name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"  {GREEN}✅ {name} PASSED{ENDC}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  {RED}❌ {name} FAILED: {e}{ENDC}")
+        except Exception as e:
+            failed += 1
+            print(f"  {RED}❌ {name} ERROR: {e}{ENDC}")
+
+    print(f"\n{BOLD}{'='*60}{ENDC}")
+    print(f"{BOLD}📊 Results: {passed} passed, {failed} failed{ENDC}")
+    print(f"{BOLD}{'='*60}{ENDC}")
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())